@@ -0,0 +1,180 @@
+import argparse
+import os
+import sys
+import threading
+
+from sources.alarms import AlarmLog, LimitChecker
+from sources.common.utilities.fileSystem import loadSettings
+from sources.derived import DerivedChannels
+from sources.ingestion import AcquisitionGroup, ArrivalStatistics, SessionLog, receiverDescriptions, saveParserData
+from sources.publishing import TelemetryPublisher, TelemetrySubscriber, parseAddress
+
+
+def parseArguments(settings):
+    parser = argparse.ArgumentParser(description='PyStrato headless telemetry ingest.')
+    parser.add_argument('--port', default=None, help='Serial port of the receiver.')
+    parser.add_argument('--baud', default=None, help='Baud rate of the receiver.')
+    parser.add_argument('--formats', nargs='+', default=None, help='Tracked parser databases.')
+    parser.add_argument('--emulator', action='store_true', default=settings['EMULATOR_MODE'],
+                        help='Ingest random packets from the serial emulator.')
+    parser.add_argument('--source', default=None,
+                        help='Input source instead of the serial port (tcp://host:port, udp://host:port, file://path).')
+    parser.add_argument('--replay', default=None, help='Raw capture file to ingest instead of the serial port.')
+    parser.add_argument('--record', default=None, help='File to which raw received bytes are appended.')
+    parser.add_argument('--session', default=None, help='Session log name, defaults to the starting time.')
+    parser.add_argument('--legacy-json', action='store_true', help='Also write one JSON file per packet.')
+    parser.add_argument('--quiet', action='store_true', help='Do not print decoded packets.')
+    parser.add_argument('--publish', nargs='?', const=settings['PUBLISH_ADDRESS'],
+                        default=settings['PUBLISH_ADDRESS'] if settings['PUBLISH_TELEMETRY'] else None,
+                        help='Publish decoded packets to subscribers on HOST:PORT.')
+    parser.add_argument('--export', default=None,
+                        help='Export a recorded session log to one columnar file per telemetry type, then exit.')
+    parser.add_argument('--export-format', default='parquet', choices=['parquet', 'hdf5', 'csv'],
+                        help='File format used by --export.')
+    parser.add_argument('--subscribe', default=None,
+                        help='Receive decoded packets from a publishing station on HOST:PORT instead of a receiver.')
+    return parser.parse_args()
+
+
+def reportAlarms(events, alarmLog):
+    if events:
+        alarmLog.write(events)
+        for event in events:
+            print(f'ALARM {AlarmLog.describe(event)}')
+
+
+def reportStaleness(arrivals):
+    for key in arrivals.checkStaleness():
+        print(f'STALE {arrivals.describe(key)}')
+
+
+def reportArrivals(arrivals):
+    for key in sorted(arrivals.snapshot()):
+        print(arrivals.describe(key))
+
+
+def loadDerivedChannels(currentDirectory):
+    derivedChannels = DerivedChannels.fromDirectory(currentDirectory)
+    for error in derivedChannels.errors:
+        print(f'Derived channel ignored, {error}')
+    return derivedChannels
+
+
+def subscribe(arguments, currentDirectory, dataDirectory, settings):
+    host, port = parseAddress(arguments.subscribe)
+    subscriber = TelemetrySubscriber(host, port)
+    arrivals = ArrivalStatistics.fromSettings(settings)
+    sessionLog = SessionLog(dataDirectory, name=arguments.session)
+    derivedChannels = loadDerivedChannels(currentDirectory)
+    limitChecker, alarmLog = LimitChecker.fromDirectory(currentDirectory), AlarmLog(dataDirectory, name=arguments.session)
+    print(f'Subscribed to {host}:{port}, writing into {sessionLog.path}')
+    try:
+        while not subscriber.exhausted:
+            for record in subscriber.receive():
+                derivedChannels.apply(record)
+                arrivals.update(record)
+                sessionLog.write(record)
+                reportAlarms(limitChecker.evaluate(record), alarmLog)
+                if not arguments.quiet:
+                    print(record)
+            reportAlarms(limitChecker.checkStaleness(), alarmLog)
+            reportStaleness(arrivals)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        subscriber.close()
+        sessionLog.close()
+        alarmLog.close()
+    reportArrivals(arrivals)
+    print(f'{sessionLog.nbRecords} packets written to {sessionLog.path}')
+
+
+def export(arguments, currentDirectory, dataDirectory):
+    from sources.exporting import SessionExporter
+    name = os.path.splitext(os.path.basename(os.path.normpath(arguments.export)))[0]
+    outputDirectory = os.path.join(dataDirectory, 'exports', name)
+    for path in SessionExporter(currentDirectory, arguments.export_format).export(arguments.export, outputDirectory):
+        print(f'Exported {path}')
+
+
+def selectReceivers(arguments, settings):
+    formatFiles = arguments.formats if arguments.formats is not None else settings['FORMAT_FILES']
+    baud = arguments.baud if arguments.baud is not None else settings['SELECTED_BAUD']
+    if arguments.replay is not None:
+        return [(f'file://{arguments.replay}', None, formatFiles)]
+    if arguments.source is not None or arguments.port is not None:
+        return [(arguments.source or arguments.port, baud, formatFiles)]
+    if arguments.formats is not None:
+        settings['FORMAT_FILES'] = formatFiles
+    return receiverDescriptions(settings)
+
+
+def main():
+    currentDirectory = os.path.dirname(os.path.realpath(__file__))
+    settings = loadSettings(os.path.join(currentDirectory, 'settings'))
+    arguments = parseArguments(settings)
+    settings['EMULATOR_MODE'] = arguments.emulator
+    dataDirectory = os.path.join(currentDirectory, 'data')
+    if arguments.export is not None:
+        return export(arguments, currentDirectory, dataDirectory)
+    if arguments.subscribe is not None:
+        return subscribe(arguments, currentDirectory, dataDirectory, settings)
+    receivers = selectReceivers(arguments, settings)
+    if not any(formatFiles for _, _, formatFiles in receivers):
+        sys.exit('No tracked parser database, use --formats or select tracked parsers in the GUI.')
+    if arguments.record and len(receivers) > 1:
+        sys.exit('--record needs a single receiver.')
+    recordFile = open(arguments.record, 'ab') if arguments.record else None
+    recordLock = threading.Lock()
+
+    def recordRaw(_, received):
+        with recordLock:
+            recordFile.write(received)
+
+    group = AcquisitionGroup(currentDirectory, settings, receivers=receivers,
+                             rawHandler=recordRaw if recordFile is not None else None)
+    sessionLog = SessionLog(dataDirectory, name=arguments.session)
+    derivedChannels = loadDerivedChannels(currentDirectory)
+    limitChecker, alarmLog = LimitChecker.fromDirectory(currentDirectory), AlarmLog(dataDirectory, name=arguments.session)
+    arrivals = ArrivalStatistics.fromSettings(settings)
+    publisher = TelemetryPublisher(*parseAddress(arguments.publish)).start() if arguments.publish else None
+    for name in group.start():
+        print(f'Ingesting from {name}')
+    print(f'Writing into {sessionLog.path}')
+    if publisher is not None:
+        print(f'Publishing on {publisher.host}:{publisher.port}')
+    if len(limitChecker):
+        print(f'Monitoring limits of {len(limitChecker)} arguments, alarms go into {alarmLog.path}')
+    try:
+        while group.active:
+            for record, telemetry in group.receive():
+                derivedChannels.apply(record)
+                arrivals.update(record)
+                sessionLog.write(record)
+                reportAlarms(limitChecker.evaluate(record), alarmLog)
+                if publisher is not None:
+                    publisher.publish(record)
+                if arguments.legacy_json:
+                    saveParserData(record['parser'], record['type'], record['data'], dataDirectory)
+                if not arguments.quiet:
+                    print(f"[{record['source']}] {telemetry}")
+            reportAlarms(limitChecker.checkStaleness(), alarmLog)
+            reportStaleness(arrivals)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        group.interrupt()
+        sessionLog.close()
+        alarmLog.close()
+        if publisher is not None:
+            publisher.close()
+        if recordFile is not None:
+            recordFile.close()
+    reportArrivals(arrivals)
+    if group.nbDuplicates:
+        print(f'{group.nbDuplicates} duplicate frames dropped')
+    print(f'{sessionLog.nbRecords} packets written to {sessionLog.path}')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,6 @@
 ######################## IMPORTS ########################
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from functools import partial
 import serial.tools.list_ports
@@ -9,8 +10,10 @@ import qdarktheme
 from PyQt5.QtCore import QDateTime, QThread
 
 # --------------------- Sources ----------------------- #
-from sources.SerialGS import SerialMonitor, saveParserData
-from sources.common.utilities.fileSystem import loadSearchItemsFromJson
+from sources.SerialGS import SerialMonitor
+from sources.sessions import listSessions
+from sources.exporting import SessionExporter, EXPORT_EXTENSIONS
+from sources.common.utilities.fileSystem import loadSearchItemsFromJson, writeLayoutAutosave, layoutHash
 from sources.common.widgets.Widgets import *
 
 from sources.databases.general import DatabaseTabWidget, DatabaseEditor, NewDatabaseWindow
@@ -71,6 +74,10 @@ class PyStratoGui(QMainWindow):
         self.serialWindow.textedit.setDisabled(True)
         self.serialMonitorTimer = None
         self.layoutAutosaveTimer = None
+        self.layoutAutosaveExecutor = ThreadPoolExecutor(max_workers=1)
+        self.autosavedLayoutRevision = None
+        self.currentLayoutHash = None
+        self.checkedLayoutRevision, self.layoutModified = None, False
 
     def initializeUI(self, data=None):
         self.loadingData = data
@@ -101,6 +108,7 @@ class PyStratoGui(QMainWindow):
         self.icons['ANTENNA'] = QIcon(os.path.join(iconPath, 'icons8-antenna-96.png'))
         self.icons['CODE_FILE'] = QIcon(os.path.join(iconPath, 'icons8-code-file-96.png'))
         self.icons['DOWNLOAD'] = QIcon(os.path.join(iconPath, 'icons8-download-96.png'))
+        self.icons['DOCUMENTS_FOLDER'] = QIcon(os.path.join(iconPath, 'icons8-documents-folder-96.png'))
         self.icons['ADD_NEW'] = QIcon(os.path.join(iconPath, 'icons8-add-new-96.png'))
         self.icons['NEGATIVE'] = QIcon(os.path.join(iconPath, 'icons8-negative-96.png'))
         self.icons['EDIT'] = QIcon(os.path.join(iconPath, 'icons8-edit-96.png'))
@@ -112,6 +120,7 @@ class PyStratoGui(QMainWindow):
         self.icons['FOUR_SQUARES'] = QIcon(os.path.join(iconPath, 'icons8-four-squares-96.png'))
         self.icons['COMBO_CHART'] = QIcon(os.path.join(iconPath, 'icons8-combo-chart-96.png'))
         self.icons['CUBE'] = QIcon(os.path.join(iconPath, 'icons8-cube-96.png'))
+        self.icons['GLOBE'] = QIcon(os.path.join(iconPath, 'icons8-globe-96.png'))
         self.icons['PLAY'] = QIcon(os.path.join(iconPath, 'icons8-play-96.png'))
         self.icons['STOP'] = QIcon(os.path.join(iconPath, 'icons8-stop-96.png'))
         self.icons['MONITOR'] = QIcon(os.path.join(iconPath, 'icons8-monitor-96.png'))
@@ -143,6 +152,7 @@ class PyStratoGui(QMainWindow):
             self.generalTabWidget.addTab(self.weatherTabWidget, 'WEATHER')
 
         self.generalTabWidget.currentChanged.connect(self.manageToolBars)
+        self.generalTabWidget.currentChanged.connect(self.updateDisplaySuspension)
         self.packetTabWidget.tabChanged.connect(self.manageDatabaseToolBars)
         self.packetTabWidget.databaseChanged.connect(self.manageDatabaseEditorChange)
         self.setCentralWidget(self.generalTabWidget)
@@ -156,6 +166,7 @@ class PyStratoGui(QMainWindow):
         self.databasesToolBar.addAction(self.closeParserAct)
         self.databasesToolBar.addSeparator()
         self.databasesToolBar.addAction(self.generateParserAct)
+        self.databasesToolBar.addAction(self.importDefinitionsAct)
         self.databasesToolBar.addSeparator()
 
         ########### DISPLAYS ###########
@@ -168,6 +179,7 @@ class PyStratoGui(QMainWindow):
         self.displaysToolBar.addAction(self.newGridIndicatorAct)
         self.displaysToolBar.addAction(self.newMultiCurveAct)
         self.displaysToolBar.addAction(self.newVtkDisplayAct)
+        self.displaysToolBar.addAction(self.newTrajectoryDisplayAct)
         # RUN / STOP
         self.displaysToolBar.addSeparator()
         self.displaysToolBar.addAction(self.runSerialAct)
@@ -363,6 +375,20 @@ class PyStratoGui(QMainWindow):
         self.generateParserAct.setStatusTip('Generate On-Board Code')
         self.generateParserAct.setIcon(self.icons['CODE_FILE'])
         self.generateParserAct.triggered.connect(self.generateParserCode)
+        # Import Definitions
+        self.importDefinitionsAct = QAction('&Import Definitions', self)
+        self.importDefinitionsAct.setStatusTip('Bulk Import Telemetry Definitions')
+        self.importDefinitionsAct.setIcon(self.icons['DOWNLOAD'])
+        self.importDefinitionsAct.triggered.connect(self.importDefinitions)
+        # Load Recorded Session
+        self.loadSessionAct = QAction('&Load Session', self)
+        self.loadSessionAct.setStatusTip('Load A Recorded Session Into The Displays')
+        self.loadSessionAct.setIcon(self.icons['DOCUMENTS_FOLDER'])
+        self.loadSessionAct.triggered.connect(self.loadSession)
+        # Export Recorded Session
+        self.exportSessionAct = QAction('&Export Session', self)
+        self.exportSessionAct.setStatusTip('Export A Recorded Session To Columnar Files')
+        self.exportSessionAct.triggered.connect(self.exportSession)
         # Exit
         self.exitAct = QAction(QIcon('exit.png'), '&Exit', self)
         self.exitAct.setShortcut('Ctrl+Q')
@@ -514,6 +540,10 @@ class PyStratoGui(QMainWindow):
         self.closeDisplayTabAct.setStatusTip('Close Display Tab')
         self.closeDisplayTabAct.setShortcut('Ctrl+Shift+X')
         self.closeDisplayTabAct.triggered.connect(self.displayTabWidget.closeCurrentTab)
+        # Telemetry Status Dock
+        self.telemetryStatusAct = self.displayTabWidget.statusDock.toggleViewAction()
+        self.telemetryStatusAct.setText('&Telemetry Status')
+        self.telemetryStatusAct.setStatusTip('Show Rate and Age of Received Telemetries')
         # Add Simple Indicator
         self.newSimpleIndicatorAct = QAction('&Simple Indicator', self)
         self.newSimpleIndicatorAct.setIcon(self.icons['FULL_SCREEN'])
@@ -534,6 +564,11 @@ class PyStratoGui(QMainWindow):
         self.newVtkDisplayAct.setIcon(self.icons['CUBE'])
         self.newVtkDisplayAct.setStatusTip('Add New Vtk Display')
         self.newVtkDisplayAct.triggered.connect(self.displayTabWidget.addVtkDisplay)
+        # Add Trajectory Display
+        self.newTrajectoryDisplayAct = QAction('&Trajectory Display', self)
+        self.newTrajectoryDisplayAct.setIcon(self.icons['GLOBE'])
+        self.newTrajectoryDisplayAct.setStatusTip('Add New 3D Trajectory Display')
+        self.newTrajectoryDisplayAct.triggered.connect(self.displayTabWidget.addTrajectoryDisplay)
 
         ########### TOOLS ###########
         # Run Serial
@@ -553,6 +588,10 @@ class PyStratoGui(QMainWindow):
         self.openMonitorAct.setIcon(self.icons['MONITOR'])
         self.openMonitorAct.setStatusTip('Open Serial Monitor')
         self.openMonitorAct.triggered.connect(self.openSerialMonitor)
+        # Network Input Source
+        self.inputSourceAct = QAction('&Input Source...', self)
+        self.inputSourceAct.setStatusTip('Ingest From A Network Or File Source Instead Of The Serial Port')
+        self.inputSourceAct.triggered.connect(self.selectInputSource)
 
         ########### WEATHER ###########
         # Updating Weather Tabs
@@ -575,6 +614,10 @@ class PyStratoGui(QMainWindow):
         self.emulatorAct = QAction('&Emulator Mode', self, checkable=True, checked=self.settings["EMULATOR_MODE"])
         self.emulatorAct.setStatusTip("Toggle Emulator mode")
         self.emulatorAct.triggered.connect(self.setEmulatorMode)
+        # Toggle Telemetry Publishing
+        self.publishingAct = QAction('&Publish Telemetry', self, checkable=True, checked=self.settings["PUBLISH_TELEMETRY"])
+        self.publishingAct.setStatusTip('Toggle Publishing Of Decoded Telemetry To Remote Displays')
+        self.publishingAct.triggered.connect(self.setTelemetryPublishing)
         # Visit GitHub Page
         self.githubAct = QAction('&Visit GitHub', self)
         self.githubAct.setIcon(self.icons['GITHUB'])
@@ -607,7 +650,10 @@ class PyStratoGui(QMainWindow):
         self.manageFormatsMenu = QMenu('&Manage Formats', self)
         self.manageFormatsMenu.addAction(self.importParserAct)
         self.manageFormatsMenu.addAction(self.trackedParserAct)
+        self.manageFormatsMenu.addAction(self.importDefinitionsAct)
         self.fileMenu.addMenu(self.manageFormatsMenu)
+        self.fileMenu.addAction(self.loadSessionAct)
+        self.fileMenu.addAction(self.exportSessionAct)
         self.fileMenu.addSeparator()
         self.fileMenu.addAction(self.exitAct)
         self.fileMenu.aboutToShow.connect(self.populateFileMenu)
@@ -627,6 +673,7 @@ class PyStratoGui(QMainWindow):
         # Others
         self.displayMenu.addAction(self.newMultiCurveAct)
         self.displayMenu.addAction(self.newVtkDisplayAct)
+        self.displayMenu.addAction(self.newTrajectoryDisplayAct)
         self.insertMenu.addMenu(self.displayMenu)
 
         ###  WINDOW MENU  ###
@@ -650,6 +697,7 @@ class PyStratoGui(QMainWindow):
         self.displayMenu.addAction(self.newDisplayTabAct)
         self.displayMenu.addAction(self.closeDisplayTabAct)
         self.windowMenu.addMenu(self.displayMenu)
+        self.windowMenu.addAction(self.telemetryStatusAct)
         # Editor Panel Menu
         self.editorTabMenu = QMenu('&Editor Tabs')
         self.unitEditorMenu = QMenu('&Units')
@@ -709,12 +757,14 @@ class PyStratoGui(QMainWindow):
         baud_group.setExclusive(True)
         baud_group.triggered.connect(self.selectBaud)
         self.toolsMenu.addMenu(self.baudMenu)
+        self.toolsMenu.addAction(self.inputSourceAct)
         self.toolsMenu.aboutToShow.connect(self.populateToolsMenu)
 
         ###  HELP MENU  ###
         self.helpMenu = self.menubar.addMenu('&Help')
         self.helpMenu.addAction(self.savingParserContentAct)
         self.helpMenu.addAction(self.emulatorAct)
+        self.helpMenu.addAction(self.publishingAct)
         self.helpMenu.addSeparator()
         self.helpMenu.addAction(self.githubAct)
         self.helpMenu.addAction(self.aboutAct)
@@ -744,6 +794,8 @@ class PyStratoGui(QMainWindow):
         if currentLayout != '':
             path = os.path.join(self.presetPath, f"{currentLayout}.json")
             self.loadLayout(path)
+        # THE STARTUP LAYOUT IS ONLY AUTOSAVED ONCE CHANGED
+        self.autosavedLayoutRevision = self.displayTabWidget.layoutRevision
 
     def newParserTab(self):
         fullPaths = [os.path.join(self.formatPath, entry) for entry in os.listdir(self.formatPath)]
@@ -806,6 +858,50 @@ class PyStratoGui(QMainWindow):
         self.packetTabWidget.generateParserCode()
         self.populateFileMenu()
 
+    def importDefinitions(self):
+        self.packetTabWidget.importDefinitions()
+        self.populateFileMenu()
+
+    def loadSession(self):
+        sessions = listSessions(self.dataPath)
+        if sessions:
+            directory = os.path.dirname(sessions[-1])
+            path, _ = QFileDialog.getOpenFileName(self, 'Load Session', directory, 'Session Logs (*.jsonl)')
+            if not path:
+                return
+        else:
+            message = 'No session log has been recorded.\nLoad the saved per packet files instead ?'
+            answer = QMessageBox.question(self, 'Load Session', message, QMessageBox.Yes | QMessageBox.No)
+            if answer != QMessageBox.Yes:
+                return
+            path = self.dataPath
+        QApplication.setOverrideCursor(Qt.WaitCursor)
+        try:
+            nbRecords = self.displayTabWidget.loadSession(path)
+        finally:
+            QApplication.restoreOverrideCursor()
+        self.statusBar().showMessage(f'{nbRecords} packets loaded from {os.path.basename(path)}', 5000)
+
+    def exportSession(self):
+        sessions = listSessions(self.dataPath)
+        directory = os.path.dirname(sessions[-1]) if sessions else self.dataPath
+        path, _ = QFileDialog.getOpenFileName(self, 'Export Session', directory, 'Session Logs (*.jsonl)')
+        if not path:
+            return
+        fileFormat, accepted = QInputDialog.getItem(self, 'Export Session', 'Format :', list(EXPORT_EXTENSIONS), 0, False)
+        if not accepted:
+            return
+        outputDirectory = os.path.join(self.dataPath, 'exports', os.path.splitext(os.path.basename(path))[0])
+        QApplication.setOverrideCursor(Qt.WaitCursor)
+        try:
+            exportedFiles = SessionExporter(self.currentDir, fileFormat).export(path, outputDirectory)
+        except (ImportError, OSError, ValueError) as error:
+            QApplication.restoreOverrideCursor()
+            QMessageBox.warning(self, 'Export Session', f'Could not export the session : {error}')
+            return
+        QApplication.restoreOverrideCursor()
+        self.statusBar().showMessage(f'{len(exportedFiles)} files exported to {outputDirectory}', 5000)
+
     def openTrackedParsers(self):
         dialog = TrackedParsersDialog(self.currentDir)
         result = dialog.exec_()
@@ -824,6 +920,8 @@ class PyStratoGui(QMainWindow):
         with open(filePath, "r") as file:
             description = json.load(file)
         self.displayTabWidget.applyLayoutDescription(description)
+        self.autosavedLayoutRevision = self.displayTabWidget.layoutRevision
+        self.setCurrentLayoutHash(description, verified=False)
         pattern = r"autosave_\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2}\.json"
         if re.match(pattern, os.path.basename(filePath)) is None:
             self.settings['CURRENT_LAYOUT'] = os.path.splitext(os.path.basename(filePath))[0]
@@ -833,25 +931,21 @@ class PyStratoGui(QMainWindow):
             saveSettings(self.settings, 'settings')
 
     def saveLayout(self, autosave=False):
+        # NOTHING TO AUTOSAVE WHEN THE LAYOUT DID NOT CHANGE SINCE THE LAST SNAPSHOT
+        layoutRevision = self.displayTabWidget.layoutRevision
+        if autosave and layoutRevision == self.autosavedLayoutRevision:
+            return
         # SAVING LAYOUT PRESET
         displayedLayout = self.displayTabWidget.getLayoutDescription()
         currentLayout = self.settings['CURRENT_LAYOUT']
         if displayedLayout != {}:
-            # AUTOMATIC AUTOSAVE WITHOUT ANY CURRENT LAYOUT
+            # AUTOMATIC AUTOSAVE WITHOUT ANY CURRENT LAYOUT, WRITTEN OFF THE MAIN THREAD
             if autosave:
                 current_datetime = datetime.now()
                 timestamp = current_datetime.strftime("%Y-%m-%d_%H-%M-%S")
-                filename = os.path.join(self.autosavePath, f"autosave_{timestamp}.json")
-                autoItems = os.listdir(self.autosavePath)
-                autoSaves = [item for item in autoItems if os.path.isfile(os.path.join(self.autosavePath, item))]
-                # REMOVING OLD AUTOSAVES
-                overflow = len(autoSaves) - int(self.settings['MAXIMUM_AUTOSAVES'])
-                if overflow > 0:
-                    for i in range(overflow):
-                        fileToDelete = os.path.join(self.autosavePath, autoSaves[i])
-                        os.remove(fileToDelete)
-                with open(filename, "w") as file:
-                    json.dump(displayedLayout, file)
+                self.layoutAutosaveExecutor.submit(writeLayoutAutosave, displayedLayout, self.autosavePath,
+                                                   self.settings['MAXIMUM_AUTOSAVES'], f"autosave_{timestamp}.json")
+                self.autosavedLayoutRevision = layoutRevision
             # MANUAL SAVE WITH SAVE AS
             elif not autosave and currentLayout == '':
                 self.saveLayoutAs()
@@ -860,6 +954,7 @@ class PyStratoGui(QMainWindow):
                 filename = os.path.join(self.presetPath, f"{currentLayout}.json")
                 with open(filename, "w") as file:
                     json.dump(displayedLayout, file)
+                self.setCurrentLayoutHash(displayedLayout)
 
     def saveLayoutAs(self):
         layoutDescription = self.displayTabWidget.getLayoutDescription()
@@ -875,6 +970,7 @@ class PyStratoGui(QMainWindow):
             filename = os.path.join(self.presetPath, f"{self.settings['CURRENT_LAYOUT']}.json")
             with open(filename, "w") as file:
                 json.dump(layoutDescription, file)
+            self.setCurrentLayoutHash(layoutDescription)
         self.populateLayoutMenu()
 
     def importLayout(self):
@@ -884,7 +980,7 @@ class PyStratoGui(QMainWindow):
                 with open(filePath, 'r') as file:
                     layoutDescription = json.load(file)
                 testDisplay = DisplayTabWidget(self.currentDir)
-                testDisplay.applyLayoutDescription(layoutDescription)
+                testDisplay.applyLayoutDescription(layoutDescription, lazy=False)
                 shutil.copy(filePath, self.presetPath)
                 choice = QMessageBox.question(None, "Load Layout", "Do you want to load this layout?", QMessageBox.Yes | QMessageBox.No)
                 if choice == QMessageBox.Yes:
@@ -934,34 +1030,42 @@ class PyStratoGui(QMainWindow):
     def setLayoutAutoSave(self, action):
         self.settings["LAYOUT_AUTOSAVE"] = action
         saveSettings(self.settings, "settings")
-        if self.settings["LAYOUT_AUTOSAVE"]:
-            self.layoutAutosaveTimer = QTimer()
-            self.layoutAutosaveTimer.timeout.connect(lambda: self.saveLayout(autosave=True))
-            self.layoutAutosaveTimer.start(120)
-        else:
+        if self.layoutAutosaveTimer is not None:
             self.layoutAutosaveTimer.stop()
+        if self.settings["LAYOUT_AUTOSAVE"]:
+            self.startupAutosave()
+
+    def setCurrentLayoutHash(self, description, verified=True):
+        self.currentLayoutHash = layoutHash(description)
+        # A freshly applied layout is compared once, as docks may not restore the exact saved geometry
+        self.checkedLayoutRevision = self.displayTabWidget.layoutRevision if verified else None
+        self.layoutModified = False
+
+    def isLayoutModified(self):
+        layoutRevision = self.displayTabWidget.layoutRevision
+        if layoutRevision != self.checkedLayoutRevision:
+            self.checkedLayoutRevision = layoutRevision
+            if self.currentLayoutHash is None:
+                filename = os.path.join(self.presetPath, f"{self.settings['CURRENT_LAYOUT']}.json")
+                with open(filename, "r") as file:
+                    self.currentLayoutHash = layoutHash(json.load(file))
+            self.layoutModified = layoutHash(self.displayTabWidget.getLayoutDescription()) != self.currentLayoutHash
+        return self.layoutModified
 
     def populateLayoutMenu(self):
-        layoutDescription = self.displayTabWidget.getLayoutDescription()
         if self.settings['CURRENT_LAYOUT'] == '':
             self.restoreLayoutAct.setDisabled(True)
-            if layoutDescription:
+            if self.displayTabWidget.tabWidget.count() > 0:
                 self.saveLayoutAct.setDisabled(False)
                 self.exportLayoutAct.setDisabled(False)
             else:
                 self.saveLayoutAct.setDisabled(True)
                 self.exportLayoutAct.setDisabled(True)
         else:
-            filename = os.path.join(self.presetPath, f"{self.settings['CURRENT_LAYOUT']}.json")
             self.exportLayoutAct.setDisabled(False)
-            with open(filename, "r") as file:
-                previousState = json.load(file)
-            if layoutDescription == previousState:
-                self.saveLayoutAct.setDisabled(True)
-                self.restoreLayoutAct.setDisabled(True)
-            else:
-                self.saveLayoutAct.setDisabled(False)
-                self.restoreLayoutAct.setDisabled(False)
+            layoutModified = self.isLayoutModified()
+            self.saveLayoutAct.setDisabled(not layoutModified)
+            self.restoreLayoutAct.setDisabled(not layoutModified)
 
     def importFormat(self):
         path = QFileDialog.getOpenFileName(self, 'Import Packet Format')
@@ -969,9 +1073,26 @@ class PyStratoGui(QMainWindow):
         pass
 
     def startSerial(self):
-        if not self.settings['EMULATOR_MODE']:
-            message = "Port : " + self.settings["SELECTED_PORT"] + "  Baud : "
-            message += self.settings["SELECTED_BAUD"] + "\nDo you wish to continue ?"
+        if self.settings['REMOTE_ADDRESS']:
+            message = "Remote Telemetry : " + self.settings['REMOTE_ADDRESS'] + "\nDo you wish to continue ?"
+            msg = MessageBox()
+            msg.setWindowIcon(self.mainIcon)
+            msg.setWindowTitle("Running Warning")
+            msg.setText(message)
+            msg.setStandardButtons(QMessageBox.Yes | QMessageBox.Cancel)
+            msg.setStyleSheet("QLabel{min-width: 200px;}")
+            msg.exec_()
+            button = msg.clickedButton()
+            sb = msg.standardButton(button)
+        elif not self.settings['EMULATOR_MODE']:
+            if self.settings['RECEIVERS']:
+                receivers = [receiver[0] for receiver in self.settings['RECEIVERS']]
+                message = "Receivers : " + ", ".join(receivers) + "\nDo you wish to continue ?"
+            elif self.settings['INPUT_SOURCE']:
+                message = "Source : " + self.settings['INPUT_SOURCE'] + "\nDo you wish to continue ?"
+            else:
+                message = "Port : " + self.settings["SELECTED_PORT"] + "  Baud : "
+                message += self.settings["SELECTED_BAUD"] + "\nDo you wish to continue ?"
             msg = MessageBox()
             msg.setWindowIcon(self.mainIcon)
             msg.setWindowTitle("Running Warning")
@@ -996,10 +1117,13 @@ class PyStratoGui(QMainWindow):
         if sb == QMessageBox.Yes:
             serialPath = os.path.join(self.currentDir, "sources/SerialGS.py")
             if os.path.exists(serialPath):
-                self.serial = SerialMonitor(self.currentDir)
+                if self.displayTabWidget.playback.active:
+                    self.displayTabWidget.stopPlayback()
+                self.serial = SerialMonitor(self.currentDir, self.displayTabWidget.content.arrivals)
                 self.serialWindow.textedit.setDisabled(False)
                 self.serial.output.connect(self.onSerialOutput)
                 self.serial.progress.connect(self.newSerialData)
+                self.serial.alarms.connect(self.displayTabWidget.updateAlarms)
                 self.serial.start()
                 self.serialMonitorTimer = QTimer()
                 self.serialMonitorTimer.timeout.connect(self.checkSerialMonitor)
@@ -1025,9 +1149,6 @@ class PyStratoGui(QMainWindow):
 
     def newSerialData(self, content):
         self.displayTabWidget.updateTabDisplays(content)
-        if self.settings['SAVING_SERIAL_CONTENT']:
-            parserName, telemetryName, parserData = content['parser'], content['type'], content['data']
-            saveParserData(parserName, telemetryName, parserData, self.dataPath)
 
     def onSerialOutput(self, newLine):
         needScrolling = False
@@ -1055,6 +1176,10 @@ class PyStratoGui(QMainWindow):
         self.settings["SAVING_SERIAL_CONTENT"] = action
         saveSettings(self.settings, "settings")
 
+    def setTelemetryPublishing(self, action):
+        self.settings["PUBLISH_TELEMETRY"] = action
+        saveSettings(self.settings, "settings")
+
     def setAutoscale(self, action):
         self.settings["AUTOSCALE"] = action
         saveSettings(self.settings, "settings")
@@ -1088,6 +1213,7 @@ class PyStratoGui(QMainWindow):
             self.recentMenu.setDisabled(True)
         else:
             self.recentMenu.setDisabled(False)
+        self.loadSessionAct.setDisabled(self.serial is not None)
 
         index = self.packetTabWidget.currentIndex()
         anyDatabaseChanges = False
@@ -1107,6 +1233,7 @@ class PyStratoGui(QMainWindow):
             self.saveAllParserAct.setDisabled(True)
             self.saveAsParserAct.setDisabled(True)
             self.generateParserAct.setDisabled(True)
+            self.importDefinitionsAct.setDisabled(True)
             self.closeParserAct.setDisabled(True)
 
         else:
@@ -1114,6 +1241,7 @@ class PyStratoGui(QMainWindow):
             self.saveAsParserAct.setDisabled(not currentDatabaseChanges)
             self.saveAllParserAct.setDisabled(not anyDatabaseChanges)
             self.generateParserAct.setDisabled(False)
+            self.importDefinitionsAct.setDisabled(False)
             self.closeParserAct.setDisabled(False)
 
     def populateRecentMenu(self):
@@ -1232,6 +1360,17 @@ class PyStratoGui(QMainWindow):
             self.stopSerial()
             self.startSerial()
 
+    def selectInputSource(self):
+        source, accepted = QInputDialog.getText(
+            self, 'Input Source', 'Source (tcp://host:port, udp://host:port, file://path), empty for the serial port :',
+            text=self.settings['INPUT_SOURCE'])
+        if accepted:
+            self.settings['INPUT_SOURCE'] = source.strip()
+            saveSettings(self.settings, "settings")
+            if self.serial is not None:
+                self.stopSerial()
+                self.startSerial()
+
     def selectPort(self, action):
         self.portMenu.setTitle('&Port    ' + action.text())
         self.settings["SELECTED_PORT"] = action.text()
@@ -1453,6 +1592,8 @@ class PyStratoGui(QMainWindow):
         self.importParserAct.setIcon(self.icons['DOWNLOAD'])
         self.trackedParserAct.setIcon(self.icons['ANTENNA'])
         self.generateParserAct.setIcon(self.icons['CODE_FILE'])
+        self.importDefinitionsAct.setIcon(self.icons['DOWNLOAD'])
+        self.loadSessionAct.setIcon(self.icons['DOCUMENTS_FOLDER'])
         self.addUnitAct.setIcon(self.icons['ADD_NEW'])
         self.removeUnitAct.setIcon(self.icons['NEGATIVE'])
         self.addConstantAct.setIcon(self.icons['ADD_NEW'])
@@ -1478,6 +1619,7 @@ class PyStratoGui(QMainWindow):
         self.newGridIndicatorAct.setIcon(self.icons['FOUR_SQUARES'])
         self.newMultiCurveAct.setIcon(self.icons['COMBO_CHART'])
         self.newVtkDisplayAct.setIcon(self.icons['CUBE'])
+        self.newTrajectoryDisplayAct.setIcon(self.icons['GLOBE'])
         self.runSerialAct.setIcon(self.icons['PLAY'])
         self.stopSerialAct.setIcon(self.icons['STOP'])
         self.openMonitorAct.setIcon(self.icons['MONITOR'])
@@ -1520,6 +1662,24 @@ class PyStratoGui(QMainWindow):
         dialog = AboutDialog()
         dialog.exec_()
 
+    def updateDisplaySuspension(self, *_):
+        # DISPLAYS ARE ONLY REFRESHED WHILE THEY CAN BE SEEN, DATA KEEPS BEING STORED
+        hidden = self.isMinimized() or not self.isVisible() or self.generalTabWidget.currentWidget() is not self.displayTabWidget
+        self.displayTabWidget.setSuspended(hidden)
+
+    def changeEvent(self, event):
+        if event.type() == QEvent.WindowStateChange:
+            self.updateDisplaySuspension()
+        super().changeEvent(event)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.updateDisplaySuspension()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.updateDisplaySuspension()
+
     def closeEvent(self, event):
         if self.packetTabWidget.unsavedChanges:
             unsavedMessage = "There are unsaved changes in the editor. What do you want to do?"
@@ -1,166 +1,141 @@
-import json
 import os
-import random
-import string
-from collections import OrderedDict
-from datetime import datetime
-from enum import Enum
-from typing import Dict, Any, Iterator
 
 from PyQt5.QtCore import pyqtSignal, QThread
-from ecom.checksum import ChecksumVerifier
-
-from ecom.database import CommunicationDatabase
-from ecom.datatypes import TypeInfo, StructType, ArrayType, DynamicSizeError
-from ecom.message import TelemetryDatapointType, TelemetryType
-from ecom.parser import TelemetryParser, Parser
-from ecom.serializer import TelemetrySerializer
-from serial import Serial
-import time
 
 # --------------------- Sources ----------------------- #
+from sources.alarms import AlarmLog, LimitChecker
 from sources.common.utilities.fileSystem import loadSettings
-from sources.databases.balloondata import BalloonPackageDatabase, EComValueJsonEncoder
-
-
-def iterateRequiredDatapoints(telecommand: TelemetryType) -> Iterator[TelemetryDatapointType]:
-    parameters = OrderedDict()
-    for parameter in telecommand.data:
-        parameters[parameter.name] = parameter
-        if issubclass(parameter.type.type, ArrayType):
-            try:
-                len(parameter.type.type)
-            except DynamicSizeError as error:
-                parameters.pop(error.sizeMember, None)
-    return (parameter for parameter in parameters.values())
-
-
-def saveParserData(parserName, telemetryType, content, dataDirectory):
-    try:
-        currentDatetime = datetime.now()
-        timeString = currentDatetime.strftime('%Y%m%d%H%M%S')
-        fileName = f'{telemetryType}_{timeString}.json'
-        parserDirectory = os.path.join(dataDirectory, parserName)
-        telemetryTypeDirectory = os.path.join(parserDirectory, telemetryType)
-        if not os.path.exists(parserDirectory):
-            os.mkdir(parserDirectory)
-        if not os.path.exists(telemetryTypeDirectory):
-            os.mkdir(telemetryTypeDirectory)
-        with open(os.path.join(telemetryTypeDirectory, fileName), "w") as file:
-            json.dump(content, file, indent=2, ensure_ascii=True, cls=EComValueJsonEncoder)
-
-    except Exception as e:
-        print(f"Error occurred: {e}")
-        print("Printing content due to error:")
-        print(telemetryType, content)
-
-
-class SerialEmulator:
-    def __init__(self, databases: Dict[str, CommunicationDatabase]):
-        self._databases = databases
-
-    def read(self, _: int) -> bytes:
-        data = b''
-        for database in self._databases.values():
-            verifier = ChecksumVerifier(database)
-            serializer = TelemetrySerializer(database, verifier=verifier)
-            for telemetryType in database.telemetryTypes:
-                dataPoints = {}
-                for dataPointType in iterateRequiredDatapoints(telemetryType):
-                    dataPoints[dataPointType.name] = self._randomValueForType(database, dataPointType.type, dataPoints)
-                data += serializer.serialize(telemetryType, **dataPoints)
-        time.sleep(1)
-        return data
-
-    @staticmethod
-    def inWaiting() -> int:
-        return 1
-
-    def _randomValueForType(
-            self, database: CommunicationDatabase, typeInfo: TypeInfo, pastValues: Dict[str, Any]) -> Any:
-        if issubclass(typeInfo.type, StructType):
-            children = {}
-            for childName, childTypeInfo in typeInfo.type:
-                children[childName] = self._randomValueForType(database, childTypeInfo, children)
-            return typeInfo.type(children)
-        if issubclass(typeInfo.type, ArrayType):
-            elementTypeInfo = typeInfo.type.getElementTypeInfo()
-            try:
-                size = len(typeInfo.type)
-            except DynamicSizeError as error:
-                size = pastValues.get(error.sizeMember)
-                if size is None:
-                    maxBytes = min(Parser.DEFAULT_MAX_DYNAMIC_MEMBER_SIZE, 127)
-                    elementSize = elementTypeInfo.getSize(database)
-                    size = maxBytes // elementSize
-            if issubclass(elementTypeInfo.type, bytes):
-                return ''.join(random.choices(string.printable, k=size)).encode('utf-8', errors='ignore')
-            return typeInfo.type([self._randomValueForType(database, elementTypeInfo, pastValues) for _ in range(size)])
-        if issubclass(typeInfo.type, bool):
-            return random.choice([True, False])
-        if issubclass(typeInfo.type, Enum):
-            return random.choice(list(typeInfo.type))
-        if issubclass(typeInfo.type, int):
-            minValue = typeInfo.getMinNumericValue(database)
-            maxValue = typeInfo.getMaxNumericValue(database)
-            return random.randint(minValue, maxValue)
-        if issubclass(typeInfo.type, float):
-            minValue = typeInfo.getMinNumericValue(database)
-            maxValue = typeInfo.getMaxNumericValue(database)
-            return random.uniform(minValue, maxValue)
-        if issubclass(typeInfo.type, str):
-            return random.choice(string.printable)
-        raise TypeError(f'Unsupported type {typeInfo}')
+from sources.derived import DerivedChannels
+from sources.ingestion import AcquisitionGroup, ArrivalStatistics, SessionLog, saveParserData
+from sources.publishing import TelemetryPublisher, TelemetrySubscriber, parseAddress
 
 
 class SerialMonitor(QThread):
     progress = pyqtSignal(dict)
     output = pyqtSignal(str)
+    alarms = pyqtSignal(list)
 
-    def __init__(self, path):
+    def __init__(self, path, arrivals=None):
         super().__init__()
         self.currentDir = path
         self._active = False
         self.settings = loadSettings('settings')
+        self.arrivals = arrivals if arrivals is not None else ArrivalStatistics.fromSettings(self.settings)
         self.dataDir = os.path.join(self.currentDir, 'data')
         self.formatDir = os.path.join(self.currentDir, 'parsers')
 
     def run(self):
-        parsers = {}
-        databases = {}
         self.settings = loadSettings('settings')
-        for path in self.settings['FORMAT_FILES']:
-            path = os.path.join(self.formatDir, path)
-            name, database = os.path.basename(path), BalloonPackageDatabase(path)
-            parsers[name] = TelemetryParser(database)
-            databases[name] = database
-        if self.settings['EMULATOR_MODE']:
-            connection = SerialEmulator(databases)
+        if self.settings['REMOTE_ADDRESS']:
+            self.runSubscriber()
         else:
-            connection = Serial(self.settings['SELECTED_PORT'], self.settings['SELECTED_BAUD'], timeout=1)
-        self.output.emit("Connected to port " + self.settings['SELECTED_PORT'] + " with baud rate of " +
-                         self.settings['SELECTED_BAUD'] + ".")
-        self._active = True
-        while self._active:
-            received = connection.read(connection.inWaiting() or 1)
-            for parserName, parser in parsers.items():
-                telemetries = parser.parse(received, errorHandler=lambda error: print(error))
-                if telemetries:
-                    for telemetry in telemetries:
-                        if isinstance(telemetry, dict):
-                            content = telemetry
-                            telemetryType = 'Default'
-                        else:
-                            self.output.emit(str(telemetry))
-                            content = telemetry.data
-                            telemetryType = telemetry.type.name
-                        self.progress.emit({'parser': parserName, 'type': telemetryType, 'data': content})
+            self.runIngest()
         self.finished.emit()
 
+    def runIngest(self):
+        group = AcquisitionGroup(self.currentDir, self.settings, errorHandler=lambda error: print(error))
+        publisher, sessionLog, alarmLog = None, None, None
+        try:
+            if self.settings['PUBLISH_TELEMETRY']:
+                try:
+                    publisher = TelemetryPublisher(*parseAddress(self.settings['PUBLISH_ADDRESS'])).start()
+                    self.output.emit(f"Publishing telemetry on {publisher.host}:{publisher.port}.")
+                except (OSError, ValueError) as error:
+                    self.output.emit(f"Could not publish telemetry : {error}")
+            try:
+                names = group.start()
+            except (OSError, ValueError) as error:
+                self.output.emit(f"Could not open the receivers : {error}")
+                return
+            for name in names:
+                self.output.emit(f"Connected to {name}.")
+            sessionLog = SessionLog(self.dataDir) if self.settings['SAVING_SERIAL_CONTENT'] else None
+            derivedChannels = self.loadDerivedChannels()
+            limitChecker, alarmLog = self.startAlarms()
+            self._active = True
+            while self._active and group.active:
+                for record, telemetry in group.receive():
+                    if not isinstance(telemetry, dict):
+                        self.output.emit(str(telemetry))
+                    derivedChannels.apply(record)
+                    self.arrivals.update(record)
+                    self.progress.emit(record)
+                    self.reportAlarms(limitChecker.evaluate(record), alarmLog)
+                    if sessionLog is not None:
+                        sessionLog.write(record)
+                    if self.settings.get('SAVING_PACKET_FILES'):
+                        saveParserData(record['parser'], record['type'], record['data'], self.dataDir)
+                    if publisher is not None:
+                        publisher.publish(record)
+                self.reportAlarms(limitChecker.checkStaleness(), alarmLog)
+        finally:
+            group.interrupt()
+            if sessionLog is not None:
+                sessionLog.close()
+            if alarmLog is not None:
+                alarmLog.close()
+            if publisher is not None:
+                publisher.close()
+        if group.nbDuplicates:
+            self.output.emit(f"{group.nbDuplicates} duplicate frames dropped.")
+
+    def runSubscriber(self):
+        try:
+            host, port = parseAddress(self.settings['REMOTE_ADDRESS'])
+        except ValueError as error:
+            self.output.emit(f"Invalid remote telemetry address : {error}")
+            return
+        try:
+            subscriber = TelemetrySubscriber(host, port)
+        except OSError as error:
+            self.output.emit(f"Could not reach remote telemetry at {host}:{port} : {error}")
+            return
+        self.output.emit(f"Subscribed to remote telemetry at {host}:{port}.")
+        sessionLog, alarmLog = None, None
+        try:
+            sessionLog = SessionLog(self.dataDir) if self.settings['SAVING_SERIAL_CONTENT'] else None
+            derivedChannels = self.loadDerivedChannels()
+            limitChecker, alarmLog = self.startAlarms()
+            self._active = True
+            while self._active and not subscriber.exhausted:
+                for record in subscriber.receive():
+                    derivedChannels.apply(record)
+                    self.arrivals.update(record)
+                    self.progress.emit(record)
+                    self.reportAlarms(limitChecker.evaluate(record), alarmLog)
+                    if sessionLog is not None:
+                        sessionLog.write(record)
+                    if self.settings.get('SAVING_PACKET_FILES'):
+                        saveParserData(record['parser'], record['type'], record['data'], self.dataDir)
+                self.reportAlarms(limitChecker.checkStaleness(), alarmLog)
+            if subscriber.exhausted:
+                self.output.emit("Remote telemetry closed the connection.")
+        finally:
+            subscriber.close()
+            if sessionLog is not None:
+                sessionLog.close()
+            if alarmLog is not None:
+                alarmLog.close()
+
+    def loadDerivedChannels(self):
+        derivedChannels = DerivedChannels.fromDirectory(self.currentDir)
+        for error in derivedChannels.errors:
+            self.output.emit(f"Derived channel ignored, {error}")
+        return derivedChannels
+
+    def startAlarms(self):
+        limitChecker = LimitChecker.fromDirectory(self.currentDir)
+        if len(limitChecker):
+            self.output.emit(f"Monitoring limits of {len(limitChecker)} arguments.")
+        return limitChecker, AlarmLog(self.dataDir)
+
+    def reportAlarms(self, events, alarmLog):
+        if not events:
+            return
+        alarmLog.write(events)
+        for event in events:
+            self.output.emit(AlarmLog.describe(event))
+        self.alarms.emit(events)
+
     def interrupt(self):
         self._active = False
-
-
-if __name__ == '__main__':
-    monitor = SerialMonitor()
-    monitor.startTracking()
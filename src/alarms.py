@@ -0,0 +1,151 @@
+######################## IMPORTS ########################
+import json
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+
+######################## CONSTANTS ########################
+NOMINAL, YELLOW, RED, STALE = 0, 1, 2, 3
+ALARM_NAMES = {NOMINAL: 'NOMINAL', YELLOW: 'YELLOW', RED: 'RED', STALE: 'STALE'}
+ALARM_COLORS = {YELLOW: '#d4a017', RED: '#d03030', STALE: '#808080'}
+LIMITS_FILE = 'limits.json'
+
+
+######################## FUNCTIONS ########################
+def loadLimits(path):
+    """ Limits of each 'parser/type/argument' path, an absent file meaning nothing is monitored. """
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+
+def alarmStyleSheet(level):
+    return f'color: {ALARM_COLORS[level]};' if level in ALARM_COLORS else ''
+
+
+def extractValue(data, keys):
+    try:
+        for key in keys:
+            data = data[int(key)] if isinstance(data, (list, tuple)) else data[key]
+        return float(data)
+    except (KeyError, IndexError, TypeError, ValueError):
+        return np.nan
+
+
+######################## CLASSES ########################
+class LimitTable:
+    """ Thresholds and state of all monitored arguments of one telemetry type, stored column-wise. """
+
+    def __init__(self, paths, limits, now):
+        self.paths = paths
+        self.argumentKeys = [path.split('/')[2:] for path in paths]
+
+        def bounds(name, index):
+            return np.array([(limits[path].get(name) or [None, None])[index] for path in paths], dtype=float)
+
+        def values(name):
+            return np.array([limits[path].get(name) for path in paths], dtype=float)
+
+        self.yellowLow, self.yellowHigh = bounds('YELLOW', 0), bounds('YELLOW', 1)
+        self.redLow, self.redHigh = bounds('RED', 0), bounds('RED', 1)
+        self.maxRate, self.staleAfter = values('MAX_RATE'), values('STALE_AFTER')
+        self.lastValues = np.full(len(paths), np.nan)
+        self.lastTimes = np.full(len(paths), np.nan)
+        # Arguments never received go stale as well once their timeout has elapsed from the start
+        self.receivedTimes = np.full(len(paths), now)
+        self.levels = np.full(len(paths), NOMINAL)
+
+
+class LimitChecker:
+    """
+    Evaluates red and yellow thresholds, rates of change and staleness timeouts of incoming records. Comparisons run on
+    whole telemetry types at once, so only state changes of the arguments come out of each packet.
+    """
+
+    def __init__(self, limits, now=None):
+        now = time.time() if now is None else now
+        paths = {}
+        for path in limits:
+            keys = path.split('/')
+            if len(keys) < 3:
+                continue
+            paths.setdefault((keys[0], keys[1]), []).append(path)
+        self.tables = {key: LimitTable(tablePaths, limits, now) for key, tablePaths in paths.items()}
+
+    @classmethod
+    def fromDirectory(cls, path):
+        return cls(loadLimits(os.path.join(path, LIMITS_FILE)))
+
+    def __len__(self):
+        return sum(len(table.paths) for table in self.tables.values())
+
+    def evaluate(self, record):
+        table = self.tables.get((record['parser'], record['type']))
+        if table is None:
+            return []
+        now = record.get('time', time.time())
+        values = np.array([extractValue(record['data'], keys) for keys in table.argumentKeys])
+        received = ~np.isnan(values)
+        # Comparisons with NaN are false, so missing thresholds and missing values never raise an alarm
+        with np.errstate(invalid='ignore', divide='ignore'):
+            yellow = (values < table.yellowLow) | (values > table.yellowHigh)
+            red = (values < table.redLow) | (values > table.redHigh)
+            rates = np.abs(values - table.lastValues) / (now - table.lastTimes)
+            yellow |= rates > table.maxRate
+        levels = np.where(red, RED, np.where(yellow, YELLOW, NOMINAL))
+        levels = np.where(received, levels, table.levels)
+        table.lastValues = np.where(received, values, table.lastValues)
+        table.lastTimes = np.where(received, now, table.lastTimes)
+        table.receivedTimes = np.where(received, now, table.receivedTimes)
+        return self._updateLevels(table, levels, values, now)
+
+    def checkStaleness(self, now=None):
+        now = time.time() if now is None else now
+        events = []
+        for table in self.tables.values():
+            stale = (now - table.receivedTimes) > table.staleAfter
+            if stale.any():
+                events.extend(self._updateLevels(table, np.where(stale, STALE, table.levels), table.lastValues, now))
+        return events
+
+    @staticmethod
+    def _updateLevels(table, levels, values, now):
+        changed = np.flatnonzero(levels != table.levels)
+        events = [{'argument': table.paths[index], 'level': int(levels[index]),
+                   'previous': int(table.levels[index]), 'value': None if np.isnan(values[index]) else float(values[index]),
+                   'time': now} for index in changed]
+        table.levels = levels
+        return events
+
+
+class AlarmLog:
+    def __init__(self, dataDirectory, name=None):
+        self.directory = os.path.join(dataDirectory, 'alarms')
+        os.makedirs(self.directory, exist_ok=True)
+        if name is None:
+            name = datetime.now().strftime('alarms_%Y%m%d_%H%M%S')
+        self.path = os.path.join(self.directory, f'{name}.jsonl')
+        self.file = None
+        self.nbEvents = 0
+
+    def write(self, events):
+        # The file is only created once something actually happened
+        if self.file is None:
+            self.file = open(self.path, 'a', encoding='utf-8')
+        for event in events:
+            self.file.write(json.dumps(event) + '\n')
+        self.file.flush()
+        self.nbEvents += len(events)
+
+    def close(self):
+        if self.file is not None and not self.file.closed:
+            self.file.close()
+
+    @staticmethod
+    def describe(event):
+        timeString = datetime.fromtimestamp(event['time']).strftime('%H:%M:%S')
+        value = '' if event['value'] is None or event['level'] == STALE else f" ({event['value']:g})"
+        return f"[{timeString}] {event['argument']} : {ALARM_NAMES[event['previous']]} -> {ALARM_NAMES[event['level']]}{value}"
@@ -1,10 +1,15 @@
 ######################## IMPORTS ########################
+import copy
 import dataclasses
+import hashlib
+import io
+import json
+import mmap
 import os
 import csv
+import zipfile
 from typing import Type
 
-import pandas as pd
 import numpy as np
 import time
 
@@ -103,7 +108,16 @@ def testSaving(path):
             print(f'Default value {config.defaultValue!r} for config {config.name} is not valid')
 
 
+_settingsCache = {}
+
+
 def loadSettings(path):
+    # Every display reads the settings when built, the file is only parsed again once it changed on disk
+    fileStat = os.stat(path)
+    fileKey = (fileStat.st_mtime_ns, fileStat.st_size)
+    cachedKey, cachedParameters = _settingsCache.get(path, (None, None))
+    if cachedKey == fileKey:
+        return copy.deepcopy(cachedParameters)
     parameters = {}
     with open(path, "r") as file:
         lines = file.readlines()
@@ -118,9 +132,10 @@ def loadSettings(path):
             else:
                 parameters[line[0]] = split_setting
         elif line[0] in ['AUTOSCROLL', 'AUTOSCALE', 'EMULATOR_MODE',
-                         'LAYOUT_AUTOSAVE', 'SAVING_SERIAL_CONTENT', 'ENABLE_WEATHER', 'MAXIMIZED', 'DARK_THEME']:
+                         'LAYOUT_AUTOSAVE', 'SAVING_SERIAL_CONTENT', 'ENABLE_WEATHER', 'MAXIMIZED', 'DARK_THEME',
+                         'PUBLISH_TELEMETRY', 'SAVING_PACKET_FILES']:
             parameters[line[0]] = bool(int(line[1].rstrip("\n")))
-        elif line[0] in ['LOCATIONS']:
+        elif line[0] in ['LOCATIONS', 'RECEIVERS']:
             line[1] = line[1].rstrip("\n")
             locations_data = line[1].split(';')
             if len(locations_data) == 1 and locations_data[0] == '':
@@ -132,7 +147,8 @@ def loadSettings(path):
                 parameters[line[0]] = locations
         else:
             parameters[line[0]] = line[1].rstrip("\n")
-    return parameters
+    _settingsCache[path] = (fileKey, parameters)
+    return copy.deepcopy(parameters)
 
 
 def saveSettings(parameters, path):
@@ -145,9 +161,10 @@ def saveSettings(parameters, path):
             if setting in ['AVAILABLE_BAUDS', 'FORMAT_FILES', 'OPENED_RECENTLY']:
                 file.write(setting + '=' + ','.join(parameters[setting]) + '\n')
             elif setting in ['AUTOSCROLL', 'AUTOSCALE', 'EMULATOR_MODE',
-                             'LAYOUT_AUTOSAVE', 'SAVING_SERIAL_CONTENT', 'ENABLE_WEATHER', 'MAXIMIZED', 'DARK_THEME']:
+                             'LAYOUT_AUTOSAVE', 'SAVING_SERIAL_CONTENT', 'ENABLE_WEATHER', 'MAXIMIZED', 'DARK_THEME',
+                             'PUBLISH_TELEMETRY', 'SAVING_PACKET_FILES']:
                 file.write(setting + '=' + str(int(parameters[setting])) + '\n')
-            elif setting in ['LOCATIONS']:
+            elif setting in ['LOCATIONS', 'RECEIVERS']:
                 locations_data = []
                 for location in parameters[setting]:
                     location_str = ','.join(location)
@@ -155,6 +172,24 @@ def saveSettings(parameters, path):
                 file.write(setting + '=' + ';'.join(locations_data) + '\n')
             else:
                 file.write(setting + '=' + str(parameters[setting]) + '\n')
+    _settingsCache.pop(path, None)
+
+
+def layoutHash(description):
+    serialized = json.dumps(description, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(serialized.encode('utf-8')).hexdigest()
+
+
+def writeLayoutAutosave(description, autosavePath, maximumAutosaves, fileName):
+    temporaryPath = os.path.join(autosavePath, f'.{fileName}.tmp')
+    with open(temporaryPath, "w") as file:
+        json.dump(description, file)
+    os.replace(temporaryPath, os.path.join(autosavePath, fileName))
+    # REMOVING OLD AUTOSAVES, THEIR TIMESTAMPED NAMES SORT CHRONOLOGICALLY
+    autoSaves = sorted(item for item in os.listdir(autosavePath)
+                       if item.startswith('autosave_') and os.path.isfile(os.path.join(autosavePath, item)))
+    for item in autoSaves[:max(len(autoSaves) - int(maximumAutosaves), 0)]:
+        os.remove(os.path.join(autosavePath, item))
 
 
 def csvRowCount(path, newLine=''):
@@ -166,27 +201,124 @@ def csvRowCount(path, newLine=''):
         return 0
 
 
+def csvTimeIndex(path, timeColumn='UNIX', stride=256):
+    """
+    Sparse index of a time sorted CSV file, one (time, byte offset) entry every stride rows.
+    The index is kept in a .idx sidecar and only extended with the rows appended since it was built. A sidecar left
+    by another file or by a rewritten one is rebuilt.
+    """
+    indexPath = path + '.idx'
+    with open(path, 'rb') as file:
+        header = file.readline()
+        dataStart = file.tell()
+    names = next(csv.reader([header.decode('utf-8')]))
+    timeIndex = names.index(timeColumn)
+    status = os.stat(path)
+    size, headerHash = status.st_size, hashlib.sha1(header).hexdigest()
+    times, offsets, rowCount, scannedSize = [], [], 0, dataStart
+
+    def rowEnd(mapped, offset):
+        # Newlines inside quoted fields do not end a row
+        end = offset
+        while True:
+            end = mapped.find(b'\n', end)
+            if end == -1:
+                return size
+            end += 1
+            if mapped[offset:end].count(b'"') % 2 == 0:
+                return end
+
+    def rowTime(mapped, offset, end):
+        row = next(csv.reader(io.StringIO(mapped[offset:end].decode('utf-8'), newline='')))
+        return float(row[timeIndex])
+
+    def validSidecar(sidecar, mapped):
+        if str(sidecar['headerHash']) != headerHash or int(sidecar['inode']) != status.st_ino:
+            return False
+        if int(sidecar['stride']) != stride or int(sidecar['scannedSize']) > size:
+            return False
+        # The file may have been rewritten in place, its indexed rows must still hold their times
+        scanned = int(sidecar['scannedSize'])
+        if scanned > dataStart and mapped[scanned - 1:scanned] != b'\n':
+            return False
+        storedTimes, storedOffsets = sidecar['times'], sidecar['offsets']
+        for position in ([0, len(storedOffsets) - 1] if len(storedOffsets) else []):
+            offset = int(storedOffsets[position])
+            if offset >= scanned or rowTime(mapped, offset, rowEnd(mapped, offset)) != storedTimes[position]:
+                return False
+        return True
+
+    with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        if os.path.exists(indexPath):
+            try:
+                with np.load(indexPath) as sidecar:
+                    if validSidecar(sidecar, mapped):
+                        times, offsets = list(sidecar['times']), list(sidecar['offsets'])
+                        rowCount, scannedSize = int(sidecar['rowCount']), int(sidecar['scannedSize'])
+            except (OSError, ValueError, KeyError, IndexError, EOFError, zipfile.BadZipFile):
+                pass
+        if scannedSize < size:
+            offset = scannedSize
+            while offset < size:
+                end = rowEnd(mapped, offset)
+                if end == size and mapped[end - 1:end] != b'\n':
+                    # Row still being written, it will be indexed next time
+                    break
+                if rowCount % stride == 0:
+                    times.append(rowTime(mapped, offset, end))
+                    offsets.append(offset)
+                rowCount += 1
+                offset = end
+            scannedSize = offset
+            try:
+                with open(indexPath, 'wb') as sidecar:
+                    np.savez(sidecar, times=np.array(times, dtype=float), offsets=np.array(offsets, dtype=np.int64),
+                             rowCount=rowCount, scannedSize=scannedSize, stride=stride, headerHash=headerHash,
+                             inode=status.st_ino)
+            except OSError:
+                pass
+    return {
+        'names': names, 'times': np.array(times, dtype=float), 'offsets': np.array(offsets, dtype=np.int64),
+        'rowCount': rowCount, 'dataStart': dataStart, 'dataEnd': scannedSize,
+    }
+
+
+def readCSVTimeRange(path, start=None, finish=None, timeColumn='UNIX', index=None):
+    """ Load only the rows of a time sorted CSV file whose time is between start and finish. """
+    import pandas as pd
+    index = csvTimeIndex(path, timeColumn) if index is None else index
+    if index['rowCount'] == 0:
+        return pd.DataFrame(columns=index['names'])
+    times, offsets = index['times'], index['offsets']
+    # Blocks are stride rows long, so widen the byte range to the blocks holding both ends
+    first = 0 if start is None else max(np.searchsorted(times, start, side='left') - 1, 0)
+    last = len(offsets) if finish is None else np.searchsorted(times, finish, side='right')
+    startOffset = offsets[first]
+    finishOffset = offsets[last] if last < len(offsets) else index['dataEnd']
+    with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        block = mapped[startOffset:finishOffset]
+    data = pd.read_csv(io.BytesIO(block), header=None, names=index['names'])
+    mask = np.ones(len(data), dtype=bool)
+    if start is not None:
+        mask &= data[timeColumn].to_numpy() >= start
+    if finish is not None:
+        mask &= data[timeColumn].to_numpy() <= finish
+    return data.loc[mask]
+
+
 def retrieveCSVData(path, packetFormat, start_date="", finish_date=""):
     if os.path.exists(path):
-        if csvRowCount(path) <= 1:
-            values = voidCSV(packetFormat)
-            names = csvHeader(path)
-            return names, values
-        else:
-            df = pd.read_csv(path)
-            if start_date == "":
-                start_date = np.array(df["UNIX"])[0]
-            if finish_date == "":
-                finish_date = np.array(df["UNIX"])[-1]
-            time_mask = (df["UNIX"] >= start_date) & (df["UNIX"] <= finish_date)
-            data = df.loc[time_mask]
-            values = data.loc[:, data.columns != 'Reception Time']
-            names = csvHeader(path)
-            return names, np.array(values)
-    else:
-        values = voidCSV(packetFormat)
         names = csvHeader(path)
-        return names, values
+        index = csvTimeIndex(path)
+        if index['rowCount'] == 0:
+            return names, voidCSV(packetFormat)
+        start = start_date if start_date != "" else None
+        finish = finish_date if finish_date != "" else None
+        data = readCSVTimeRange(path, start, finish, index=index)
+        values = data.loc[:, data.columns != 'Reception Time']
+        return names, np.array(values)
+    else:
+        return [], voidCSV(packetFormat)
 
 
 def voidCSV(packetFormat):
@@ -207,9 +339,9 @@ def voidCSV(packetFormat):
 
 
 def csvHeader(path):
-    df = pd.read_csv(path)
-    columnNames = list(df.columns)
-    columnNames.pop(0)
+    with open(path, 'r', newline='') as file:
+        columnNames = next(csv.reader(file), [])
+    columnNames = columnNames[1:]
     for i in range(len(columnNames)):
         if columnNames[i] != 'Internal Clock':
             columnNames[i] = columnNames[i].replace(' ', '_')
@@ -217,6 +349,7 @@ def csvHeader(path):
 
 
 def loadSearchItemsFromJson(path):
+    import pandas as pd
     path = os.path.join(path, 'sources/weather/city.list.json')
     citiesDataFrame = pd.read_json(path)
     citiesDataFrame['format'] = citiesDataFrame.apply(
@@ -3,28 +3,102 @@ import numpy as np
 
 
 ######################## FUNCTIONS ########################
-def eulerToQuaternion321(roll, pitch, yaw):
-    qW = np.cos(roll / 2) * np.cos(pitch / 2) * np.cos(yaw / 2) + np.sin(roll / 2) * np.sin(pitch / 2) * np.sin(yaw / 2)
-    qX = np.sin(roll / 2) * np.cos(pitch / 2) * np.cos(yaw / 2) - np.cos(roll / 2) * np.sin(pitch / 2) * np.sin(yaw / 2)
-    qY = np.cos(roll / 2) * np.sin(pitch / 2) * np.cos(yaw / 2) + np.sin(roll / 2) * np.cos(pitch / 2) * np.sin(yaw / 2)
-    qZ = np.cos(roll / 2) * np.cos(pitch / 2) * np.sin(yaw / 2) - np.sin(roll / 2) * np.sin(pitch / 2) * np.cos(yaw / 2)
-    return qW, qX, qY, qZ
+def eulerToQuaternions321(angles, degrees=False):
+    """ Batch conversion of (..., 3) roll, pitch, yaw arrays into (..., 4) qW, qX, qY, qZ arrays. """
+    angles = np.asarray(angles, dtype=float)
+    if degrees:
+        angles = np.radians(angles)
+    (cR, cP, cY), (sR, sP, sY) = np.moveaxis(np.cos(angles / 2), -1, 0), np.moveaxis(np.sin(angles / 2), -1, 0)
+    cPcY, sPsY, sPcY, cPsY = cP * cY, sP * sY, sP * cY, cP * sY
+    return np.stack([cR * cPcY + sR * sPsY,
+                     sR * cPcY - cR * sPsY,
+                     cR * sPcY + sR * cPsY,
+                     cR * cPsY - sR * sPcY], axis=-1)
 
 
-def quaternionToEuler321(qW, qX, qY, qZ, degrees=False):
-    roll = np.arctan2(2 * (qW * qX + qY * qZ), 1 - 2 * (qX ** 2 + qY * qX))
-    pitch = 2 * np.arctan2(np.sqrt(1 + 2 * (qW * qY - qX * qZ)), np.sqrt(1 - 2 * (qW * qY - qX * qZ))) - np.pi / 2
+def quaternionsToEuler321(quaternions, degrees=False):
+    """ Batch conversion of (..., 4) qW, qX, qY, qZ arrays into (..., 3) roll, pitch, yaw arrays. """
+    qW, qX, qY, qZ = np.moveaxis(normalizeQuaternions(quaternions), -1, 0)
+    roll = np.arctan2(2 * (qW * qX + qY * qZ), 1 - 2 * (qX ** 2 + qY ** 2))
+    pitch = np.arcsin(np.clip(2 * (qW * qY - qX * qZ), -1.0, 1.0))
     yaw = np.arctan2(2 * (qW * qZ + qX * qY), 1 - 2 * (qY ** 2 + qZ ** 2))
+    angles = np.stack([roll, pitch, yaw], axis=-1)
+    return np.degrees(angles) if degrees else angles
+
+
+def multiplyQuaternions(q1, q2):
+    """ Hamilton product of (..., 4) quaternion arrays, broadcasting one against the other. """
+    qW1, qX1, qY1, qZ1 = np.moveaxis(np.asarray(q1, dtype=float), -1, 0)
+    qW2, qX2, qY2, qZ2 = np.moveaxis(np.asarray(q2, dtype=float), -1, 0)
+    return np.stack([qW1 * qW2 - qX1 * qX2 - qY1 * qY2 - qZ1 * qZ2,
+                     qW1 * qX2 + qX1 * qW2 + qY1 * qZ2 - qZ1 * qY2,
+                     qW1 * qY2 - qX1 * qZ2 + qY1 * qW2 + qZ1 * qX2,
+                     qW1 * qZ2 + qX1 * qY2 - qY1 * qX2 + qZ1 * qW2], axis=-1)
+
+
+def quaternionsToRotationMatrices(quaternions):
+    """ Batch conversion of (..., 4) quaternion arrays into (..., 3, 3) rotation matrices. """
+    qW, qX, qY, qZ = np.moveaxis(normalizeQuaternions(quaternions), -1, 0)
+    xx, yy, zz = qX * qX, qY * qY, qZ * qZ
+    xy, xz, yz = qX * qY, qX * qZ, qY * qZ
+    wx, wy, wz = qW * qX, qW * qY, qW * qZ
+    return np.stack([np.stack([1 - 2 * (yy + zz), 2 * (xy - wz), 2 * (xz + wy)], axis=-1),
+                     np.stack([2 * (xy + wz), 1 - 2 * (xx + zz), 2 * (yz - wx)], axis=-1),
+                     np.stack([2 * (xz - wy), 2 * (yz + wx), 1 - 2 * (xx + yy)], axis=-1)], axis=-2)
+
+
+def eulerToRotationMatrices321(angles, degrees=False):
+    """ Batch conversion of (..., 3) roll, pitch, yaw arrays into (..., 3, 3) rotation matrices. """
+    angles = np.asarray(angles, dtype=float)
     if degrees:
-        roll, pitch, yaw = np.degrees(pitch), np.degrees(roll), np.degrees(yaw)
-    return roll, pitch, yaw
+        angles = np.radians(angles)
+    (cR, cP, cY), (sR, sP, sY) = np.moveaxis(np.cos(angles), -1, 0), np.moveaxis(np.sin(angles), -1, 0)
+    sPsR, sPcR = sP * sR, sP * cR
+    return np.stack([np.stack([cY * cP, cY * sPsR - sY * cR, cY * sPcR + sY * sR], axis=-1),
+                     np.stack([sY * cP, sY * sPsR + cY * cR, sY * sPcR - cY * sR], axis=-1),
+                     np.stack([-sP, cP * sR, cP * cR], axis=-1)], axis=-2)
+
+
+def normalizeQuaternions(quaternions):
+    quaternions = np.asarray(quaternions, dtype=float)
+    return quaternions / np.linalg.norm(quaternions, axis=-1, keepdims=True)
+
+
+def slerpQuaternions(q0, q1, fraction):
+    """ Spherical linear interpolation between (..., 4) arrays of (qW, qX, qY, qZ) quaternions. """
+    q0, q1 = normalizeQuaternions(q0), normalizeQuaternions(q1)
+    fraction = np.asarray(fraction, dtype=float)[..., np.newaxis]
+    dot = np.sum(q0 * q1, axis=-1, keepdims=True)
+    # q and -q are the same attitude, going through the closest one takes the shortest arc
+    q1 = np.where(dot < 0, -q1, q1)
+    dot = np.clip(np.abs(dot), 0.0, 1.0)
+    theta = np.arccos(dot)
+    sinTheta = np.sin(theta)
+    nearlyParallel = sinTheta < 1e-6
+    sinTheta = np.where(nearlyParallel, 1.0, sinTheta)
+    w0 = np.where(nearlyParallel, 1 - fraction, np.sin((1 - fraction) * theta) / sinTheta)
+    w1 = np.where(nearlyParallel, fraction, np.sin(fraction * theta) / sinTheta)
+    return normalizeQuaternions(w0 * q0 + w1 * q1)
+
+
+# ------------------ Scalar Helpers ------------------- #
+def eulerToQuaternion321(roll, pitch, yaw):
+    return tuple(np.moveaxis(eulerToQuaternions321(np.stack(np.broadcast_arrays(roll, pitch, yaw), axis=-1)), -1, 0))
+
+
+def quaternionToEuler321(qW, qX, qY, qZ, degrees=False):
+    quaternions = np.stack(np.broadcast_arrays(qW, qX, qY, qZ), axis=-1)
+    return tuple(np.moveaxis(quaternionsToEuler321(quaternions, degrees=degrees), -1, 0))
 
 
 def combineQuaternions(q1, q2):
-    qW1, qX1, qY1, qZ1 = q1
-    qW2, qX2, qY2, qZ2 = q2
-    qW = qW1 * qW2 - qX1 * qX2 - qY1 * qY2 - qZ1 * qZ2
-    qX = qW1 * qX2 + qX1 * qW2 + qY1 * qZ2 - qZ1 * qY2
-    qY = qW1 * qY2 - qX1 * qZ2 + qY1 * qW2 + qZ1 * qX2
-    qZ = qW1 * qZ2 + qX1 * qY2 - qY1 * qX2 + qZ1 * qW2
-    return qW, qX, qY, qZ
+    q1, q2 = np.stack(np.broadcast_arrays(*q1), axis=-1), np.stack(np.broadcast_arrays(*q2), axis=-1)
+    return tuple(np.moveaxis(multiplyQuaternions(q1, q2), -1, 0))
+
+
+def quaternionToRotationMatrix(qW, qX, qY, qZ):
+    return quaternionsToRotationMatrices(np.stack(np.broadcast_arrays(qW, qX, qY, qZ), axis=-1))
+
+
+def eulerToRotationMatrix321(roll, pitch, yaw, degrees=False):
+    return eulerToRotationMatrices321(np.stack(np.broadcast_arrays(roll, pitch, yaw), axis=-1), degrees=degrees)
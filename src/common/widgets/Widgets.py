@@ -3,6 +3,7 @@ import json
 import os
 import re
 import time
+from bisect import bisect_right
 
 import numpy as np
 from ecom.datatypes import TypeInfo
@@ -14,7 +15,10 @@ from PyQt5.QtCore import Qt
 from PyQt5.QtGui import *
 
 # --------------------- Sources ----------------------- #
+from sources.alarms import NOMINAL
 from sources.common.utilities.fileSystem import loadSettings, saveSettings, nameGiving, getModificationDate
+from sources.derived import DerivedChannels
+from sources.ingestion import ArrivalStatistics
 from sources.databases.balloondata import BalloonPackageDatabase
 
 
@@ -24,9 +28,16 @@ class ContentStorage:
         self.settings = loadSettings('settings')
         self.currentDir = path
         self.storage = {}
+        self.timestamps = {}
+        self.alarmLevels = {}
+        # Updated by the serial monitor as packets are ingested
+        self.arrivals = ArrivalStatistics.fromSettings(self.settings)
+        self.derivedChannels = None
+        self.cursor = None
 
     def fill(self):
         self.settings = loadSettings('settings')
+        self.derivedChannels = DerivedChannels.fromDirectory(self.currentDir)
         formatFiles = self.settings['FORMAT_FILES']
         for formatFile in formatFiles:
             path = os.path.join(self.currentDir, 'parsers')
@@ -40,16 +51,122 @@ class ContentStorage:
                     }
                     for telemetryType in database.telemetryTypes
                 }
+                self.timestamps[name] = {telemetryType.id.name: [] for telemetryType in database.telemetryTypes}
+                for telemetryType in database.telemetryTypes:
+                    self.arrivals.track(name, telemetryType.id.name)
+                for telemetryName, arguments in self.storage[name].items():
+                    for derivedName in self.derivedChannels.names(name, telemetryName):
+                        arguments.setdefault(derivedName, [])
 
     def __len__(self):
         return len(list(self.storage.keys()))
 
+    def clear(self):
+        for parserName, telemetries in self.storage.items():
+            for telemetryType, arguments in telemetries.items():
+                for values in arguments.values():
+                    values.clear()
+                self.timestamps[parserName][telemetryType].clear()
+        self.alarmLevels.clear()
+        self.arrivals.reset()
+
     def append(self, content):
         packageStorage = self.storage[content['parser']][content['type']]
         for key, value in content['data'].items():
-            packageStorage[key].append(value)
+            # Derived channels of a remote station may not be defined here
+            if key in packageStorage:
+                packageStorage[key].append(value)
+        self.timestamps[content['parser']][content['type']].append(content.get('time', time.time()))
+
+    def extend(self, records):
+        """ Append many records at once, skipping those of parsers or telemetries that are not tracked. """
+        columns = {}
+        for record in records:
+            key = record['parser'], record['type']
+            if key not in columns:
+                try:
+                    columns[key] = self.storage[key[0]][key[1]], self.timestamps[key[0]][key[1]]
+                except KeyError:
+                    columns[key] = None
+            if columns[key] is None:
+                continue
+            packageStorage, timestamps = columns[key]
+            for argument, value in record['data'].items():
+                if argument in packageStorage:
+                    packageStorage[argument].append(value)
+            timestamps.append(record.get('time', time.time()))
+
+    def completeDerivedChannels(self):
+        """ Derive the channels missing from loaded sessions, each telemetry type being computed column-wise. """
+        if self.derivedChannels is None:
+            return
+        for (parserName, telemetryType), channels in self.derivedChannels.channels.items():
+            try:
+                packageStorage = self.storage[parserName][telemetryType]
+                timestamps = self.timestamps[parserName][telemetryType]
+            except KeyError:
+                continue
+            if not timestamps or all(len(packageStorage[channel.name]) == len(timestamps) for channel in channels):
+                continue
+            columns = {argument: values for argument, values in packageStorage.items()
+                       if len(values) == len(timestamps)}
+            for argument, values in self.derivedChannels.evaluateColumns(parserName, telemetryType, columns,
+                                                                         timestamps).items():
+                packageStorage[argument][:] = values
+
+    def timeRange(self):
+        bounds = [
+            (timestamps[0], timestamps[-1])
+            for telemetries in self.timestamps.values() for timestamps in telemetries.values() if timestamps
+        ]
+        if not bounds:
+            return None
+        return min(first for first, _ in bounds), max(last for _, last in bounds)
+
+    def setCursor(self, cursor):
+        """ Only expose the values received up to the cursor time, None exposes everything. """
+        self.cursor = cursor
+
+    def retrieveLatestContent(self, keys):
+        """ Latest value of an argument up to the cursor, with the number of values it was picked from. """
+        try:
+            database, telemetry, argument = keys[0], keys[1], keys[2]
+            content = self.storage[database][telemetry][argument]
+            if self.cursor is None:
+                nbValues = len(content)
+            else:
+                nbValues = bisect_right(self.timestamps[database][telemetry], self.cursor)
+            if nbValues == 0:
+                return None, 0
+            value = content[nbValues - 1]
+            for key in keys[3:]:
+                value = value[key]
+            return value, nbValues
+        except (KeyError, TypeError, IndexError):
+            return None, 0
+
+    def setAlarms(self, events):
+        for event in events:
+            self.alarmLevels[event['argument']] = event['level']
+
+    def retrieveAlarmLevel(self, argument):
+        # Alarms describe the live state of the arguments, replayed sessions are not evaluated
+        if self.cursor is not None:
+            return NOMINAL
+        return self.alarmLevels.get(argument, NOMINAL)
+
+    def storedLength(self, keys):
+        """ Number of values of an argument stored up to the cursor. """
+        try:
+            content = self.storage[keys[0]][keys[1]][keys[2]]
+            if self.cursor is None:
+                return len(content)
+            return min(bisect_right(self.timestamps[keys[0]][keys[1]], self.cursor), len(content))
+        except (KeyError, TypeError, IndexError):
+            return 0
 
-    def retrieveStoredContent(self, keys):
+    def retrieveStoredContent(self, keys, start=0, finish=None):
+        """ Values of an argument from start up to finish or the cursor, only the requested range being copied. """
 
         def getSubArgument(data, keyList):
             for key in keyList:
@@ -59,9 +176,13 @@ class ContentStorage:
         try:
             database, telemetry, argument = keys[0], keys[1], keys[2]
             content = self.storage[database][telemetry][argument]
+            bound = self.storedLength(keys)
+            finish = bound if finish is None else min(finish, bound)
             if len(keys) > 3:
-                content = [getSubArgument(data, keys[3:]) for data in content]
-            return content
+                return [getSubArgument(content[index], keys[3:]) for index in range(start, finish)]
+            if start == 0 and finish == len(content):
+                return content
+            return content[start:finish]
         except (KeyError, TypeError):
             return None
 
@@ -330,6 +451,7 @@ class ArgumentSelector(QDialog):
         self.selectedArgument, self.argumentUnit, self.databases, self.typeFilter = argument, None, None, typeFilter
         self.setWindowTitle('Argument Selection')
         self.formatPath = os.path.join(self.currentDir, 'parsers')
+        self.derivedChannels = DerivedChannels.fromDirectory(self.currentDir)
 
         # DISPLAY & PARSER SELECTION
         self.selectionNameLabel = QLabel()
@@ -416,6 +538,8 @@ class ArgumentSelector(QDialog):
                 treeWidget.itemSelectionChanged.connect(self.selectionMade)
                 telemetryName = telemetry.id.name
                 selectedTypes, _ = database.nestedPythonTypes(telemetryName, searchedType=self.typeFilter)
+                for derivedName in self.derivedChannels.names(databaseName, telemetryName):
+                    selectedTypes.setdefault(derivedName, True)
                 for name, value in selectedTypes.items():
                     if isinstance(value, dict):
                         item = QTreeWidgetItem(treeWidget, [name])
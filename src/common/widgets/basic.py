@@ -12,7 +12,7 @@ class BasicDisplay(QWidget):
     def __init__(self, path, parent=None):
         super().__init__(parent)
         self.generalSettings = loadSettings('settings')
-        self.catalogue = DefaultUnitsCatalogue()
+        self.catalogue = DefaultUnitsCatalogue.shared()
         self.settingsWidget = QWidget()
         self.currentDir = path
         self.display = None
@@ -23,6 +23,9 @@ class BasicDisplay(QWidget):
     def updateContent(self, content):
         pass
 
+    def updateAlarms(self, content, arguments):
+        pass
+
     def changeTheme(self):
         pass
 
@@ -9,6 +9,8 @@ from PyQt5.QtCore import *
 from PyQt5.QtGui import *
 
 # --------------------- Sources ----------------------- #
+from ecom.database import CommunicationDatabaseError
+
 from sources.databases.balloondata import BalloonPackageDatabase, createNewDatabase
 from sources.databases.units import UnitsEditorWidget
 from sources.databases.constants import ConstantEditorWidget
@@ -16,6 +18,7 @@ from sources.databases.configurations import ConfigsEditorWidget
 from sources.databases.sharedtypes import SharedTypesEditorWidget
 from sources.databases.telemetries import TelemetryEditorWidget
 from sources.databases.telecommands import TelecommandEditorWidget
+from sources.databases.importer import DefinitionImporter
 from sources.common.utilities.fileSystem import loadSettings
 
 
@@ -66,22 +69,17 @@ class DatabaseTabWidget(QTabWidget):
         createNewDatabase(newDatabasePath)
         database = BalloonPackageDatabase(newDatabasePath)
         self.databases[name] = database
-        # EDITOR CREATION AND SIGNALS' CONNECTIONS
-        editor = DatabaseEditor(self.databases[name], name)
-        editor.unitsTab.change.connect(self.databaseChanged.emit)
-        editor.constantsTab.change.connect(self.databaseChanged.emit)
-        editor.configsTab.change.connect(self.databaseChanged.emit)
-        editor.dataTypesTab.change.connect(self.databaseChanged.emit)
-        editor.telemetriesTab.change.connect(self.databaseChanged.emit)
-        editor.telecommandsTab.change.connect(self.databaseChanged.emit)
-        editor.currentChanged.connect(self.tabChanged.emit)
-        self.addTab(editor, name)
+        self.addTab(self.createEditor(name), name)
         self.tabChanged.emit()
 
     def openParser(self, path):
         database = BalloonPackageDatabase(path)
         name = os.path.basename(path)
         self.databases[name] = database
+        self.addTab(self.createEditor(name), name)
+        self.tabChanged.emit()
+
+    def createEditor(self, name):
         # EDITOR CREATION AND SIGNALS' CONNECTIONS
         editor = DatabaseEditor(self.databases[name], name)
         editor.unitsTab.change.connect(self.databaseChanged.emit)
@@ -91,8 +89,21 @@ class DatabaseTabWidget(QTabWidget):
         editor.telemetriesTab.change.connect(self.databaseChanged.emit)
         editor.telecommandsTab.change.connect(self.databaseChanged.emit)
         editor.currentChanged.connect(self.tabChanged.emit)
-        self.addTab(editor, name)
-        self.tabChanged.emit()
+        return editor
+
+    def importDefinitions(self):
+        if self.count() >= 1:
+            databaseName = self.currentWidget().databaseName
+            dialog = DefinitionImportDialog(self.databases[databaseName])
+            result = dialog.exec_()
+            if result == QDialog.Accepted and dialog.importedDatabase is not None:
+                tabIndex = self.currentIndex()
+                self.databases[databaseName] = dialog.importedDatabase
+                self.removeTab(tabIndex)
+                self.insertTab(tabIndex, self.createEditor(databaseName), databaseName)
+                self.setCurrentIndex(tabIndex)
+                self.databaseChanged.emit()
+                self.tabChanged.emit()
 
     def saveParser(self, databaseName: str = None, path=None):
         if databaseName is None:
@@ -260,3 +271,66 @@ class CodeGenerationDialog(QDialog):
             self.accept()
         except subprocess.CalledProcessError as e:
             QMessageBox.critical(self, 'Error', f'Error during code generation: {e}')
+
+
+class DefinitionImportDialog(QDialog):
+    def __init__(self, database: BalloonPackageDatabase):
+        super().__init__()
+        self.setModal(True)
+        self.setWindowTitle('Import Definitions')
+        self.setWindowIcon(QIcon('sources/icons/PyStrato.png'))
+        self.resize(600, 400)
+        self.importer = DefinitionImporter(database)
+        self.importedDatabase = None
+
+        # FILE SELECTION & REPORT
+        self.fileEdit = QLineEdit(self)
+        self.fileEdit.setPlaceholderText('CSV / XLSX sheet or C header')
+        self.fileEdit.returnPressed.connect(self.validateFile)
+        browseButton = QPushButton('Browse', self)
+        browseButton.clicked.connect(self.browseFile)
+        self.reportEdit = QTextEdit(self)
+        self.reportEdit.setReadOnly(True)
+        self.importButton = QPushButton('Import', self)
+        self.importButton.setEnabled(False)
+        self.importButton.clicked.connect(self.importDefinitions)
+        cancelButton = QPushButton('Cancel', self)
+        cancelButton.clicked.connect(self.reject)
+
+        # MAIN LAYOUT
+        fileLayout = QHBoxLayout()
+        fileLayout.addWidget(QLabel('File'))
+        fileLayout.addWidget(self.fileEdit)
+        fileLayout.addWidget(browseButton)
+        buttonLayout = QHBoxLayout()
+        buttonLayout.addWidget(self.importButton)
+        buttonLayout.addWidget(cancelButton)
+        mainLayout = QVBoxLayout()
+        mainLayout.addLayout(fileLayout)
+        mainLayout.addWidget(self.reportEdit)
+        mainLayout.addLayout(buttonLayout)
+        self.setLayout(mainLayout)
+
+    def browseFile(self):
+        fileFilter = "Definition Files (*.csv *.xlsx *.xls *.h *.hpp);;All Files (*)"
+        filePath, _ = QFileDialog.getOpenFileName(self, "Select a definition file", "", fileFilter)
+        if filePath:
+            self.fileEdit.setText(filePath)
+            self.validateFile()
+
+    def validateFile(self):
+        self.importer.load(self.fileEdit.text())
+        colors = {DefinitionImporter.ERROR: 'red', DefinitionImporter.WARNING: 'orange'}
+        self.reportEdit.clear()
+        for level, message in self.importer.report:
+            color = colors.get(level)
+            line = f'{level} : {message}'
+            self.reportEdit.append(f'<span style="color: {color};">{line}</span>' if color else line)
+        self.importButton.setEnabled(not self.importer.hasErrors)
+
+    def importDefinitions(self):
+        try:
+            self.importedDatabase = self.importer.apply()
+            self.accept()
+        except (CommunicationDatabaseError, OSError, ValueError) as error:
+            QMessageBox.critical(self, 'Error', f'Error during definitions import: {error}')
@@ -0,0 +1,345 @@
+######################## IMPORTS ########################
+import ast
+import csv
+import json
+import os
+import re
+from collections import OrderedDict
+from tempfile import TemporaryDirectory
+
+import pandas as pd
+from ecom.database import CommunicationDatabaseError
+from ecom.datatypes import TypeInfo
+
+# --------------------- Sources ----------------------- #
+from sources.databases.balloondata import BalloonPackageDatabase, EComValueJsonEncoder
+
+
+######################## FUNCTIONS ########################
+C_TYPE_NAMES = {
+    'uint8_t': 'uint8', 'int8_t': 'int8', 'uint16_t': 'uint16', 'int16_t': 'int16',
+    'uint32_t': 'uint32', 'int32_t': 'int32', 'uint64_t': 'uint64', 'int64_t': 'int64',
+    'float': 'float', 'double': 'double', 'bool': 'bool', '_Bool': 'bool', 'char': 'char',
+}
+SHEET_COLUMNS = ['Telemetry', 'Argument', 'Type', 'Unit', 'Description', 'Category']
+PACKED_ATTRIBUTE = r'(?:__attribute__\s*\(\(\s*(?:__)?packed(?:__)?\s*\)\)\s*)?'
+STRUCT_PATTERN = re.compile(
+    r'typedef\s+struct\s*' + PACKED_ATTRIBUTE + r'(?:\w+\s*)?\{(?P<body>.*?)\}\s*' + PACKED_ATTRIBUTE +
+    r'(?P<name>\w+)\s*;', re.DOTALL)
+ENUM_PATTERN = re.compile(
+    r'typedef\s+enum\s*(?:\w+\s*)?(?::\s*(?P<base>\w+)\s*)?\{(?P<body>.*?)\}\s*(?P<name>\w+)\s*;', re.DOTALL)
+FIELD_PATTERN = re.compile(
+    r'^\s*(?:const\s+)?(?:struct\s+|enum\s+)?(?P<type>\w+)\s+(?P<name>\w+)\s*(?P<size>(?:\[\s*[\w.]*\s*\])*)\s*;'
+    r'\s*(?://\s*(?P<lineComment>.*)|/\*\s*(?P<blockComment>.*?)\s*\*/)?\s*$')
+UNIT_COMMENT_PATTERN = re.compile(r'^\[(?P<unit>[^\]]+)\]\s*(?P<description>.*)$')
+COMMENT_PATTERN = re.compile(r'/\*.*?\*/|//[^\n]*', re.DOTALL)
+INTEGER_SUFFIX_PATTERN = re.compile(r'\b(0[xX][0-9a-fA-F]+|\d+)[uUlL]+\b')
+ENUM_OPERATORS = (ast.Expression, ast.BinOp, ast.UnaryOp, ast.Constant, ast.Name, ast.Load, ast.Add, ast.Sub,
+                  ast.Mult, ast.LShift, ast.RShift, ast.BitOr, ast.BitAnd, ast.BitXor, ast.USub, ast.UAdd, ast.Invert)
+
+
+def readDefinitionSheet(path):
+    """
+    Read telemetry definitions from a CSV or XLSX sheet.
+
+    :param path: The path to the sheet, one row per argument.
+    :return: The sheet rows as dictionaries keyed by the SHEET_COLUMNS names.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension in ['.xlsx', '.xls']:
+        dataFrame = pd.read_excel(path, dtype=str).fillna('')
+        records = dataFrame.to_dict(orient='records')
+    else:
+        with open(path, 'r', encoding='utf-8-sig', newline='') as file:
+            records = list(csv.DictReader(file))
+    rows = []
+    for record in records:
+        record = {str(key).strip(): (value or '').strip() for key, value in record.items() if key is not None}
+        rows.append({column: record.get(column, '') for column in SHEET_COLUMNS})
+    return rows
+
+
+def evaluateEnumValue(expression, knownValues):
+    """
+    Evaluate the integer expression of a C enumeration value, which may use the previous values of the enumeration.
+
+    :param expression: The expression written after the '=' sign.
+    :param knownValues: The values already defined, by name.
+    :return: The integer value, or None when the expression cannot be evaluated.
+    """
+    expression = INTEGER_SUFFIX_PATTERN.sub(r'\1', expression.strip())
+    expression = re.sub(r"'([^'\\])'", lambda character: str(ord(character.group(1))), expression)
+    try:
+        tree = ast.parse(expression, mode='eval')
+    except SyntaxError:
+        return None
+    if not all(isinstance(node, ENUM_OPERATORS) for node in ast.walk(tree)):
+        return None
+    if any(isinstance(node, ast.Name) and node.id not in knownValues for node in ast.walk(tree)):
+        return None
+    if any(isinstance(node, ast.Constant) and not isinstance(node.value, int) for node in ast.walk(tree)):
+        return None
+    try:
+        value = eval(compile(tree, '<enum>', 'eval'), {'__builtins__': {}}, dict(knownValues))
+    except (ArithmeticError, ValueError, TypeError):
+        return None
+    return value if isinstance(value, int) else None
+
+
+def readEnumValues(body):
+    """ Name, value, written expression and description of each value of a C enumeration body. """
+    values, knownValues, nextValue = [], {}, 0
+    for line in body.splitlines():
+        comments = re.findall(r'//\s*(.*)|/\*\s*(.*?)\s*\*/', line)
+        description = ' '.join(lineComment or blockComment for lineComment, blockComment in comments).strip()
+        entries = [entry.strip() for entry in COMMENT_PATTERN.sub('', line).split(',') if entry.strip()]
+        for i, entry in enumerate(entries):
+            name, _, expression = (part.strip() for part in entry.partition('='))
+            # Implicit values follow the previous one, as in C
+            value = evaluateEnumValue(expression, knownValues) if expression else nextValue
+            nextValue = value + 1 if value is not None else None
+            if value is not None:
+                knownValues[name] = value
+            values.append((name, value, expression, description if i == len(entries) - 1 else ''))
+    return values
+
+
+def readDefinitionHeader(path):
+    """
+    Read telemetry definitions from the packed structures and enumerations of a C header.
+    Structures used as a field of another structure become shared types, the others become telemetry types.
+
+    :param path: The path to the C header.
+    :return: The definition rows (same layout as readDefinitionSheet), the enumerations and the structure lines that
+        could not be read, as (structure name, line) pairs.
+    """
+    with open(path, 'r', encoding='utf-8') as file:
+        source = file.read()
+    enumerations = OrderedDict()
+    for match in ENUM_PATTERN.finditer(source):
+        enumerations[match.group('name')] = (C_TYPE_NAMES.get(match.group('base'), 'uint8'),
+                                             readEnumValues(match.group('body')))
+    structures, skippedLines = OrderedDict(), []
+    for match in STRUCT_PATTERN.finditer(source):
+        fields = []
+        # Comments are blanked out line by line, so that lines of a multi-line comment are not taken for fields
+        codeLines = COMMENT_PATTERN.sub(lambda comment: '\n' * comment.group().count('\n'), match.group('body'))
+        for line, code in zip(match.group('body').splitlines(), codeLines.splitlines()):
+            if not code.strip():
+                continue
+            fieldMatch = FIELD_PATTERN.match(line)
+            if fieldMatch is None:
+                skippedLines.append((match.group('name'), line.strip()))
+                continue
+            comment = fieldMatch.group('lineComment') or fieldMatch.group('blockComment') or ''
+            unitMatch = UNIT_COMMENT_PATTERN.match(comment.strip())
+            unit, description = (unitMatch.group('unit'), unitMatch.group('description')) if unitMatch else ('', comment)
+            typeName = C_TYPE_NAMES.get(fieldMatch.group('type'), fieldMatch.group('type'))
+            fields.append((fieldMatch.group('name'), typeName + fieldMatch.group('size').replace(' ', ''),
+                           unit.strip(), description.strip()))
+        structures[match.group('name')] = fields
+    nestedNames = {re.sub(r'\[.*', '', field[1]) for fields in structures.values() for field in fields}
+    rows = []
+    for structName, fields in structures.items():
+        category = 'STRUCT' if structName in nestedNames else 'TELEMETRY'
+        for fieldName, typeName, unit, description in fields:
+            rows.append({'Telemetry': structName, 'Argument': fieldName, 'Type': typeName,
+                         'Unit': unit, 'Description': description, 'Category': category})
+    return rows, enumerations, skippedLines
+
+
+######################## CLASSES ########################
+class DefinitionImporter:
+    """
+    Bulk importer of telemetry types, arguments, units and shared types into a BalloonPackageDatabase.
+    Definitions are validated first, then applied all at once on a staging copy of the database.
+    """
+    ERROR, WARNING, INFO = 'ERROR', 'WARNING', 'INFO'
+
+    def __init__(self, database: BalloonPackageDatabase):
+        self.database = database
+        self.baseTypesValues = [baseType.value for baseType in TypeInfo.BaseType]
+        self.baseTypeNames = [baseType.name for baseType in TypeInfo.BaseType]
+        self.report = []
+        self.telemetries, self.structures = OrderedDict(), OrderedDict()
+        self.enumerations, self.units = OrderedDict(), OrderedDict()
+
+    @property
+    def hasErrors(self):
+        return any(level == self.ERROR for level, _ in self.report)
+
+    def load(self, path):
+        self.report = []
+        self.telemetries, self.structures = OrderedDict(), OrderedDict()
+        self.enumerations, self.units = OrderedDict(), OrderedDict()
+        extension = os.path.splitext(path)[1].lower()
+        skippedLines = []
+        try:
+            if extension in ['.h', '.hpp']:
+                rows, self.enumerations, skippedLines = readDefinitionHeader(path)
+            else:
+                rows = readDefinitionSheet(path)
+        except (OSError, ValueError, ImportError) as error:
+            self.report.append((self.ERROR, f'Could not read {os.path.basename(path)}: {error}'))
+            return
+        self.validate(rows, skippedLines)
+
+    def validate(self, rows, skippedLines=()):
+        existingTelemetries = {telemetry.id.name: telemetry for telemetry in self.database.telemetryTypes}
+        existingSharedTypes = self.database.getSharedDataTypes()
+        # SKIPPED STRUCTURE LINES, THE LAYOUT OF THEIR STRUCTURE WOULD BE INCOMPLETE
+        for structName, line in skippedLines:
+            self.report.append((self.ERROR, f'{structName}: could not read the field declaration "{line}".'))
+        # ENUMERATIONS
+        for enumName, (baseType, values) in self.enumerations.items():
+            names = [name for name, _, _, _ in values]
+            numbers = [value for _, value, _, _ in values if value is not None]
+            if enumName in existingSharedTypes:
+                self.report.append((self.ERROR, f'Shared type {enumName} already exists in the database.'))
+            elif len(names) != len(set(names)):
+                self.report.append((self.ERROR, f'Enumeration {enumName} has duplicated names.'))
+            for name, value, expression, _ in values:
+                if value is None and expression:
+                    self.report.append((self.ERROR, f'Enumeration {enumName}: cannot evaluate {name} = {expression}.'))
+            if len(numbers) != len(set(numbers)):
+                self.report.append((self.WARNING, f'Enumeration {enumName} gives the same value to several names.'))
+        # ROWS
+        for i, row in enumerate(rows):
+            line = f'Row {i + 1}'
+            parentName, argumentName = row['Telemetry'], row['Argument']
+            typeName, unitName = row['Type'], row['Unit']
+            isStructure = row['Category'].upper() == 'STRUCT'
+            if not parentName or not argumentName:
+                self.report.append((self.WARNING, f'{line}: missing telemetry or argument name, row skipped.'))
+                continue
+            if not typeName:
+                self.report.append((self.ERROR, f'{line}: {parentName}/{argumentName} has no type.'))
+                continue
+            if unitName:
+                typeName = self.registerUnit(line, unitName, typeName)
+            parents = self.structures if isStructure else self.telemetries
+            if isStructure and parentName in existingSharedTypes:
+                self.report.append((self.ERROR, f'{line}: shared type {parentName} already exists in the database.'))
+                continue
+            if not isStructure and parentName in existingTelemetries and parentName not in parents:
+                existingArguments = [dataPoint.name for dataPoint in existingTelemetries[parentName].data]
+                parents[parentName] = OrderedDict((name, None) for name in existingArguments)
+                self.report.append((self.INFO, f'{line}: arguments will be appended to existing telemetry {parentName}.'))
+            if not isStructure and re.match(r'^[A-Za-z_]\w*$', parentName) is None:
+                self.report.append((self.WARNING, f'{line}: telemetry name {parentName} is not a valid C identifier.'))
+            arguments = parents.setdefault(parentName, OrderedDict())
+            if argumentName in arguments:
+                self.report.append((self.ERROR, f'{line}: argument {argumentName} defined twice in {parentName}.'))
+                continue
+            arguments[argumentName] = (typeName, row['Description'])
+        # TYPES RESOLUTION
+        for parents in [self.structures, self.telemetries]:
+            for parentName, arguments in parents.items():
+                for argumentName, argument in arguments.items():
+                    if argument is not None and not self.isTypeValid(argument[0]):
+                        self.report.append((self.ERROR, f'{parentName}/{argumentName}: unknown type {argument[0]}.'))
+        nbArguments = sum(1 for arguments in self.telemetries.values() for argument in arguments.values() if argument)
+        self.report.append((self.INFO, f'{len(self.telemetries)} telemetry type(s), {nbArguments} argument(s), '
+                                       f'{len(self.units)} new unit(s), '
+                                       f'{len(self.structures) + len(self.enumerations)} new shared type(s).'))
+
+    def registerUnit(self, line, unitName, typeName):
+        baseType = re.sub(r'\[.*', '', typeName)
+        arraySize = typeName[len(baseType):]
+        if baseType in self.baseTypeNames:
+            baseType = self.baseTypesValues[self.baseTypeNames.index(baseType)]
+        if unitName in self.database.units:
+            unitBaseType = self.database.units[unitName][0].baseTypeName
+            if unitBaseType != baseType:
+                self.report.append((self.WARNING, f'{line}: unit {unitName} is a {unitBaseType}, {baseType} ignored.'))
+        elif unitName in self.units:
+            if self.units[unitName] != baseType:
+                self.report.append((self.WARNING, f'{line}: unit {unitName} already imported as {self.units[unitName]}.'))
+        elif baseType not in self.baseTypesValues:
+            self.report.append((self.ERROR, f'{line}: unit {unitName} needs a base type, not {baseType}.'))
+        else:
+            self.units[unitName] = baseType
+        return unitName + arraySize
+
+    def isTypeValid(self, typeName):
+        acceptedTypes = self.baseTypeNames + self.baseTypesValues + list(self.database.units.keys()) + \
+            list(self.units.keys()) + self.database.getSharedDataTypes() + \
+            list(self.structures.keys()) + list(self.enumerations.keys())
+        matchingArrayFormat = re.search(r'(.*?)\[(.*?)\]$', typeName)
+        if matchingArrayFormat:
+            return matchingArrayFormat.group(1) in acceptedTypes and len(matchingArrayFormat.group(2)) > 0
+        return typeName in acceptedTypes
+
+    def apply(self):
+        """
+        Apply the validated definitions in a single transaction.
+
+        :return: A new database holding the imported definitions, with the same path as the original one.
+        """
+        if self.hasErrors:
+            raise CommunicationDatabaseError('Cannot import definitions with validation errors.')
+        with TemporaryDirectory() as tempDirPath:
+            stagingPath = os.path.join(tempDirPath, os.path.basename(self.database.path))
+            self.database.save(stagingPath)
+            self._writeUnits(os.path.join(stagingPath, 'units.csv'))
+            self._writeSharedTypes(os.path.join(stagingPath, 'sharedDataTypes.json'))
+            self._writeTelemetries(os.path.join(stagingPath, 'telemetry.csv'),
+                                   os.path.join(stagingPath, 'telemetryArguments'))
+            importedDatabase = BalloonPackageDatabase(stagingPath)
+        importedDatabase.setPath(self.database.path)
+        return importedDatabase
+
+    def _writeUnits(self, unitsFilePath):
+        if not self.units:
+            return
+        newFile = not os.path.exists(unitsFilePath)
+        with open(unitsFilePath, 'a', newline='', encoding='utf-8') as file:
+            csvWriter = csv.writer(file)
+            if newFile:
+                csvWriter.writerow(['Name', 'Type', 'Description'])
+            for unitName, baseType in self.units.items():
+                csvWriter.writerow([unitName, baseType, ''])
+
+    def _writeSharedTypes(self, typesFilePath):
+        if not self.structures and not self.enumerations:
+            return
+        with open(typesFilePath, 'r', encoding='utf-8') as file:
+            types = json.load(file, object_pairs_hook=OrderedDict)
+        for enumName, (baseType, values) in self.enumerations.items():
+            # Same layout as the enumerations written by the editor, values only given when they are not implicit
+            enumValues, nextValue = OrderedDict(), 0
+            for name, value, _, description in values:
+                enumValues[name] = {'__doc__': description}
+                if value != nextValue:
+                    enumValues[name]['__value__'] = value
+                nextValue = value + 1
+            types[enumName] = {'__type__': baseType, '__values__': enumValues}
+        for structName, fields in self.structures.items():
+            types[structName] = {
+                fieldName: {'__type__': typeName, '__doc__': description} if description else typeName
+                for fieldName, (typeName, description) in fields.items()
+            }
+        with open(typesFilePath, 'w', encoding='utf-8') as outputFile:
+            json.dump(types, outputFile, indent=2, ensure_ascii=True, cls=EComValueJsonEncoder)
+
+    def _writeTelemetries(self, telemetriesFilePath, telemetryArgumentsFolder):
+        existingTelemetries = [telemetry.id.name for telemetry in self.database.telemetryTypes]
+        newFile = not os.path.exists(telemetriesFilePath)
+        with open(telemetriesFilePath, 'a', newline='', encoding='utf-8') as file:
+            csvWriter = csv.writer(file)
+            if newFile:
+                csvWriter.writerow(['Name', 'Description'])
+            for telemetryName in self.telemetries:
+                if telemetryName not in existingTelemetries:
+                    csvWriter.writerow([telemetryName, ''])
+        os.makedirs(telemetryArgumentsFolder, exist_ok=True)
+        for telemetryName, arguments in self.telemetries.items():
+            filePath = os.path.join(telemetryArgumentsFolder, telemetryName + '.csv')
+            newFile = not os.path.exists(filePath)
+            with open(filePath, 'a', newline='', encoding='utf-8') as file:
+                csvWriter = csv.writer(file)
+                if newFile:
+                    csvWriter.writerow(['Name', 'Type', 'Description'])
+                for argumentName, argument in arguments.items():
+                    if argument is not None:
+                        csvWriter.writerow([argumentName, argument[0], argument[1]])
@@ -165,6 +165,8 @@ class UnitDeletionMessageBox(QMessageBox):
 
 
 class DefaultUnitsCatalogue:
+    _sharedCatalogues = {}
+
     def __init__(self, path='sources/common/defaultUnits.csv'):
         self.csvPath = path
         if not os.path.exists(path):
@@ -173,6 +175,26 @@ class DefaultUnitsCatalogue:
                 writer.writerow(['Unit Name', 'Symbol', 'Description', 'Physical Value', 'Other Names'])
             self.feedDefaultValues()
         self.units = self.load()
+        self.unitIndex, self.normalizedIndex = {}, {}
+        self.buildIndex()
+
+    @classmethod
+    def shared(cls, path='sources/common/defaultUnits.csv'):
+        """ Catalogue instance shared by every display, the CSV file is only read once. """
+        if path not in cls._sharedCatalogues:
+            cls._sharedCatalogues[path] = cls(path)
+        return cls._sharedCatalogues[path]
+
+    def buildIndex(self):
+        # Same precedence as the former linear search : unit names, then other names and symbols in catalogue order
+        self.unitIndex = {unitName: unit for unitName, unit in self.units.items()}
+        for unit in self.units.values():
+            for otherName in unit[3]:
+                self.unitIndex.setdefault(otherName.strip(), unit)
+            self.unitIndex.setdefault(unit[0], unit)
+        self.normalizedIndex = {}
+        for name, unit in self.unitIndex.items():
+            self.normalizedIndex.setdefault(name.casefold(), unit)
 
     def load(self, csvPath=None):
         if csvPath is None:
@@ -202,18 +224,14 @@ class DefaultUnitsCatalogue:
                 symbol, description, physical_value, other_names = values
                 other_names_str = ','.join(other_names) if other_names else ''
                 writer.writerow([unit_name, symbol, description, physical_value, other_names_str])
+        if units is self.units:
+            self.buildIndex()
 
     def find(self, unitName):
-        # Check in the keys
-        if unitName in self.units:
-            return self.units[unitName]
-        # Search in the other names column
-        for unit in self.units.values():
-            if unitName in unit[3]:
-                return unit
-            if unitName == unit[0]:
-                return unit
-        return None
+        unit = self.unitIndex.get(unitName)
+        if unit is None:
+            unit = self.normalizedIndex.get(unitName.strip().casefold())
+        return unit
 
     def getSymbol(self, unitName):
         unit = self.find(unitName)
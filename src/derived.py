@@ -0,0 +1,307 @@
+######################## IMPORTS ########################
+import ast
+import csv
+import json
+import os
+import time
+from functools import partial
+
+import numpy as np
+
+# --------------------- Sources ----------------------- #
+from sources.databases.balloondata import BalloonPackageDatabase
+
+######################## CONSTANTS ########################
+DERIVED_FILE = 'derived.json'
+# Dimension, scale and offset bringing a value of each catalogue unit to the reference unit of its dimension
+UNIT_CONVERSIONS = {
+    'Second': ('Time', 1.0, 0.0), 'Millisecond': ('Time', 1e-3, 0.0), 'Microsecond': ('Time', 1e-6, 0.0),
+    'Nanosecond': ('Time', 1e-9, 0.0), 'Minute': ('Time', 60.0, 0.0), 'Hour': ('Time', 3600.0, 0.0),
+    'Day': ('Time', 86400.0, 0.0), 'Week': ('Time', 604800.0, 0.0),
+    'Meter': ('Length', 1.0, 0.0), 'Kilometer': ('Length', 1e3, 0.0),
+    'Meter per second': ('Speed', 1.0, 0.0), 'Kilometer per hour': ('Speed', 1 / 3.6, 0.0),
+    'Meter per second squared': ('Acceleration', 1.0, 0.0), 'Gravity': ('Acceleration', 9.80665, 0.0),
+    'Parts per million': ('Concentration', 1e-6, 0.0), 'Parts per billion': ('Concentration', 1e-9, 0.0),
+    'Percent': ('Concentration', 1e-2, 0.0),
+    'Celsius': ('Temperature', 1.0, 273.15), 'Fahrenheit': ('Temperature', 5 / 9, 273.15 - 160 / 9),
+    'Kelvin': ('Temperature', 1.0, 0.0), 'Rankine': ('Temperature', 5 / 9, 0.0),
+    'Pascal': ('Pressure', 1.0, 0.0), 'Bar': ('Pressure', 1e5, 0.0), 'Millibar': ('Pressure', 100.0, 0.0),
+    'Pound per square inch': ('Pressure', 6894.757293168, 0.0),
+    'Degree': ('Angle', np.pi / 180, 0.0), 'Radian': ('Angle', 1.0, 0.0),
+    'Degree per second': ('Angular Speed', np.pi / 180, 0.0), 'Radian per second': ('Angular Speed', 1.0, 0.0),
+    'Revolution per minute': ('Angular Speed', np.pi / 30, 0.0),
+    'Lux': ('Illuminance', 1.0, 0.0), 'Foot-candle': ('Illuminance', 10.763910417, 0.0),
+    'Volt': ('Voltage', 1.0, 0.0), 'Millivolt': ('Voltage', 1e-3, 0.0), 'Microvolt': ('Voltage', 1e-6, 0.0),
+    'Ampere': ('Electric Current', 1.0, 0.0), 'Milliampere': ('Electric Current', 1e-3, 0.0),
+    'Microampere': ('Electric Current', 1e-6, 0.0),
+    'Hertz': ('Frequency', 1.0, 0.0), 'Kilohertz': ('Frequency', 1e3, 0.0), 'Megahertz': ('Frequency', 1e6, 0.0),
+    'Tesla': ('Magnetic Field', 1.0, 0.0), 'Millitesla': ('Magnetic Field', 1e-3, 0.0),
+    'Microtesla': ('Magnetic Field', 1e-6, 0.0),
+}
+FUNCTIONS = {
+    'sqrt': np.sqrt, 'abs': np.abs, 'exp': np.exp, 'log': np.log, 'log10': np.log10,
+    'sin': np.sin, 'cos': np.cos, 'tan': np.tan, 'arcsin': np.arcsin, 'arccos': np.arccos, 'arctan': np.arctan,
+    'arctan2': np.arctan2, 'degrees': np.degrees, 'radians': np.radians, 'minimum': np.minimum,
+    'maximum': np.maximum, 'clip': np.clip, 'where': np.where, 'round': np.round,
+    'pi': np.pi, 'g0': 9.80665,
+}
+STATEFUL_FUNCTIONS = ('rate', 'delta')
+ALLOWED_NODES = (ast.Expression, ast.BinOp, ast.UnaryOp, ast.Compare, ast.Call, ast.Name, ast.Load, ast.Constant,
+                 ast.Subscript, ast.Tuple, ast.IfExp, ast.operator, ast.unaryop, ast.cmpop) + \
+                ((ast.Index,) if hasattr(ast, 'Index') else ())
+
+
+######################## FUNCTIONS ########################
+def loadDerivedDefinitions(path):
+    """ Expression of each 'parser/type/name' derived channel, an absent file meaning there is none. """
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+
+def loadUnitAliases(csvPath):
+    """
+    Catalogue unit name of every unit name, symbol and other name of the default units catalogue. This follows
+    DefaultUnitsCatalogue.buildIndex, which is not reused because databases.units imports PyQt5 and derived channels
+    are also evaluated by the headless ground station.
+    """
+    units = {}
+    if not os.path.exists(csvPath):
+        return {}
+    with open(csvPath, encoding='utf-8', newline='') as file:
+        reader = csv.reader(file)
+        next(reader, None)
+        for row in reader:
+            if len(row) >= 5 and row[0]:
+                units[row[0]] = [row[1]] + row[4].split(',')
+    # Same precedence as the catalogue : unit names, then other names and symbols in catalogue order
+    aliases = {unitName.casefold(): unitName for unitName in units}
+    for unitName, (symbol, *otherNames) in units.items():
+        for alias in otherNames + [symbol]:
+            if alias.strip():
+                aliases.setdefault(alias.strip().casefold(), unitName)
+    return aliases
+
+
+def toColumn(values):
+    """ Stack the stored values of an argument into arrays, structures becoming dictionaries of columns. """
+    if values and isinstance(values[0], dict):
+        return {key: toColumn([value[key] for value in values]) for key in values[0]}
+    return np.asarray(values, dtype=float)
+
+
+def toSample(value):
+    if isinstance(value, dict):
+        return {key: toSample(item) for key, item in value.items()}
+    try:
+        return np.asarray(value, dtype=float)
+    except (TypeError, ValueError):
+        return value
+
+
+def toRecordValue(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist() if value.ndim > 0 else float(value)
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _norm(value, sampleAxes=0):
+    if isinstance(value, dict):
+        return np.sqrt(sum(np.square(np.asarray(item, dtype=float)) for item in value.values()))
+    value = np.asarray(value, dtype=float)
+    return np.linalg.norm(value, axis=-1) if value.ndim > sampleAxes else np.abs(value)
+
+
+def _difference(states, times, slot, value, rate=False):
+    value, times = np.asarray(value, dtype=float), np.asarray(times, dtype=float)
+    previous = states[slot]
+    if times.ndim == 0:
+        states[slot] = value, times
+        if previous is None:
+            return np.full_like(value, np.nan)
+        difference = value - previous[0]
+        return difference / (times - previous[1]) if rate else difference
+    # Whole columns, the previous row of each value being the one before it
+    previousValue, previousTime = previous if previous is not None else (np.full_like(value[0], np.nan), np.nan)
+    states[slot] = value[-1], times[-1]
+    difference = value - np.concatenate([np.asarray(previousValue)[np.newaxis], value[:-1]])
+    if not rate:
+        return difference
+    elapsed = times - np.concatenate([[previousTime], times[:-1]])
+    return difference / elapsed.reshape((-1,) + (1,) * (difference.ndim - 1))
+
+
+######################## CLASSES ########################
+class DerivedChannelError(ValueError):
+    pass
+
+
+class DerivedChannel:
+    """
+    Channel computed from the other arguments of its telemetry type. The expression is checked and compiled once, then
+    evaluated on NumPy values : one sample per packet at ingest, or whole columns when completing a loaded session.
+    """
+
+    def __init__(self, path, expression, argumentUnits=None, unitAliases=None):
+        keys = path.split('/')
+        if len(keys) != 3 or not all(keys):
+            raise DerivedChannelError(f"{path} : derived channels are named 'parser/type/name'.")
+        self.path, self.expression = path, expression
+        self.parser, self.type, self.name = keys
+        self.argumentUnits, self.unitAliases = argumentUnits or {}, unitAliases or {}
+        self.arguments, self.nbStates = set(), 0
+        try:
+            tree = ast.parse(expression, mode='eval')
+        except SyntaxError as error:
+            raise DerivedChannelError(f"{path} : invalid expression ({error.msg}).")
+        tree = ast.fix_missing_locations(self.rewrite(tree))
+        self.code = compile(tree, path, 'eval')
+        self.states = [None] * self.nbStates
+
+    def rewrite(self, node):
+        if not isinstance(node, ALLOWED_NODES):
+            raise DerivedChannelError(f"{self.path} : '{type(node).__name__}' is not allowed in derived channels.")
+        if isinstance(node, ast.Call):
+            if not isinstance(node.func, ast.Name) or node.keywords:
+                raise DerivedChannelError(f"{self.path} : only plain calls of the available functions are allowed.")
+            name = node.func.id
+            if name == 'convert':
+                return self.rewriteConversion(node)
+            if name in STATEFUL_FUNCTIONS:
+                # Each call site keeps its own previous value
+                node.func = ast.Name(id=f'_{name}', ctx=ast.Load())
+                node.args.insert(0, ast.Constant(value=self.nbStates))
+                self.nbStates += 1
+            elif name not in FUNCTIONS and name != 'norm':
+                raise DerivedChannelError(f"{self.path} : unknown function '{name}'.")
+            node.args = [self.rewrite(argument) for argument in node.args]
+            return node
+        if isinstance(node, ast.Name) and node.id not in FUNCTIONS:
+            self.arguments.add(node.id)
+        for field, value in ast.iter_fields(node):
+            if isinstance(value, ast.AST):
+                setattr(node, field, self.rewrite(value))
+            elif isinstance(value, list):
+                setattr(node, field, [self.rewrite(item) if isinstance(item, ast.AST) else item for item in value])
+        return node
+
+    def rewriteConversion(self, node):
+        """ convert(value, 'to') or convert(value, 'from', 'to') becomes an affine expression of the value. """
+        units = node.args[1:]
+        if len(units) not in (1, 2) or not all(isinstance(unit, ast.Constant) and isinstance(unit.value, str)
+                                               for unit in units):
+            raise DerivedChannelError(f"{self.path} : convert takes a value and one or two unit names.")
+        if len(units) == 1:
+            sourceUnit = self.argumentUnit(node.args[0])
+            if sourceUnit is None:
+                raise DerivedChannelError(f"{self.path} : the unit of the converted value is not in the database.")
+            targetUnit = units[0].value
+        else:
+            sourceUnit, targetUnit = units[0].value, units[1].value
+        (sourceDimension, sourceScale, sourceOffset), (targetDimension, targetScale, targetOffset) = \
+            self.unitConversion(sourceUnit), self.unitConversion(targetUnit)
+        if sourceDimension != targetDimension:
+            raise DerivedChannelError(f"{self.path} : cannot convert {sourceUnit} into {targetUnit}.")
+        scale, offset = sourceScale / targetScale, (sourceOffset - targetOffset) / targetScale
+        return ast.BinOp(left=ast.BinOp(left=self.rewrite(node.args[0]), op=ast.Mult(), right=ast.Constant(value=scale)),
+                         op=ast.Add(), right=ast.Constant(value=offset))
+
+    def argumentUnit(self, node):
+        keys = []
+        while isinstance(node, ast.Subscript):
+            index = node.slice.value if hasattr(ast, 'Index') and isinstance(node.slice, ast.Index) else node.slice
+            if not isinstance(index, ast.Constant):
+                return None
+            keys.append(index.value)
+            node = node.value
+        if not isinstance(node, ast.Name):
+            return None
+        unit = self.argumentUnits.get(node.id)
+        for key in reversed(keys):
+            unit = unit.get(key) if isinstance(unit, dict) else None
+        return unit if isinstance(unit, str) else None
+
+    def unitConversion(self, unitName):
+        catalogueName = self.unitAliases.get(unitName.strip().casefold(), unitName)
+        if catalogueName not in UNIT_CONVERSIONS:
+            raise DerivedChannelError(f"{self.path} : no conversion known for unit '{unitName}'.")
+        return UNIT_CONVERSIONS[catalogueName]
+
+    def evaluate(self, values, times, states, sampleAxes=0):
+        namespace = dict(FUNCTIONS, **values)
+        namespace['norm'] = partial(_norm, sampleAxes=sampleAxes)
+        namespace['_rate'] = lambda slot, value: _difference(states, times, slot, value, rate=True)
+        namespace['_delta'] = lambda slot, value: _difference(states, times, slot, value)
+        with np.errstate(all='ignore'):
+            return eval(self.code, {'__builtins__': {}}, namespace)
+
+
+class DerivedChannels:
+    def __init__(self, definitions, databases=None, unitAliases=None):
+        self.channels, self.errors = {}, []
+        databases = databases or {}
+        for path, expression in definitions.items():
+            keys = path.split('/')
+            argumentUnits = {}
+            database = databases.get(keys[0])
+            if database is not None and len(keys) > 1 and keys[1] in [telemetryType.id.name
+                                                                      for telemetryType in database.telemetryTypes]:
+                _, argumentUnits = database.nestedPythonTypes(keys[1], (int, float))
+            try:
+                channel = DerivedChannel(path, expression, argumentUnits, unitAliases)
+            except DerivedChannelError as error:
+                self.errors.append(str(error))
+                continue
+            self.channels.setdefault((channel.parser, channel.type), []).append(channel)
+
+    @classmethod
+    def fromDirectory(cls, path):
+        definitions = loadDerivedDefinitions(os.path.join(path, DERIVED_FILE))
+        databases = {}
+        for parserName in {definition.split('/')[0] for definition in definitions}:
+            parserPath = os.path.join(path, 'parsers', parserName)
+            if os.path.isdir(parserPath):
+                databases[parserName] = BalloonPackageDatabase(parserPath)
+        unitAliases = loadUnitAliases(os.path.join(path, 'sources', 'common', 'defaultUnits.csv'))
+        return cls(definitions, databases, unitAliases)
+
+    def __len__(self):
+        return sum(len(channels) for channels in self.channels.values())
+
+    def names(self, parser, telemetryType):
+        return [channel.name for channel in self.channels.get((parser, telemetryType), [])]
+
+    def apply(self, record):
+        """ Add the derived channels of a record to its data, in definition order so they can build on each other. """
+        channels = self.channels.get((record['parser'], record['type']))
+        if channels is None:
+            return record
+        values = {name: toSample(value) for name, value in record['data'].items()}
+        for channel in channels:
+            try:
+                value = channel.evaluate(values, record.get('time', time.time()), channel.states)
+            except (ArithmeticError, LookupError, NameError, TypeError, ValueError):
+                value = np.nan
+            values[channel.name] = value
+            record['data'][channel.name] = toRecordValue(value)
+        return record
+
+    def evaluateColumns(self, parser, telemetryType, columns, times):
+        """ Derived channels missing from the columns of a telemetry type, evaluated on all stored values at once. """
+        channels = [channel for channel in self.channels.get((parser, telemetryType), []) if channel.name not in columns]
+        values, times, derived = {}, np.asarray(times, dtype=float), {}
+        for channel in channels:
+            for argument in channel.arguments - values.keys():
+                if argument in columns:
+                    values[argument] = toColumn(columns[argument])
+            try:
+                value = channel.evaluate(values, times, [None] * channel.nbStates, sampleAxes=1)
+                value = np.broadcast_to(value, np.shape(times) + np.shape(value)[1:])
+            except (ArithmeticError, LookupError, NameError, TypeError, ValueError):
+                value = np.full(len(times), np.nan)
+            values[channel.name] = value
+            derived[channel.name] = [toRecordValue(item) for item in value]
+        return derived
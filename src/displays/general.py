@@ -12,8 +12,11 @@ from sources.common.utilities.fileSystem import loadSettings, nameGiving
 from sources.common.widgets.Widgets import ContentStorage
 from sources.common.widgets.basic import BasicDisplay
 from sources.displays.graphs import MultiCurveGraph
-from sources.displays.vtk import VtkDisplay
+from sources.displays.vtk import VtkDisplay, TrajectoryDisplay
 from sources.displays.indicators import SingleIndicator, GridIndicator
+from sources.displays.playback import PlaybackController
+from sources.displays.status import TelemetryStatusDock
+from sources.sessions import loadSession
 
 
 ######################## CLASSES ########################
@@ -36,20 +39,38 @@ class DisplayTabWidget(QMainWindow):
         self.setCentralWidget(self.tabWidget)
         self.tabWidget.tabBarDoubleClicked.connect(self.onTabBarDoubleClicked)
         self.tabWidget.currentChanged.connect(self.tabChanged)
+        self.playback = PlaybackController(self, self.content)
+        self.statusDock = TelemetryStatusDock(self.content, self)
+        self.addDockWidget(Qt.BottomDockWidgetArea, self.statusDock)
+        self.statusDock.hide()
+        self.layoutRevision = 0
+        self.suspended = False
+        self.tabWidget.tabBar().tabMoved.connect(self.markLayoutChanged)
+
+    def markLayoutChanged(self, *_):
+        self.layoutRevision += 1
+
+    def addDisplayDock(self, tabWidget: QMainWindow, area, dockWidget):
+        tabWidget.addDockWidget(area, dockWidget)
+        dockWidget.layoutChanged.connect(self.markLayoutChanged)
+        self.markLayoutChanged()
 
     def closeCurrentTab(self):
         currentTabIndex = self.tabWidget.currentIndex()
         self.tabWidget.removeTab(currentTabIndex)
+        self.markLayoutChanged()
 
     def closeAllTabs(self):
         while self.tabWidget.count() > 0:
             self.tabWidget.removeTab(0)
+        self.markLayoutChanged()
 
     def addNewTab(self, name=None):
         if name is None:
             tabNames = [self.tabWidget.tabText(i) for i in range(self.tabWidget.count())]
             name = nameGiving(tabNames, baseName='Tab', firstName=False)
         self.tabWidget.addTab(QMainWindow(), name)
+        self.markLayoutChanged()
 
     def onTabBarDoubleClicked(self, index):
         tabName = self.tabWidget.tabText(index)
@@ -65,16 +86,33 @@ class DisplayTabWidget(QMainWindow):
         tabBar = self.tabWidget.tabBar()
         self.tabWidget.setTabText(index, lineEdit.text())
         tabBar.setTabButton(index, tabBar.ButtonPosition.LeftSide, None)
+        self.markLayoutChanged()
+
+    def setSuspended(self, suspended):
+        """ Stops refreshing the displays while they cannot be seen, resuming with a single catch-up refresh. """
+        if suspended == self.suspended:
+            return
+        self.suspended = suspended
+        self.statusDock.onVisibilityChanged(not suspended and self.statusDock.isVisible())
+        if not suspended:
+            self.tabChanged()
 
     def tabChanged(self):
+        if self.suspended:
+            return
         currentIndex = self.tabWidget.currentIndex()
         if currentIndex != -1:
             tab = self.tabWidget.widget(currentIndex)
+            self.materializeTab(tab)
             for widget in tab.findChildren(QDockWidget):
                 widget.display.updateContent(self.content)
 
     def updateTabDisplays(self, content):
+        if self.playback.active:
+            self.stopPlayback()
         self.content.append(content)
+        if self.suspended:
+            return
         currentIndex = self.tabWidget.currentIndex()
         if currentIndex != -1:
             tab = self.tabWidget.widget(currentIndex)
@@ -82,6 +120,32 @@ class DisplayTabWidget(QMainWindow):
                 if dock.isVisible():
                     dock.display.updateContent(self.content)
 
+    def updateAlarms(self, events):
+        self.content.setAlarms(events)
+        if self.suspended:
+            return
+        # Only the displays showing an argument whose alarm changed are touched, other tabs catch up when shown
+        arguments = {event['argument'] for event in events}
+        currentIndex = self.tabWidget.currentIndex()
+        if currentIndex != -1:
+            tab = self.tabWidget.widget(currentIndex)
+            for dock in tab.findChildren(QDockWidget):
+                if dock.isVisible():
+                    dock.display.updateAlarms(self.content, arguments)
+
+    def loadSession(self, path):
+        self.content.clear()
+        nbRecords = loadSession(path, self.content)
+        self.content.completeDerivedChannels()
+        self.playback.start()
+        self.tabChanged()
+        return nbRecords
+
+    def stopPlayback(self):
+        self.playback.stop()
+        self.content.clear()
+        self.tabChanged()
+
     def addSimpleIndicator(self):
         if self.tabWidget.count() == 0:
             self.addNewTab()
@@ -89,7 +153,7 @@ class DisplayTabWidget(QMainWindow):
         widgetNames = [dock.windowTitle() for dock in currentTabWidget.findChildren(QDockWidget) if dock.isVisible()]
         newIndicatorName = nameGiving(widgetNames, baseName='Indicator', firstName=False)
         newDockWidget = DisplayDockWidget(newIndicatorName, widget=SingleIndicator(path=self.currentDir))
-        currentTabWidget.addDockWidget(self.areaCycler.next(), newDockWidget)
+        self.addDisplayDock(currentTabWidget, self.areaCycler.next(), newDockWidget)
 
     def addGridIndicator(self):
         if self.tabWidget.count() == 0:
@@ -98,7 +162,7 @@ class DisplayTabWidget(QMainWindow):
         widgetNames = [dock.windowTitle() for dock in currentTabWidget.findChildren(QDockWidget) if dock.isVisible()]
         newIndicatorName = nameGiving(widgetNames, baseName='Grid', firstName=False)
         newDockWidget = DisplayDockWidget(newIndicatorName, widget=GridIndicator(path=self.currentDir))
-        currentTabWidget.addDockWidget(self.areaCycler.next(), newDockWidget)
+        self.addDisplayDock(currentTabWidget, self.areaCycler.next(), newDockWidget)
 
     def addMultiCurveGraph(self):
         if self.tabWidget.count() == 0:
@@ -107,7 +171,7 @@ class DisplayTabWidget(QMainWindow):
         widgetNames = [dock.windowTitle() for dock in currentTabWidget.findChildren(QDockWidget) if dock.isVisible()]
         newIndicatorName = nameGiving(widgetNames, baseName='Graph', firstName=False)
         newDockWidget = DisplayDockWidget(newIndicatorName, widget=MultiCurveGraph(path=self.currentDir))
-        currentTabWidget.addDockWidget(self.areaCycler.next(), newDockWidget)
+        self.addDisplayDock(currentTabWidget, self.areaCycler.next(), newDockWidget)
 
     def addVtkDisplay(self):
         if self.tabWidget.count() == 0:
@@ -116,13 +180,25 @@ class DisplayTabWidget(QMainWindow):
         widgetNames = [dock.windowTitle() for dock in currentTabWidget.findChildren(QDockWidget) if dock.isVisible()]
         newDisplayName = nameGiving(widgetNames, baseName='Display', firstName=False)
         newDockWidget = DisplayDockWidget(newDisplayName, widget=VtkDisplay(path=self.currentDir))
-        currentTabWidget.addDockWidget(self.areaCycler.next(), newDockWidget)
+        self.addDisplayDock(currentTabWidget, self.areaCycler.next(), newDockWidget)
+
+    def addTrajectoryDisplay(self):
+        if self.tabWidget.count() == 0:
+            self.addNewTab()
+        currentTabWidget = self.tabWidget.currentWidget()
+        widgetNames = [dock.windowTitle() for dock in currentTabWidget.findChildren(QDockWidget) if dock.isVisible()]
+        newDisplayName = nameGiving(widgetNames, baseName='Trajectory', firstName=False)
+        newDockWidget = DisplayDockWidget(newDisplayName, widget=TrajectoryDisplay(path=self.currentDir))
+        self.addDisplayDock(currentTabWidget, self.areaCycler.next(), newDockWidget)
 
     def getLayoutDescription(self):
         tabs = [self.tabWidget.widget(index) for index in range(self.tabWidget.count())]
         tabNames = [self.tabWidget.tabText(index) for index in range(self.tabWidget.count())]
         description = {}
         for tab, tabName in zip(tabs, tabNames):
+            if getattr(tab, 'pendingDescription', None) is not None:
+                description[tabName] = tab.pendingDescription
+                continue
             tabDescription = {}
             for dockWidget in tab.findChildren(QDockWidget):
                 if dockWidget.isVisible() and isinstance(dockWidget, DisplayDockWidget):
@@ -142,31 +218,48 @@ class DisplayTabWidget(QMainWindow):
 
         return description
 
-    def applyLayoutDescription(self, description: dict):
+    def applyLayoutDescription(self, description: dict, lazy=True):
         self.tabWidget.clear()
+        for i, (tabName, tabContents) in enumerate(description.items()):
+            self.addNewTab(name=tabName)
+            # Hidden tabs only keep their description until they are shown for the first time
+            self.tabWidget.widget(i).pendingDescription = tabContents
+            if not lazy or i == self.tabWidget.currentIndex():
+                self.materializeTab(self.tabWidget.widget(i))
+
+    def materializeTab(self, tabWidget: QMainWindow):
+        tabContents = getattr(tabWidget, 'pendingDescription', None)
+        if tabContents is None:
+            return
+        tabWidget.pendingDescription = None
         dockAreas = {1: Qt.LeftDockWidgetArea, 2: Qt.RightDockWidgetArea, 4: Qt.TopDockWidgetArea, 8: Qt.BottomDockWidgetArea}
         displayOptions = {'SINGLE_INDICATOR': SingleIndicator, 'GRID_INDICATOR': GridIndicator,
                           'MULTI_CURVE_GRAPH': MultiCurveGraph, 'VTK_DISPLAY': VtkDisplay,
+                          'TRAJECTORY_DISPLAY': TrajectoryDisplay,
                           'BASIC_DISPLAY': BasicDisplay}
-        for i, (tabName, tabContents) in enumerate(description.items()):
-            self.addNewTab(name=tabName)
-            tabWidget = self.tabWidget.widget(i)
-            geometries = []
-            for displayName, value in tabContents.items():
-                displayWidget = displayOptions[value['DISPLAY']['DISPLAY_TYPE']](self.currentDir)
-                dockWidget = DisplayDockWidget(name=displayName, widget=displayWidget)
-                geometries.append(value['GEOMETRY'])
-                dockPlacement = value['AREA_PLACEMENT']
-                tabWidget.addDockWidget(dockAreas.get(dockPlacement, Qt.NoDockWidgetArea), dockWidget)
-                dockWidget.display.applyDescription(value['DISPLAY'])
-
-            dockWidgets = [dock for dock in self.findChildren(QDockWidget)]
-            for dockWidget, geometry in zip(dockWidgets, geometries):
-                dockWidget.setGeometry(QRect(*geometry))
-                dockWidget.repaint()
+        # Building the docks of a described tab does not change the layout itself
+        layoutRevision = self.layoutRevision
+        dockWidgets, geometries = [], []
+        for displayName, value in tabContents.items():
+            displayWidget = displayOptions[value['DISPLAY']['DISPLAY_TYPE']](self.currentDir)
+            dockWidget = DisplayDockWidget(name=displayName, widget=displayWidget)
+            dockWidgets.append(dockWidget)
+            geometries.append(value['GEOMETRY'])
+            dockPlacement = value['AREA_PLACEMENT']
+            self.addDisplayDock(tabWidget, dockAreas.get(dockPlacement, Qt.NoDockWidgetArea), dockWidget)
+            dockWidget.display.applyDescription(value['DISPLAY'])
+
+        for dockWidget, geometry in zip(dockWidgets, geometries):
+            dockWidget.setGeometry(QRect(*geometry))
+            dockWidget.repaint()
+            dockWidget.resizeTimer.stop()
+        self.layoutRevision = layoutRevision
 
 
 class DisplayDockWidget(QDockWidget):
+    layoutChanged = pyqtSignal()
+    RESIZE_DELAY = 500
+
     def __init__(self, name: str, widget: Optional[BasicDisplay] = None):
         super().__init__()
         self.dockingProperties = {'MOVING': True, 'FLOATING': True, 'CLOSABLE': True, 'TITLEBAR': True}
@@ -183,6 +276,14 @@ class DisplayDockWidget(QDockWidget):
         layout = QVBoxLayout(self.display)
         layout.addWidget(self.hoverButton)
         self.resize(500, 500)
+        # Dragging a separator resizes the dock continuously, the layout is only marked once it settles
+        self.resizeTimer = QTimer(self)
+        self.resizeTimer.setSingleShot(True)
+        self.resizeTimer.setInterval(self.RESIZE_DELAY)
+        self.resizeTimer.timeout.connect(self.layoutChanged.emit)
+        self.windowSize = None
+        self.dockLocationChanged.connect(lambda _: self.layoutChanged.emit())
+        self.topLevelChanged.connect(lambda _: self.layoutChanged.emit())
 
     def enterEvent(self, event):
         self.hoverButton.animation.setStartValue(self.hoverButton.pos())
@@ -222,6 +323,7 @@ class DisplayDockWidget(QDockWidget):
             self.setWindowTitle(name)
             self.setTitleBarWidget(None if showTitleBar else QWidget())
             self.display.applyChanges(widget if widget is not None else dialog.editWidget)
+            self.layoutChanged.emit()
 
         dialog.applied.connect(applySettingsChanges)
         result = dialog.exec_()
@@ -229,7 +331,15 @@ class DisplayDockWidget(QDockWidget):
             # TODO : Add Code to allow canceling feature for changes already applied to the display and dockwidget
             applySettingsChanges(dialog.editWidget)
 
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        windowSize, self.windowSize = self.windowSize, self.window().size()
+        # Docks laid out when shown or when the main window is resized were not changed by the user
+        if self.isVisible() and event.oldSize().isValid() and (self.isFloating() or windowSize == self.windowSize):
+            self.resizeTimer.start()
+
     def closeEvent(self, event):
+        self.layoutChanged.emit()
         del self.display
         super().closeEvent(event)
         del self
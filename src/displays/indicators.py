@@ -10,6 +10,7 @@ from PyQt5.QtCore import *
 from PyQt5.QtGui import *
 
 # --------------------- Sources ----------------------- #
+from sources.alarms import NOMINAL, ALARM_COLORS, alarmStyleSheet
 from sources.common.utilities.fileSystem import loadSettings, nameGiving
 from sources.common.widgets.Widgets import ArgumentSelector
 from sources.common.widgets.basic import BasicDisplay
@@ -23,7 +24,10 @@ class SingleIndicator(BasicDisplay):
         self.textAlignment = 0
         self.lastValue = None
         self.argument, self.argumentUnit, self.showUnit = '', None, False
-        self.catalogue = DefaultUnitsCatalogue()
+        self.unitSymbol = None
+        self.argumentMapping, self.textFormat, self.placeholderText = [], None, ''
+        self.valueCount, self.displayedText = None, None
+        self.alarmLevel = NOMINAL
         self.indicatorLabel = QLabel('')
         self.settingsWidget = SingleIndicatorEditDialog(self.currentDir, self)
 
@@ -45,7 +49,7 @@ class SingleIndicator(BasicDisplay):
         return description
 
     def applyDescription(self, description):
-        self.argument = description['ARGUMENT']
+        self.setArgument(description['ARGUMENT'])
         self.showUnit = bool(description['SHOW_UNIT'])
         font = QFont(description['FONT_FAMILY'])
         fontSize = description['FONT_SIZE']
@@ -84,38 +88,49 @@ class SingleIndicator(BasicDisplay):
             self.indicatorLabel.setAlignment(Qt.AlignRight | Qt.AlignVCenter)
             self.textAlignment = 2
         self.showUnit = editWidget.unitCheckbox.isChecked()
-        self.argumentUnit = editWidget.argumentUnit
-        self.argument = editWidget.argumentEdit.text()
+        self.setArgumentUnit(editWidget.argumentUnit)
+        self.setArgument(editWidget.argumentEdit.text())
         self.updateContent()
 
     def updateContent(self, content=None):
-        self.generalSettings = loadSettings('settings')
-        argumentMapping = self.argument.split('/')
-        if argumentMapping != ['']:
-            if content is None:
-                value = ''
-            else:
-                value = content.retrieveStoredContent(argumentMapping)
-            if len(value) > 0:
-                displayedText = str(value[-1])
-                self.lastValue = value[-1]
-            else:
-                if self.argumentUnit is not None:
-                    if issubclass(self.argumentUnit.type, float):
-                        displayedText = '____.__'
-                    else:
-                        displayedText = '____'
-                else:
-                    displayedText = '____'
-            self.lastValue = displayedText
-            if self.showUnit:
-                symbol = self.catalogue.getSymbol(self.argumentUnit.name)
-                if symbol is not None:
-                    displayedText += ' ' + symbol
-                else:
-                    displayedText += ' ' + self.argumentUnit.name
+        if not self.argumentMapping:
+            return
+        if self.textFormat is None:
+            self.compileTextFormat()
+        self.refreshAlarmLevel(content)
+        value, valueCount = (None, 0) if content is None else content.retrieveLatestContent(self.argumentMapping)
+        # Packets of other telemetries leave the number of values of this argument unchanged
+        if content is not None and valueCount == self.valueCount:
+            return
+        self.valueCount, self.lastValue = valueCount, value
+        displayedText = self.textFormat.format(value) if valueCount > 0 else self.placeholderText
+        if displayedText != self.displayedText:
+            self.displayedText = displayedText
             self.indicatorLabel.setText(displayedText)
 
+    def updateAlarms(self, content, arguments):
+        if self.argumentMapping and self.argument in arguments:
+            self.refreshAlarmLevel(content)
+
+    def refreshAlarmLevel(self, content=None):
+        alarmLevel = NOMINAL if content is None else content.retrieveAlarmLevel(self.argument)
+        if alarmLevel != self.alarmLevel:
+            self.alarmLevel = alarmLevel
+            self.indicatorLabel.setStyleSheet(alarmStyleSheet(alarmLevel))
+
+    def setArgument(self, argument):
+        self.argument = argument
+        self.argumentMapping = argument.split('/') if argument != '' else []
+        self.valueCount = None
+
+    def compileTextFormat(self):
+        unitText = ' ' + self.unitSymbol if self.showUnit and self.unitSymbol is not None else ''
+        self.textFormat = '{}' + unitText.replace('{', '{{').replace('}', '}}')
+        if self.argumentUnit is not None and issubclass(self.argumentUnit.type, float):
+            self.placeholderText = '____.__' + unitText
+        else:
+            self.placeholderText = '____' + unitText
+
     def retrieveArgumentUnit(self, argument):
 
         def getUnit(level, keys):
@@ -133,7 +148,15 @@ class SingleIndicator(BasicDisplay):
         database, telemetry, argument = argument[0], argument[1], argument[2:]
         selectedTypes, selectedUnits = dialog.databases[database].nestedPythonTypes(telemetry, (int, float))
         unitName = getUnit(selectedUnits, argument)
-        self.argumentUnit = dialog.databases[database].units[unitName][0] if unitName is not None else None
+        self.setArgumentUnit(dialog.databases[database].units[unitName][0] if unitName is not None else None)
+
+    def setArgumentUnit(self, argumentUnit):
+        self.argumentUnit, self.textFormat, self.valueCount = argumentUnit, None, None
+        if argumentUnit is None:
+            self.unitSymbol = None
+        else:
+            symbol = self.catalogue.getSymbol(argumentUnit.name)
+            self.unitSymbol = symbol if symbol is not None else argumentUnit.name
 
 
 class SingleIndicatorEditDialog(QWidget):
@@ -242,13 +265,15 @@ class GridIndicator(BasicDisplay):
         self.labelGridLayout = QGridLayout()
         self.setLayout(self.labelGridLayout)
         self.nbRows, self.nbColumns = 1, 1
+        self.renderer, self.board = 'WIDGETS', None
         firstIndicator = LabeledIndicator(self.currentDir, 'Value 0', self)
         self.indicators = {(0, 0): firstIndicator}
         self.labelGridLayout.addWidget(self.indicators[(0, 0)], 0, 0, 1, 1)
         self.settingsWidget = GridIndicatorEditDialog(self.currentDir, self)
 
     def getDescription(self):
-        gridDescription = {'DISPLAY_TYPE': 'GRID_INDICATOR', 'DIMENSIONS': [self.nbRows, self.nbColumns]}
+        gridDescription = {'DISPLAY_TYPE': 'GRID_INDICATOR', 'DIMENSIONS': [self.nbRows, self.nbColumns],
+                           'RENDERER': self.renderer}
         for i in range(self.nbRows):
             for j in range(self.nbColumns):
                 indicator = self.indicators[(i, j)]
@@ -270,13 +295,14 @@ class GridIndicator(BasicDisplay):
             self.labelGridLayout.removeWidget(widget)
             widget.setParent(None)
         self.nbRows, self.nbColumns = description['DIMENSIONS']
+        self.renderer = description.get('RENDERER', 'WIDGETS')
         for i in range(self.nbRows):
             for j in range(self.nbColumns):
                 indicatorDescription = description[f'{i},{j}']
                 indicator = LabeledIndicator(self.currentDir, '', self)
                 indicator.applyDescription(indicatorDescription)
                 self.indicators[(i, j)] = indicator
-                self.labelGridLayout.addWidget(self.indicators[(i, j)], i, j, 1, 1)
+        self.arrangeIndicators()
         self.settingsWidget = GridIndicatorEditDialog(self.currentDir, self)
 
     def generateSettingsWidget(self):
@@ -285,34 +311,158 @@ class GridIndicator(BasicDisplay):
     def fillGrid(self, editWidget=None):
         if editWidget is None:
             editWidget = self.settingsWidget
-        # Removing Old Widgets
-        while self.labelGridLayout.count() > 0:
-            widget = self.labelGridLayout.itemAt(0).widget()
-            self.labelGridLayout.removeWidget(widget)
-            widget.setParent(None)
-        # Adding New Widgets
         for i in range(self.nbRows):
             for j in range(self.nbColumns):
                 labelEditor = editWidget.labelEditors[(i, j)]
                 if (i, j) not in self.indicators:
                     self.indicators[(i, j)] = LabeledIndicator(self.currentDir, labelEditor.name, self)
-                    self.indicators[(i, j)].applyEditorSettings(self.settingsWidget.labelEditors[(i, j)])
-                self.labelGridLayout.addWidget(self.indicators[(i, j)], i, j, 1, 1)
                 self.indicators[(i, j)].applyEditorSettings(labelEditor)
+        self.arrangeIndicators()
+
+    def arrangeIndicators(self):
+        # Removing Old Widgets
+        while self.labelGridLayout.count() > 0:
+            widget = self.labelGridLayout.itemAt(0).widget()
+            self.labelGridLayout.removeWidget(widget)
+            widget.setParent(None)
+        # Adding New Widgets
+        if self.renderer == 'PAINTED':
+            if self.board is None:
+                self.board = IndicatorBoard(self)
+            self.labelGridLayout.addWidget(self.board, 0, 0, 1, 1)
+            self.board.setGrid(self.indicators, self.nbRows, self.nbColumns)
+            self.board.show()
+        else:
+            for i in range(self.nbRows):
+                for j in range(self.nbColumns):
+                    self.labelGridLayout.addWidget(self.indicators[(i, j)], i, j, 1, 1)
+                    self.indicators[(i, j)].show()
 
     def applyChanges(self, editWidget=None):
         if editWidget is None:
             editWidget = self.settingsWidget
         self.nbRows = editWidget.rowSpinBox.value()
         self.nbColumns = editWidget.columnSpinBox.value()
+        self.renderer = 'PAINTED' if editWidget.rendererComboBox.currentIndex() == 1 else 'WIDGETS'
         # Fill and update Grid
         self.fillGrid(editWidget)
         self.updateContent()
 
     def updateContent(self, content=None):
+        if self.renderer == 'PAINTED':
+            for i in range(self.nbRows):
+                for j in range(self.nbColumns):
+                    indicator = self.indicators[(i, j)]
+                    if indicator.refreshAlarmLevel(content):
+                        self.board.setCellAlarmLevel((i, j), indicator.alarmLevel)
+                    displayedText = indicator.refreshText(content)
+                    if displayedText is not None:
+                        self.board.setCellText((i, j), displayedText)
+        else:
+            for i in range(self.nbRows):
+                for j in range(self.nbColumns):
+                    self.indicators[(i, j)].updateLabelContent(content)
+
+    def updateAlarms(self, content, arguments):
+        for i in range(self.nbRows):
+            for j in range(self.nbColumns):
+                indicator = self.indicators[(i, j)]
+                if indicator.argument not in arguments or not indicator.refreshAlarmLevel(content):
+                    continue
+                if self.renderer == 'PAINTED':
+                    self.board.setCellAlarmLevel((i, j), indicator.alarmLevel)
+                else:
+                    indicator.label.setStyleSheet(alarmStyleSheet(indicator.alarmLevel))
+
+
+class IndicatorBoard(QWidget):
+    """
+    Paints every cell of a grid indicator in a single widget. Texts are kept as prepared static texts and a value
+    change only repaints the rectangle of its cell.
+    """
+    PADDING = 4
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.indicators, self.nbRows, self.nbColumns = {}, 0, 0
+        self.cellRects, self.titleTexts, self.valueTexts, self.valueColors = {}, {}, {}, {}
+        self.titleFont = QFont(self.font())
+        self.titleFont.setPointSize(8)
+        self.titleHeight = QFontMetrics(self.titleFont).height()
+        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+
+    def setGrid(self, indicators, nbRows, nbColumns):
+        self.indicators, self.nbRows, self.nbColumns = indicators, nbRows, nbColumns
+        self.titleTexts, self.valueTexts, self.valueColors = {}, {}, {}
+        for i in range(nbRows):
+            for j in range(nbColumns):
+                indicator = indicators[(i, j)]
+                self.titleTexts[(i, j)] = self.prepareText(indicator.title(), self.titleFont)
+                self.valueTexts[(i, j)] = self.prepareText(indicator.displayedText or '', indicator.label.font())
+                self.valueColors[(i, j)] = ALARM_COLORS.get(indicator.alarmLevel)
+        self.computeCellRects()
+        self.update()
+
+    def setCellText(self, key, text):
+        self.valueTexts[key] = self.prepareText(text, self.indicators[key].label.font())
+        self.update(self.cellRects[key])
+
+    def setCellAlarmLevel(self, key, level):
+        self.valueColors[key] = ALARM_COLORS.get(level)
+        self.update(self.cellRects[key])
+
+    @staticmethod
+    def prepareText(text, font):
+        staticText = QStaticText(text)
+        staticText.setTextFormat(Qt.PlainText)
+        staticText.prepare(QTransform(), font)
+        return staticText
+
+    def computeCellRects(self):
+        self.cellRects = {}
+        if self.nbRows == 0 or self.nbColumns == 0:
+            return
+        cellWidth, cellHeight = self.width() / self.nbColumns, self.height() / self.nbRows
         for i in range(self.nbRows):
             for j in range(self.nbColumns):
-                self.indicators[(i, j)].updateLabelContent(content)
+                left, top = int(j * cellWidth), int(i * cellHeight)
+                right, bottom = int((j + 1) * cellWidth), int((i + 1) * cellHeight)
+                self.cellRects[(i, j)] = QRect(left, top, right - left, bottom - top)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.computeCellRects()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        palette = self.palette()
+        exposedRect = event.rect()
+        for key, cellRect in self.cellRects.items():
+            if not exposedRect.intersects(cellRect):
+                continue
+            painter.fillRect(cellRect, palette.color(QPalette.Base))
+            painter.setPen(palette.color(QPalette.Mid))
+            painter.drawRect(cellRect.adjusted(0, 0, -1, -1))
+            painter.setPen(palette.color(QPalette.WindowText))
+            innerRect = cellRect.adjusted(self.PADDING, self.PADDING, -self.PADDING, -self.PADDING)
+            painter.setFont(self.titleFont)
+            painter.drawStaticText(innerRect.topLeft(), self.titleTexts[key])
+            # Values sit in the space left under the title, aligned like the widget indicators
+            indicator, valueText = self.indicators[key], self.valueTexts[key]
+            valueSize = valueText.size()
+            valueTop = innerRect.top() + self.titleHeight
+            y = valueTop + max((innerRect.bottom() - valueTop - valueSize.height()) / 2, 0)
+            if indicator.textAlignment == 0:
+                x = innerRect.left()
+            elif indicator.textAlignment == 1:
+                x = innerRect.left() + (innerRect.width() - valueSize.width()) / 2
+            else:
+                x = innerRect.right() - valueSize.width()
+            painter.setFont(indicator.label.font())
+            if self.valueColors.get(key) is not None:
+                painter.setPen(QColor(self.valueColors[key]))
+            painter.drawStaticText(QPointF(x, y), valueText)
+        painter.end()
 
 
 class GridIndicatorEditDialog(QWidget):
@@ -320,8 +470,7 @@ class GridIndicatorEditDialog(QWidget):
         super().__init__(parent)
         self.currentDir = path
         self.labelEditors = {}  # type: Dict[tuple[int, int], LabelEditor]
-        self.nbRows = parent.labelGridLayout.rowCount()
-        self.nbColumns = parent.labelGridLayout.columnCount()
+        self.nbRows, self.nbColumns = parent.nbRows, parent.nbColumns
 
         # ROW AND COLUMN SPIN BOXES
         self.columnSpinBox = QSpinBox(self)
@@ -343,7 +492,7 @@ class GridIndicatorEditDialog(QWidget):
         # LABEL EDITORS
         for row in range(self.nbRows):
             for column in range(self.nbColumns):
-                indicator: LabeledIndicator = parent.labelGridLayout.itemAtPosition(row, column).widget()
+                indicator: LabeledIndicator = parent.indicators[(row, column)]
                 editor = LabelEditor(self.currentDir, indicator.title(), indicator)
                 editor.goBackToGrid.connect(self.openGridEditor)
                 self.labelEditors[row, column] = editor
@@ -365,6 +514,11 @@ class GridIndicatorEditDialog(QWidget):
         spinBoxLayout.addWidget(self.columnSpinBox)
         spinBoxLayout.addWidget(QLabel("Rows:"))
         spinBoxLayout.addWidget(self.rowSpinBox)
+        self.rendererComboBox = QComboBox(self)
+        self.rendererComboBox.addItems(['Widgets', 'Painted Board'])
+        self.rendererComboBox.setCurrentIndex(1 if parent.renderer == 'PAINTED' else 0)
+        spinBoxLayout.addWidget(QLabel("Rendering:"))
+        spinBoxLayout.addWidget(self.rendererComboBox)
         mainLayout = QGridLayout()
         mainLayout.addLayout(spinBoxLayout, 0, 0, Qt.AlignLeft)
         mainLayout.addWidget(self.centralDisplay, 1, 0, Qt.AlignCenter)
@@ -437,10 +591,12 @@ class LabeledIndicator(QGroupBox):
         self.currentDir = path
         self.textAlignment = 0
         self.lastValue = None
-        self.catalogue = DefaultUnitsCatalogue()
-        self.generalSettings = loadSettings('settings')
+        self.catalogue = DefaultUnitsCatalogue.shared()
         self.argument = ''
-        self.argumentUnit = None
+        self.argumentUnit, self.unitSymbol = None, None
+        self.argumentMapping, self.textFormat, self.placeholderText = [], None, ''
+        self.valueCount, self.displayedText = None, None
+        self.alarmLevel = NOMINAL
         self.showUnit = False
         self.setTitle(name)
         self.parentWidget = parent
@@ -468,42 +624,57 @@ class LabeledIndicator(QGroupBox):
             self.label.setAlignment(Qt.AlignRight | Qt.AlignVCenter)
             self.textAlignment = 2
         self.showUnit = labelEditor.unitCheckbox.isChecked()
-        self.argumentUnit = labelEditor.argumentUnit
-        self.argument = labelEditor.argumentEdit.text()
+        self.setArgumentUnit(labelEditor.argumentUnit)
+        self.setArgument(labelEditor.argumentEdit.text())
         self.setTitle(labelEditor.name)
         self.updateLabelContent()
 
     def updateLabelContent(self, content=None):
-        self.generalSettings = loadSettings('settings')
-        argumentMapping = self.argument.split('/')
-        if argumentMapping != ['']:  # There is an argument in the parameters
-            if content is None:
-                value = ''
-            else:
-                value = content.retrieveStoredContent(argumentMapping)
-            if len(value) > 0:
-                displayedText = str(value[-1])
-                self.lastValue = value[-1]
-            else:
-                if self.argumentUnit is not None:
-                    if issubclass(self.argumentUnit.type, float):
-                        displayedText = '____.__'
-                    else:
-                        displayedText = '____'
-                else:
-                    displayedText = '____'
-            self.lastValue = displayedText
-            if self.showUnit:
-                symbol = self.catalogue.getSymbol(self.argumentUnit.name)
-                if symbol is not None:
-                    displayedText += ' ' + symbol
-                else:
-                    displayedText += ' ' + self.argumentUnit.name
+        if self.refreshAlarmLevel(content):
+            self.label.setStyleSheet(alarmStyleSheet(self.alarmLevel))
+        displayedText = self.refreshText(content)
+        if displayedText is not None:
             self.label.setText(displayedText)
 
+    def refreshAlarmLevel(self, content=None):
+        alarmLevel = NOMINAL if content is None or not self.argumentMapping else content.retrieveAlarmLevel(self.argument)
+        if alarmLevel == self.alarmLevel:
+            return False
+        self.alarmLevel = alarmLevel
+        return True
+
+    def refreshText(self, content=None):
+        if not self.argumentMapping:
+            return None
+        if self.textFormat is None:
+            self.compileTextFormat()
+        value, valueCount = (None, 0) if content is None else content.retrieveLatestContent(self.argumentMapping)
+        # Packets of other telemetries leave the number of values of this argument unchanged
+        if content is not None and valueCount == self.valueCount:
+            return None
+        self.valueCount, self.lastValue = valueCount, value
+        displayedText = self.textFormat.format(value) if valueCount > 0 else self.placeholderText
+        if displayedText == self.displayedText:
+            return None
+        self.displayedText = displayedText
+        return displayedText
+
+    def setArgument(self, argument):
+        self.argument = argument
+        self.argumentMapping = argument.split('/') if argument != '' else []
+        self.valueCount = None
+
+    def compileTextFormat(self):
+        unitText = ' ' + self.unitSymbol if self.showUnit and self.unitSymbol is not None else ''
+        self.textFormat = '{}' + unitText.replace('{', '{{').replace('}', '}}')
+        if self.argumentUnit is not None and issubclass(self.argumentUnit.type, float):
+            self.placeholderText = '____.__' + unitText
+        else:
+            self.placeholderText = '____' + unitText
+
     def applyDescription(self, description):
         self.setTitle(description['NAME'])
-        self.argument = description['ARGUMENT']
+        self.setArgument(description['ARGUMENT'])
         self.showUnit = bool(description['SHOW_UNIT'])
         font = QFont(description['FONT_FAMILY'])
         fontSize = description['FONT_SIZE']
@@ -538,7 +709,15 @@ class LabeledIndicator(QGroupBox):
         database, telemetry, argument = argument[0], argument[1], argument[2:]
         selectedTypes, selectedUnits = dialog.databases[database].nestedPythonTypes(telemetry, (int, float))
         unitName = getUnit(selectedUnits, argument)
-        self.argumentUnit = dialog.databases[database].units[unitName][0] if unitName is not None else None
+        self.setArgumentUnit(dialog.databases[database].units[unitName][0] if unitName is not None else None)
+
+    def setArgumentUnit(self, argumentUnit):
+        self.argumentUnit, self.textFormat, self.valueCount = argumentUnit, None, None
+        if argumentUnit is None:
+            self.unitSymbol = None
+        else:
+            symbol = self.catalogue.getSymbol(argumentUnit.name)
+            self.unitSymbol = symbol if symbol is not None else argumentUnit.name
 
 
 class LabelEditor(QWidget):
@@ -0,0 +1,122 @@
+######################## IMPORTS ########################
+import time
+from datetime import datetime
+
+# ------------------- PyQt Modules -------------------- #
+from PyQt5.QtWidgets import *
+from PyQt5.QtCore import *
+
+# --------------------- Sources ----------------------- #
+from sources.common.widgets.Widgets import ContentStorage
+
+
+######################## CLASSES ########################
+class PlaybackBar(QToolBar):
+    cursorChanged = pyqtSignal(float)
+    SPEEDS = [0.5, 1, 2, 5, 10, 30, 60, 300]
+    SLIDER_RESOLUTION = 10000
+
+    def __init__(self, parent=None):
+        super().__init__('Playback', parent)
+        self.setMovable(False)
+        self.start, self.finish, self.cursor = 0.0, 0.0, 0.0
+        self.lastTick = None
+
+        # TIMER
+        self.timer = QTimer(self)
+        self.timer.setInterval(50)
+        self.timer.timeout.connect(self.advance)
+
+        # CONTROLS
+        self.playButton = QToolButton(self)
+        self.playButton.setIcon(self.style().standardIcon(QStyle.SP_MediaPlay))
+        self.playButton.setToolTip('Play / Pause')
+        self.playButton.clicked.connect(self.togglePlaying)
+        self.speedComboBox = QComboBox(self)
+        self.speedComboBox.addItems([f'x{speed}' for speed in self.SPEEDS])
+        self.speedComboBox.setCurrentIndex(self.SPEEDS.index(1))
+        self.slider = QSlider(Qt.Horizontal, self)
+        self.slider.setRange(0, self.SLIDER_RESOLUTION)
+        self.slider.sliderMoved.connect(self.sliderMoved)
+        self.timeLabel = QLabel('--:--:--', self)
+        self.timeLabel.setMinimumWidth(140)
+        self.addWidget(self.playButton)
+        self.addWidget(self.speedComboBox)
+        self.addWidget(self.slider)
+        self.addWidget(self.timeLabel)
+
+    @property
+    def speed(self):
+        return self.SPEEDS[self.speedComboBox.currentIndex()]
+
+    def setTimeRange(self, start, finish):
+        self.start, self.finish = start, finish
+        self.seek(finish)
+
+    def togglePlaying(self):
+        if self.timer.isActive():
+            self.pause()
+        else:
+            if self.cursor >= self.finish:
+                self.seek(self.start)
+            self.lastTick = time.monotonic()
+            self.timer.start()
+            self.playButton.setIcon(self.style().standardIcon(QStyle.SP_MediaPause))
+
+    def pause(self):
+        self.timer.stop()
+        self.playButton.setIcon(self.style().standardIcon(QStyle.SP_MediaPlay))
+
+    def advance(self):
+        now = time.monotonic()
+        cursor = self.cursor + (now - self.lastTick) * self.speed
+        self.lastTick = now
+        if cursor >= self.finish:
+            self.pause()
+            cursor = self.finish
+        self.seek(cursor)
+
+    def sliderMoved(self, position):
+        self.seek(self.start + (self.finish - self.start) * position / self.SLIDER_RESOLUTION)
+
+    def seek(self, cursor):
+        self.cursor = min(max(cursor, self.start), self.finish)
+        if self.finish > self.start and not self.slider.isSliderDown():
+            self.slider.setValue(int((self.cursor - self.start) / (self.finish - self.start) * self.SLIDER_RESOLUTION))
+        elapsed = int(self.cursor - self.start)
+        timeString = datetime.fromtimestamp(self.cursor).strftime('%H:%M:%S')
+        self.timeLabel.setText(f'{timeString}  (+{elapsed // 3600:02d}:{elapsed // 60 % 60:02d}:{elapsed % 60:02d})')
+        self.cursorChanged.emit(self.cursor)
+
+
+class PlaybackController(QObject):
+    """ Drives the displays of a DisplayTabWidget from the time index of its ContentStorage. """
+
+    def __init__(self, displayTabWidget, content: ContentStorage):
+        super().__init__(displayTabWidget)
+        self.displayTabWidget, self.content = displayTabWidget, content
+        self.playbackBar = PlaybackBar(displayTabWidget)
+        self.playbackBar.cursorChanged.connect(self.cursorChanged)
+        self.playbackBar.hide()
+        displayTabWidget.addToolBar(Qt.BottomToolBarArea, self.playbackBar)
+
+    @property
+    def active(self):
+        return self.content.cursor is not None
+
+    def start(self):
+        timeRange = self.content.timeRange()
+        if timeRange is None:
+            self.stop()
+            return
+        self.playbackBar.show()
+        self.playbackBar.setTimeRange(*timeRange)
+
+    def stop(self):
+        self.playbackBar.pause()
+        self.playbackBar.hide()
+        self.content.setCursor(None)
+
+    def cursorChanged(self, cursor):
+        self.content.setCursor(cursor)
+        self.displayTabWidget.tabChanged()
@@ -0,0 +1,84 @@
+######################## IMPORTS ########################
+import time
+
+# ------------------- PyQt Modules -------------------- #
+from PyQt5.QtWidgets import *
+from PyQt5.QtCore import *
+from PyQt5.QtGui import *
+
+# --------------------- Sources ----------------------- #
+from sources.alarms import ALARM_COLORS, RED, STALE
+from sources.common.widgets.Widgets import ContentStorage
+
+
+######################## CLASSES ########################
+class TelemetryStatusDock(QDockWidget):
+    """
+    Rate and age of every tracked telemetry type. The table is refreshed from the arrival statistics updated by the
+    serial monitor once a second while visible, independently of packets and displays.
+    """
+    HEADERS = ['Telemetry', 'Rate', 'Last', 'Packets', 'Gaps']
+
+    def __init__(self, content: ContentStorage, parent=None):
+        super().__init__('Telemetry Status', parent)
+        self.setObjectName('TelemetryStatusDock')
+        self.setFeatures(QDockWidget.DockWidgetClosable | QDockWidget.DockWidgetMovable)
+        self.content, self.rowKeys = content, []
+        self.table = QTableWidget(0, len(self.HEADERS), self)
+        self.table.setHorizontalHeaderLabels(self.HEADERS)
+        self.table.verticalHeader().hide()
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setSelectionMode(QAbstractItemView.NoSelection)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        for column in range(1, len(self.HEADERS)):
+            self.table.horizontalHeader().setSectionResizeMode(column, QHeaderView.ResizeToContents)
+        self.setWidget(self.table)
+
+        # TIMER
+        self.timer = QTimer(self)
+        self.timer.setInterval(1000)
+        self.timer.timeout.connect(self.refresh)
+        self.visibilityChanged.connect(self.onVisibilityChanged)
+
+    def onVisibilityChanged(self, visible):
+        if visible:
+            self.refresh()
+            self.timer.start()
+        else:
+            self.timer.stop()
+
+    def buildRows(self, trackers):
+        self.rowKeys = sorted(trackers)
+        self.table.setRowCount(len(self.rowKeys))
+        for row, (parserName, telemetryType) in enumerate(self.rowKeys):
+            self.table.setItem(row, 0, QTableWidgetItem(f'{parserName}/{telemetryType}'))
+            for column in range(1, len(self.HEADERS)):
+                item = QTableWidgetItem()
+                item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.table.setItem(row, column, item)
+
+    def refresh(self):
+        trackers = self.content.arrivals.snapshot()
+        if self.rowKeys != sorted(trackers):
+            self.buildRows(trackers)
+        now = time.time()
+        defaultColor = self.palette().color(QPalette.Text)
+        for row, key in enumerate(self.rowKeys):
+            tracker = trackers[key]
+            age, rate = tracker.age(now), tracker.rate
+            if age is None:
+                color = QColor(ALARM_COLORS[STALE])
+            elif tracker.isStale(now):
+                color = QColor(ALARM_COLORS[RED])
+            else:
+                color = defaultColor
+            texts = [f'{rate:.2f} Hz' if rate is not None else '-',
+                     f'{age:.1f} s' if age is not None else 'never',
+                     str(tracker.nbPackets),
+                     f'{tracker.nbGaps} ({tracker.longestGap:.1f} s)' if tracker.nbGaps else '0']
+            self.table.item(row, 0).setForeground(color)
+            for column, text in enumerate(texts, start=1):
+                item = self.table.item(row, column)
+                if item.text() != text:
+                    item.setText(text)
+                item.setForeground(color)
@@ -1,8 +1,13 @@
 ######################## IMPORTS ########################
+import hashlib
 import os
+import time
 from functools import reduce
+import numpy as np
 import pyvista as pv
 from pyvistaqt import QtInteractor
+from vtkmodules.vtkFiltersSources import vtkArrowSource
+from vtkmodules.vtkRenderingCore import vtkActor, vtkGlyph3DMapper
 import operator
 
 # ------------------- PyQt Modules -------------------- #
@@ -12,10 +17,58 @@ from PyQt5.QtGui import *
 
 # --------------------- Sources ----------------------- #
 from sources.common.utilities.fileSystem import loadSettings
-from sources.common.utilities.rotations import quaternionToEuler321
+from sources.common.utilities.rotations import quaternionsToRotationMatrices, eulerToQuaternions321, slerpQuaternions
 from sources.common.widgets.Widgets import ArgumentSelector, ContentStorage
 from sources.common.widgets.basic import BasicDisplay
-from sources.databases.units import DefaultUnitsCatalogue
+
+
+######################## FUNCTIONS ########################
+_meshHashes = {}
+
+
+def meshFileHash(path):
+    fileStat = os.stat(path)
+    fileKey = (path, fileStat.st_mtime_ns, fileStat.st_size)
+    if fileKey not in _meshHashes:
+        fileHash = hashlib.sha1()
+        with open(path, 'rb') as file:
+            for block in iter(lambda: file.read(1 << 20), b''):
+                fileHash.update(block)
+        _meshHashes[fileKey] = fileHash.hexdigest()
+    return _meshHashes[fileKey]
+
+
+def loadCachedMesh(path, cacheDirectory, targetTriangles=200000):
+    """
+    Reads a mesh through a cache of decimated surfaces with precomputed normals, stored as binary VTK files
+    named after the hash of the source file and the triangle budget.
+    """
+    targetTriangles = int(targetTriangles)
+    cachePath = os.path.join(cacheDirectory, f'{meshFileHash(path)}_{targetTriangles}.vtp')
+    if os.path.exists(cachePath):
+        return pv.read(cachePath)
+    mesh = pv.read(path)
+    if not isinstance(mesh, pv.PolyData):
+        mesh = mesh.extract_surface()
+    mesh = mesh.triangulate()
+    if targetTriangles > 0 and mesh.n_cells > targetTriangles:
+        mesh = mesh.decimate(1 - targetTriangles / mesh.n_cells)
+    mesh = mesh.compute_normals(auto_orient_normals=False, split_vertices=True)
+    os.makedirs(cacheDirectory, exist_ok=True)
+    temporaryPath = cachePath + '.tmp.vtp'
+    mesh.save(temporaryPath, binary=True)
+    os.replace(temporaryPath, cachePath)
+    return mesh
+
+
+def geodeticToLocal(latitudes, longitudes, altitudes, origin):
+    """ East, north, up coordinates in meters around origin, flat earth approximation suited to a balloon flight. """
+    earthRadius = 6371000.0
+    originLatitude, originLongitude, originAltitude = origin
+    east = earthRadius * np.cos(np.radians(originLatitude)) * np.radians(np.asarray(longitudes) - originLongitude)
+    north = earthRadius * np.radians(np.asarray(latitudes) - originLatitude)
+    up = np.asarray(altitudes) - originAltitude
+    return np.stack([east, north, up], axis=-1)
 
 
 ######################## CLASSES ########################
@@ -23,11 +76,15 @@ class VtkDisplay(BasicDisplay):
     def __init__(self, path, parent=None):
         super().__init__(path, parent)
         self.content, self.settings = None, loadSettings('settings')
-        self.catalogue = DefaultUnitsCatalogue()
 
         # VTK DISPLAY WIDGET
         self.meshFilePath = ''
         self.vtkMesh, self.viewedMesh = None, None
+        self.previousAttitude, self.targetAttitude, self.displayedAttitude = None, None, None
+        self.attitudeTime, self.attitudeInterval = None, 1.0
+        self.interpolationTimer = QTimer(self)
+        self.interpolationTimer.setInterval(33)
+        self.interpolationTimer.timeout.connect(self.renderAttitude)
         self.vtkDisplay = QtInteractor(self)
         self.rotation = {'SET_ROTATION': False, 'ROTATION_TYPE': 'EULER', 'ARGUMENTS': [None] * 7, 'UNITS': [None] * 7}
         self.vtkDisplay.set_background('black' if self.settings['DARK_THEME'] else 'white')
@@ -48,18 +105,24 @@ class VtkDisplay(BasicDisplay):
         if not os.path.exists(self.meshFilePath):
             self.meshFilePath = ''
         else:
-            self.vtkMesh = pv.read(self.meshFilePath)
+            self.vtkMesh = self.loadMesh(self.meshFilePath)
             self.viewedMesh = self.vtkDisplay.add_mesh(self.vtkMesh)
         self.settingsWidget = VtkDisplayEditDialog(self.currentDir, self)
         self.rotation = description['ROTATION']
         self.retrieveArgumentUnits()
 
+    def loadMesh(self, path):
+        cacheDirectory = os.path.join(self.currentDir, 'data', '_meshes')
+        return loadCachedMesh(path, cacheDirectory, self.generalSettings.get('MESH_TARGET_TRIANGLES') or 200000)
+
     def applyChanges(self, editWidget):
         editWidget = self.settingsWidget
         self.meshFilePath = editWidget.meshFileEdit.text()
         if os.path.exists(self.meshFilePath) and os.path.isfile(self.meshFilePath):
-            self.vtkMesh = pv.read(self.meshFilePath)
-            self.vtkDisplay.add_mesh(self.vtkMesh)
+            if self.viewedMesh is not None:
+                self.vtkDisplay.remove_actor(self.viewedMesh)
+            self.vtkMesh = self.loadMesh(self.meshFilePath)
+            self.viewedMesh = self.vtkDisplay.add_mesh(self.vtkMesh)
         rollArgument = editWidget.rollEdit.text()
         pitchArgument = editWidget.pitchEdit.text()
         yawArgument = editWidget.yawEdit.text()
@@ -84,27 +147,55 @@ class VtkDisplay(BasicDisplay):
             if self.rotation['ROTATION_TYPE'] == 'EULER' and self.rotation['SET_ROTATION']:
                 roll, pitch, yaw = self.rotation['ARGUMENTS'][0], self.rotation['ARGUMENTS'][1], self.rotation['ARGUMENTS'][2]
                 rollMapping, pitchMapping, yawMapping = roll.split('/'), pitch.split('/'), yaw.split('/')
-                valueRoll = content.retrieveStoredContent(rollMapping)
-                valuePitch = content.retrieveStoredContent(pitchMapping)
-                valueYaw = content.retrieveStoredContent(yawMapping)
+                # Only the latest sample is shown, the histories are not copied
+                values = [content.retrieveLatestContent(mapping)[0] for mapping in (rollMapping, pitchMapping, yawMapping)]
+                if any(value is None for value in values):
+                    return
+                attitude = eulerToQuaternions321(values, degrees=True)
             elif self.rotation['ROTATION_TYPE'] == 'QUATERNION' and self.rotation['SET_ROTATION']:
                 qW, qX = self.rotation['ARGUMENTS'][3], self.rotation['ARGUMENTS'][4]
                 qY, qZ = self.rotation['ARGUMENTS'][5], self.rotation['ARGUMENTS'][6]
                 qwMapping, qxMapping, qyMapping, qzMapping = qW.split('/'), qX.split('/'), qY.split('/'), qZ.split('/')
-                valueQw = content.retrieveStoredContent(qwMapping)
-                valueQx = content.retrieveStoredContent(qxMapping)
-                valueQy = content.retrieveStoredContent(qyMapping)
-                valueQz = content.retrieveStoredContent(qzMapping)
-                valueRoll, valuePitch, valueYaw = quaternionToEuler321(valueQw, valueQx, valueQy, valueQz, degrees=True)
+                values = [content.retrieveLatestContent(mapping)[0]
+                          for mapping in (qwMapping, qxMapping, qyMapping, qzMapping)]
+                if any(value is None for value in values):
+                    return
+                attitude = np.array(values, dtype=float)
             else:
                 return
-            if len(valueRoll) > 1:
-                self.viewedMesh.rotate_x(-valueRoll[-2])
-                self.viewedMesh.rotate_y(-valuePitch[-2])
-                self.viewedMesh.rotate_z(-valueYaw[-2])
-            self.viewedMesh.rotate_x(valueRoll[-1])
-            self.viewedMesh.rotate_y(valuePitch[-1])
-            self.viewedMesh.rotate_z(valueYaw[-1])
+            self.setTargetAttitude(attitude)
+
+    def setTargetAttitude(self, attitude):
+        if self.targetAttitude is not None and np.array_equal(attitude, self.targetAttitude):
+            # Refreshed without a new sample, finishes an interpolation interrupted while hidden
+            if not self.interpolationTimer.isActive():
+                self.renderAttitude()
+            return
+        now = time.monotonic()
+        if self.displayedAttitude is None:
+            self.previousAttitude, self.attitudeInterval = attitude, 1.0
+        else:
+            # Interpolating from what is shown over the last packet interval keeps the motion continuous
+            self.previousAttitude = self.displayedAttitude
+            self.attitudeInterval = min(max(now - self.attitudeTime, 0.05), 2.0)
+        self.targetAttitude, self.attitudeTime = attitude, now
+        self.renderAttitude()
+        if not self.interpolationTimer.isActive():
+            self.interpolationTimer.start()
+
+    def renderAttitude(self):
+        if self.viewedMesh is None or self.targetAttitude is None:
+            self.interpolationTimer.stop()
+            return
+        fraction = min((time.monotonic() - self.attitudeTime) / self.attitudeInterval, 1.0)
+        self.displayedAttitude = slerpQuaternions(self.previousAttitude, self.targetAttitude, fraction)
+        # The mesh points are never modified, the attitude is a single absolute transform of the actor
+        userMatrix = np.eye(4)
+        userMatrix[:3, :3] = quaternionsToRotationMatrices(self.displayedAttitude)
+        self.viewedMesh.user_matrix = userMatrix
+        self.vtkDisplay.render()
+        if fraction >= 1.0 or not self.isVisible():
+            self.interpolationTimer.stop()
 
     def changeTheme(self):
         self.settings = loadSettings('settings')
@@ -341,6 +432,257 @@ class VtkDisplayEditDialog(QWidget):
         self.meshSelectionButton.setIcon(QIcon(meshPixMap))
 
 
+class TrajectoryDisplay(BasicDisplay):
+    """
+    Flight path drawn as polylines over preallocated chunks of points, with arrows showing the attitude at regular
+    intervals. Only the chunks written by a refresh are uploaded again. When the capacity is reached every other point
+    is dropped, so the whole flight stays shown at a coarser step.
+    """
+    CHUNK_SIZE = 1024
+
+    def __init__(self, path, parent=None):
+        super().__init__(path, parent)
+        self.content, self.settings = None, loadSettings('settings')
+        self.position = [None, None, None]
+        self.attitude = [None, None, None, None]
+        self.showAttitude, self.capacity, self.glyphInterval = False, 20000, 50
+
+        # VTK DISPLAY WIDGET
+        self.vtkDisplay = QtInteractor(self)
+        self.vtkDisplay.set_background('black' if self.settings['DARK_THEME'] else 'white')
+        self.axes = self.vtkDisplay.add_axes(color='white' if self.settings['DARK_THEME'] else 'black')
+        self.chunks, self.chunkActors, self.glyphs, self.glyphActor = [], [], None, None
+        self.allocateBuffers()
+
+        # MAIN LAYOUT
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.vtkDisplay)
+        self.settingsWidget = TrajectoryDisplayEditDialog(self.currentDir, self)
+
+    def allocateBuffers(self):
+        self.removeChunks()
+        if self.glyphActor is not None:
+            self.vtkDisplay.remove_actor(self.glyphActor)
+        self.origin, self.nbSamples, self.nbPoints, self.nbGlyphs, self.pointStride = None, 0, 0, 0, 1
+        glyphCapacity = self.capacity // self.glyphInterval + 1
+        self.glyphs = pv.PolyData(np.zeros((glyphCapacity, 3)))
+        self.glyphs.point_data['directions'] = np.tile([1.0, 0.0, 0.0], (glyphCapacity, 1))
+        arrowSource = vtkArrowSource()
+        glyphMapper = vtkGlyph3DMapper()
+        glyphMapper.SetInputData(self.glyphs)
+        glyphMapper.SetSourceConnection(arrowSource.GetOutputPort())
+        glyphMapper.SetOrientationArray('directions')
+        glyphMapper.SetOrientationModeToDirection()
+        glyphMapper.ScalingOff()
+        self.glyphActor = vtkActor()
+        self.glyphActor.SetMapper(glyphMapper)
+        self.glyphActor.GetProperty().SetColor(0.0, 0.8, 1.0)
+        self.glyphActor.SetVisibility(False)
+        self.vtkDisplay.add_actor(self.glyphActor)
+
+    def getDescription(self):
+        return {'DISPLAY_TYPE': 'TRAJECTORY_DISPLAY', 'POSITION': self.position, 'ATTITUDE': self.attitude,
+                'SHOW_ATTITUDE': int(self.showAttitude), 'CAPACITY': self.capacity, 'GLYPH_INTERVAL': self.glyphInterval}
+
+    def applyDescription(self, description):
+        self.position, self.attitude = description['POSITION'], description['ATTITUDE']
+        self.showAttitude = bool(description['SHOW_ATTITUDE'])
+        self.capacity, self.glyphInterval = description['CAPACITY'], description['GLYPH_INTERVAL']
+        self.allocateBuffers()
+        self.settingsWidget = TrajectoryDisplayEditDialog(self.currentDir, self)
+
+    def applyChanges(self, editWidget):
+        editWidget = self.settingsWidget
+        self.position = [edit.text() if edit.text() != '' else None for edit in editWidget.positionEdits]
+        self.attitude = [edit.text() if edit.text() != '' else None for edit in editWidget.attitudeEdits]
+        self.showAttitude = editWidget.attitudeCheckbox.isChecked()
+        self.capacity, self.glyphInterval = editWidget.capacitySpinBox.value(), editWidget.glyphSpinBox.value()
+        self.allocateBuffers()
+        if self.content is not None:
+            self.updateContent(self.content)
+
+    def updateContent(self, content: ContentStorage = None):
+        if content is None or None in self.position:
+            return
+        self.content = content
+        keys = [argument.split('/') for argument in self.position]
+        nbSamples = min(content.storedLength(key) for key in keys)
+        if nbSamples < self.nbSamples:
+            # Stored content was cleared or rewound by the playback
+            self.allocateBuffers()
+        if nbSamples == self.nbSamples:
+            return
+        # Only the samples received since the last refresh are read
+        values = [content.retrieveStoredContent(key, self.nbSamples, nbSamples) for key in keys]
+        if any(value is None for value in values):
+            return
+        latitudes, longitudes, altitudes = (np.asarray(value, dtype=float) for value in values)
+        if self.origin is None:
+            self.origin = (latitudes[0], longitudes[0], altitudes[0])
+        points = geodeticToLocal(latitudes, longitudes, altitudes, self.origin)
+        attitudes = self.retrieveAttitudes(content, self.nbSamples, nbSamples)
+        firstPoints, glyphRevision = self.nbPoints == 0, (self.nbGlyphs, self.pointStride)
+        for i, point in enumerate(points):
+            self.appendSample(point, attitudes[i] if attitudes is not None else None)
+        self.uploadChunks()
+        if self.nbGlyphs > 0 and (self.nbGlyphs, self.pointStride) != glyphRevision:
+            self.glyphs.points[self.nbGlyphs:] = self.glyphs.points[self.nbGlyphs - 1]
+            self.glyphs.point_data['directions'][self.nbGlyphs:] = self.glyphs.point_data['directions'][self.nbGlyphs - 1]
+            self.glyphs.Modified()
+            # Arrows are sized after the extent of the flight, only looked at when one was added
+            extent = np.ptp(np.concatenate([chunk.points for chunk in self.chunks]), axis=0).max()
+            self.glyphActor.GetMapper().SetScaleFactor(max(extent * 0.03, 1.0))
+            self.glyphActor.SetVisibility(True)
+        if firstPoints:
+            self.vtkDisplay.reset_camera()
+        self.vtkDisplay.render()
+
+    def appendSample(self, point, attitude):
+        if self.nbSamples % self.pointStride == 0 and self.nbPoints == self.capacity:
+            self.dropEveryOtherPoint()
+        if self.nbSamples % self.pointStride == 0:
+            self.storePoint(point)
+            if attitude is not None and self.nbSamples % (self.pointStride * self.glyphInterval) == 0:
+                self.glyphs.points[self.nbGlyphs] = point
+                self.glyphs.point_data['directions'][self.nbGlyphs] = attitude
+                self.nbGlyphs += 1
+        self.nbSamples += 1
+
+    def storePoint(self, point):
+        chunkIndex, offset = divmod(self.nbPoints, self.CHUNK_SIZE)
+        if chunkIndex == len(self.chunks):
+            # Chunks start on the last point of the previous one so that the path stays continuous
+            self.addChunk(self.chunks[-1].points[-1] if self.chunks else point)
+        self.chunks[chunkIndex].points[offset + 1] = point
+        self.modifiedChunks.add(chunkIndex)
+        self.nbPoints += 1
+
+    def addChunk(self, firstPoint):
+        size = self.CHUNK_SIZE + 1
+        chunk = pv.PolyData(np.tile(firstPoint, (size, 1)), lines=np.hstack([[size], np.arange(size)]))
+        self.chunks.append(chunk)
+        self.chunkActors.append(self.vtkDisplay.add_mesh(chunk, color='orange', line_width=2))
+
+    def removeChunks(self):
+        for actor in self.chunkActors:
+            self.vtkDisplay.remove_actor(actor)
+        self.chunks, self.chunkActors, self.modifiedChunks = [], [], set()
+
+    def uploadChunks(self):
+        # Unused points of the last chunk collapse onto the latest position, the polyline connectivity never changes
+        lastChunk = self.chunks[-1]
+        lastPoint = self.nbPoints - (len(self.chunks) - 1) * self.CHUNK_SIZE
+        lastChunk.points[lastPoint + 1:] = lastChunk.points[lastPoint]
+        for chunkIndex in self.modifiedChunks:
+            self.chunks[chunkIndex].GetPoints().Modified()
+        self.modifiedChunks.clear()
+
+    def dropEveryOtherPoint(self):
+        self.pointStride *= 2
+        kept = np.concatenate([chunk.points[1:] for chunk in self.chunks])[:self.nbPoints:2]
+        self.removeChunks()
+        self.nbPoints = 0
+        for point in kept:
+            self.storePoint(point)
+        keptGlyphs = self.glyphs.points[:self.nbGlyphs:2].copy()
+        keptDirections = self.glyphs.point_data['directions'][:self.nbGlyphs:2].copy()
+        self.glyphs.points[:len(keptGlyphs)] = keptGlyphs
+        self.glyphs.point_data['directions'][:len(keptGlyphs)] = keptDirections
+        self.nbGlyphs = len(keptGlyphs)
+
+    def retrieveAttitudes(self, content, start, finish):
+        if not self.showAttitude or None in self.attitude:
+            return None
+        keys = [argument.split('/') for argument in self.attitude]
+        nbAttitudes = min(content.storedLength(key) for key in keys)
+        if nbAttitudes == 0:
+            return None
+        # Attitudes of another telemetry than the position are matched by index, or the latest one is used
+        indices = [min(index, nbAttitudes - 1) for index in range(start, finish)]
+        values = [content.retrieveStoredContent(key, indices[0], indices[-1] + 1) for key in keys]
+        if any(not value for value in values):
+            return None
+        quaternions = np.array([[value[index - indices[0]] for value in values] for index in indices], dtype=float)
+        return quaternionsToRotationMatrices(quaternions)[:, :, 0]
+
+    def changeTheme(self):
+        self.settings = loadSettings('settings')
+        self.vtkDisplay.set_background('black' if self.settings['DARK_THEME'] else 'white')
+        self.vtkDisplay.remove_actor(self.axes)
+        self.axes = self.vtkDisplay.add_axes(color='white' if self.settings['DARK_THEME'] else 'black')
+        self.settingsWidget.changeTheme(darkTheme=self.settings['DARK_THEME'])
+
+    def generateSettingsWidget(self):
+        self.settingsWidget = TrajectoryDisplayEditDialog(self.currentDir, self)
+
+
+class TrajectoryDisplayEditDialog(QWidget):
+    def __init__(self, path, parent: TrajectoryDisplay):
+        super().__init__(parent)
+        self.settings = loadSettings('settings')
+        themeFolder = 'dark-theme' if self.settings['DARK_THEME'] else 'light-theme'
+        selectionButtonPixmap = QPixmap(f'sources/icons/{themeFolder}/icons8-add-database-96.png').scaled(25, 25)
+        self.currentDir = path
+        self.hide()
+
+        # POSITION AND ATTITUDE ARGUMENTS
+        labels = ['Latitude: ', 'Longitude: ', 'Altitude: ', 'W: ', 'X: ', 'Y: ', 'Z: ']
+        arguments = parent.position + parent.attitude
+        self.selectionButtons, edits = [], []
+        argumentsLayout = QGridLayout()
+        for i, (label, argument) in enumerate(zip(labels, arguments)):
+            edit = QLineEdit(argument if argument is not None else '')
+            button = QPushButton()
+            button.setIcon(QIcon(selectionButtonPixmap))
+            button.clicked.connect(lambda _, lineEdit=edit: self.openArgumentSelector(lineEdit))
+            row = i if i < 3 else i + 1
+            argumentsLayout.addWidget(QLabel(label), row, 0)
+            argumentsLayout.addWidget(edit, row, 1)
+            argumentsLayout.addWidget(button, row, 2)
+            self.selectionButtons.append(button)
+            edits.append(edit)
+        self.positionEdits, self.attitudeEdits = edits[:3], edits[3:]
+        self.attitudeCheckbox = QCheckBox('Attitude Arrows (Quaternion)')
+        self.attitudeCheckbox.stateChanged.connect(self.toggleAttitude)
+        self.attitudeCheckbox.setChecked(parent.showAttitude)
+        self.toggleAttitude(parent.showAttitude)
+        argumentsLayout.addWidget(self.attitudeCheckbox, 3, 0, 1, 3)
+
+        # BUFFER SIZES
+        self.capacitySpinBox = QSpinBox()
+        self.capacitySpinBox.setRange(100, 1000000)
+        self.capacitySpinBox.setValue(parent.capacity)
+        self.glyphSpinBox = QSpinBox()
+        self.glyphSpinBox.setRange(1, 100000)
+        self.glyphSpinBox.setValue(parent.glyphInterval)
+        argumentsLayout.addWidget(QLabel('Points: '), 8, 0)
+        argumentsLayout.addWidget(self.capacitySpinBox, 8, 1, 1, 2)
+        argumentsLayout.addWidget(QLabel('Arrow every: '), 9, 0)
+        argumentsLayout.addWidget(self.glyphSpinBox, 9, 1, 1, 2)
+
+        # MAIN LAYOUT
+        mainLayout = QVBoxLayout(self)
+        mainLayout.addLayout(argumentsLayout)
+
+    def openArgumentSelector(self, lineEdit):
+        dialog = ArgumentSelector(self.currentDir, self)
+        result = dialog.exec_()
+        if result == QMessageBox.Accepted:
+            lineEdit.setText(dialog.selectedArgument)
+            lineEdit.adjustSize()
+
+    def toggleAttitude(self, state):
+        for edit, button in zip(self.attitudeEdits, self.selectionButtons[3:]):
+            edit.setEnabled(bool(state))
+            button.setEnabled(bool(state))
+
+    def changeTheme(self, darkTheme=False):
+        themeFolder = 'dark-theme' if darkTheme else 'light-theme'
+        selectionButtonPixmap = QPixmap(f'sources/icons/{themeFolder}/icons8-add-database-96.png').scaled(25, 25)
+        for button in self.selectionButtons:
+            button.setIcon(QIcon(selectionButtonPixmap))
+
+
 class AxisButton(QPushButton):
     def __init__(self, parent=None):
         super().__init__(parent)
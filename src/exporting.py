@@ -0,0 +1,241 @@
+######################## IMPORTS ########################
+import json
+import os
+from collections import OrderedDict
+from enum import Enum
+
+import pandas as pd
+from ecom.datatypes import StructType, ArrayType, DynamicSizeError
+from ecom.parser import Parser
+
+# --------------------- Sources ----------------------- #
+from sources.databases.balloondata import BalloonPackageDatabase
+from sources.sessions import readSession
+
+######################## CONSTANTS ########################
+EXPORT_EXTENSIONS = {'parquet': '.parquet', 'hdf5': '.h5', 'csv': '.csv'}
+DEFAULT_STRING_SIZE = 255
+
+
+######################## FUNCTIONS ########################
+def flattenData(data, prefix='', row=None):
+    """ Flatten nested structures and arrays into columns named like display arguments (struct/member/0). """
+    row = {} if row is None else row
+    if isinstance(data, dict):
+        for key, value in data.items():
+            flattenData(value, f'{prefix}{key}/', row)
+    elif isinstance(data, list):
+        for index, value in enumerate(data):
+            flattenData(value, f'{prefix}{index}/', row)
+    else:
+        row[prefix[:-1]] = data
+    return row
+
+
+def argumentUnits(database: BalloonPackageDatabase, telemetryName):
+    units = {}
+
+    def flattenUnits(level, prefix):
+        if isinstance(level, dict):
+            for key, value in level.items():
+                flattenUnits(value, f'{prefix}{key}/')
+        elif level is not None:
+            units[prefix[:-1]] = level
+
+    try:
+        _, selectedUnits = database.nestedPythonTypes(telemetryName, object)
+    except (KeyError, AttributeError, ValueError):
+        return units
+    flattenUnits(selectedUnits, '')
+    return units
+
+
+def argumentTypes(database: BalloonPackageDatabase, telemetryName):
+    """ Column type ('bool', 'int', 'float' or 'string') and maximum string length of each argument. """
+    types = {}
+
+    def flattenTypes(typeInfo, name):
+        if issubclass(typeInfo.type, StructType):
+            for childName, child in typeInfo.type:
+                flattenTypes(child, f'{name}/{childName}')
+        elif issubclass(typeInfo.type, ArrayType):
+            elementTypeInfo = typeInfo.type.getElementTypeInfo()
+            if not issubclass(elementTypeInfo.type, bytes):
+                flattenTypes(elementTypeInfo, name)
+                return
+            try:
+                types[name] = 'string', len(typeInfo.type)
+            except DynamicSizeError:
+                types[name] = 'string', Parser.DEFAULT_MAX_DYNAMIC_MEMBER_SIZE
+        elif issubclass(typeInfo.type, Enum):
+            types[name] = 'string', max((len(member.name) for member in typeInfo.type), default=1)
+        elif issubclass(typeInfo.type, bool):
+            types[name] = 'bool', None
+        elif issubclass(typeInfo.type, int):
+            types[name] = 'int', None
+        elif issubclass(typeInfo.type, float):
+            types[name] = 'float', None
+        elif issubclass(typeInfo.type, (bytes, str)):
+            types[name] = 'string', None
+
+    try:
+        for dataPoint in database.getTelemetryByName(telemetryName).data:
+            flattenTypes(dataPoint.type, dataPoint.name)
+    except (KeyError, AttributeError, ValueError):
+        return {}
+    return types
+
+
+def columnUnit(units, column):
+    # Array elements share the unit of their array
+    while column and column not in units:
+        column = column.rpartition('/')[0]
+    return units.get(column)
+
+
+def columnType(types, column):
+    # Array elements share the type of their array, whatever their index
+    return types.get('/'.join(part for part in column.split('/') if not part.isdigit()))
+
+
+######################## CLASSES ########################
+class TableWriter:
+    """
+    Appends chunks of one telemetry type to a file. Column types come from the database when it is known, so that a
+    column empty in the first chunk keeps its type once values arrive. The types of the other columns are inferred
+    from the chunks received before opening the file, up to lookAhead rows.
+    """
+
+    def __init__(self, path, fileFormat, units, types=None, lookAhead=262144):
+        self.path, self.fileFormat, self.units = path, fileFormat, units
+        self.types, self.lookAhead = types or {}, lookAhead
+        self.columns, self.stringSizes = None, {}
+        self._writer, self._schema, self._pending = None, None, []
+
+    def write(self, frame: pd.DataFrame):
+        if self._writer is None:
+            # Empty columns are given a type that the values of the other chunks take over when concatenating
+            self._pending.append(frame.astype({column: 'float64' for column in frame.columns
+                                               if frame[column].isna().all()}))
+            pending = pd.concat(self._pending, ignore_index=True)
+            if not self._typesKnown(pending) and len(pending) < self.lookAhead:
+                return
+            self._pending = []
+            self.columns = list(pending.columns)
+            self._open(pending)
+            frame = pending
+        else:
+            # Columns are fixed by the first chunks, dynamic arrays growing later are truncated
+            frame = frame.reindex(columns=self.columns)
+        # String columns not described by the database may still receive values of another type
+        frame = frame.assign(**{column: frame[column].where(frame[column].isna(), frame[column].astype(str))
+                                .astype(object) for column in self.stringSizes})
+        if self.fileFormat == 'parquet':
+            import pyarrow as pa
+            self._writer.write_table(pa.Table.from_pandas(frame, schema=self._schema, preserve_index=False, safe=False))
+        elif self.fileFormat == 'hdf5':
+            # Numbers are stored as floats so that missing values do not change the type of a column between chunks
+            numbers = [column for column in self.columns if column not in self.stringSizes]
+            frame = frame.astype({column: 'float64' for column in numbers})
+            self._writer.append('data', frame, format='table', data_columns=['time'] + list(self.stringSizes),
+                                index=False, min_itemsize=self.stringSizes)
+        else:
+            frame.to_csv(self._writer, header=False, index=False)
+
+    def _typesKnown(self, frame: pd.DataFrame):
+        return all(frame[column].notna().any() for column in frame.columns
+                   if column != 'time' and columnType(self.types, column) is None)
+
+    def _open(self, frame: pd.DataFrame):
+        units = {column: columnUnit(self.units, column) for column in self.columns if column != 'time'}
+        units['time'] = 's'
+        types = {column: columnType(self.types, column) for column in self.columns if column != 'time'}
+        types['time'] = 'float', None
+        for column, typeInfo in types.items():
+            if typeInfo is not None:
+                continue
+            # Columns unknown to the database, such as derived channels, keep the type of their first values. Those
+            # still empty are written as strings, which any value can be converted to
+            values = frame[column].dropna()
+            if values.empty or frame[column].dtype == object:
+                types[column] = 'string', None
+        self.stringSizes = {column: typeInfo[1] or DEFAULT_STRING_SIZE for column, typeInfo in types.items()
+                            if typeInfo is not None and typeInfo[0] == 'string'}
+        if self.fileFormat == 'parquet':
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            arrowTypes = {'bool': pa.bool_(), 'int': pa.int64(), 'float': pa.float64(), 'string': pa.string()}
+            fields = []
+            for field in pa.Schema.from_pandas(frame, preserve_index=False):
+                if types[field.name] is not None:
+                    field = field.with_type(arrowTypes[types[field.name][0]])
+                fields.append(field.with_metadata({'unit': units[field.name] or ''}))
+            self._schema = pa.schema(fields, metadata={'units': json.dumps(units)})
+            self._writer = pq.ParquetWriter(self.path, self._schema)
+        elif self.fileFormat == 'hdf5':
+            self._writer = pd.HDFStore(self.path, mode='w')
+            self._writer.put('units', pd.Series({column: unit or '' for column, unit in units.items()}))
+        else:
+            self._writer = open(self.path, 'w', newline='', encoding='utf-8')
+            frame.iloc[:0].to_csv(self._writer, index=False)
+            with open(os.path.splitext(self.path)[0] + '_units.json', 'w') as file:
+                json.dump(units, file, indent=2)
+
+    def close(self):
+        if self._pending:
+            # Columns never received within the session are written empty, the last chunk opens the file
+            self.lookAhead = 0
+            self.write(self._pending.pop())
+        if self._writer is not None:
+            self._writer.close()
+
+
+class SessionExporter:
+    """
+    Converts a recorded session into one columnar file per telemetry type, streaming it in chunks so that the
+    memory used does not depend on the session length.
+    """
+
+    def __init__(self, path, fileFormat='parquet', chunkSize=65536):
+        if fileFormat not in EXPORT_EXTENSIONS:
+            raise ValueError(f'Unsupported export format {fileFormat}')
+        self.currentDir = path
+        self.formatDir = os.path.join(self.currentDir, 'parsers')
+        self.fileFormat, self.chunkSize = fileFormat, chunkSize
+        self.databases = {}
+
+    def export(self, sessionPath, outputDirectory):
+        os.makedirs(outputDirectory, exist_ok=True)
+        writers = OrderedDict()
+        try:
+            for records in readSession(sessionPath, chunkSize=self.chunkSize):
+                rows = OrderedDict()
+                for record in records:
+                    row = flattenData(record['data'])
+                    row['time'] = record.get('time')
+                    rows.setdefault((record['parser'], record['type']), []).append(row)
+                for key, typeRows in rows.items():
+                    if key not in writers:
+                        writers[key] = self._createWriter(*key, outputDirectory)
+                    frame = pd.DataFrame(typeRows)
+                    columns = ['time'] + [column for column in frame.columns if column != 'time']
+                    writers[key].write(frame[columns])
+        finally:
+            for writer in writers.values():
+                writer.close()
+        return [writer.path for writer in writers.values()]
+
+    def _createWriter(self, parserName, telemetryType, outputDirectory):
+        extension = EXPORT_EXTENSIONS[self.fileFormat]
+        path = os.path.join(outputDirectory, f'{parserName}_{telemetryType}{extension}')
+        database = self._database(parserName)
+        if database is None:
+            return TableWriter(path, self.fileFormat, {})
+        return TableWriter(path, self.fileFormat, argumentUnits(database, telemetryType),
+                           argumentTypes(database, telemetryType))
+
+    def _database(self, parserName):
+        if parserName not in self.databases:
+            databasePath = os.path.join(self.formatDir, parserName)
+            self.databases[parserName] = BalloonPackageDatabase(databasePath) if os.path.isdir(databasePath) else None
+        return self.databases[parserName]
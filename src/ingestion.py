@@ -0,0 +1,511 @@
+######################## IMPORTS ########################
+import copy
+import json
+import os
+import queue
+import random
+import socket
+import string
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from enum import Enum
+from typing import Dict, Any, Iterator
+
+from ecom.checksum import ChecksumVerifier
+from ecom.database import CommunicationDatabase
+from ecom.datatypes import TypeInfo, StructType, ArrayType, DynamicSizeError
+from ecom.message import TelemetryDatapointType, TelemetryType
+from ecom.parser import TelemetryParser, Parser
+from ecom.serializer import TelemetrySerializer
+from serial import Serial
+
+# --------------------- Sources ----------------------- #
+from sources.common.utilities.fileSystem import loadSettings
+from sources.databases.balloondata import BalloonPackageDatabase, EComValueJsonEncoder
+
+
+######################## FUNCTIONS ########################
+def iterateRequiredDatapoints(telecommand: TelemetryType) -> Iterator[TelemetryDatapointType]:
+    parameters = OrderedDict()
+    for parameter in telecommand.data:
+        parameters[parameter.name] = parameter
+        if issubclass(parameter.type.type, ArrayType):
+            try:
+                len(parameter.type.type)
+            except DynamicSizeError as error:
+                parameters.pop(error.sizeMember, None)
+    return (parameter for parameter in parameters.values())
+
+
+def saveParserData(parserName, telemetryType, content, dataDirectory):
+    try:
+        currentDatetime = datetime.now()
+        timeString = currentDatetime.strftime('%Y%m%d%H%M%S')
+        fileName = f'{telemetryType}_{timeString}.json'
+        parserDirectory = os.path.join(dataDirectory, parserName)
+        telemetryTypeDirectory = os.path.join(parserDirectory, telemetryType)
+        if not os.path.exists(parserDirectory):
+            os.mkdir(parserDirectory)
+        if not os.path.exists(telemetryTypeDirectory):
+            os.mkdir(telemetryTypeDirectory)
+        with open(os.path.join(telemetryTypeDirectory, fileName), "w") as file:
+            json.dump(content, file, indent=2, ensure_ascii=True, cls=EComValueJsonEncoder)
+
+    except Exception as e:
+        print(f"Error occurred: {e}")
+        print("Printing content due to error:")
+        print(telemetryType, content)
+
+
+def openSource(description: str, baud=None, timeout=1.0):
+    scheme, separator, location = description.partition('://')
+    if not separator:
+        return SerialSource(description, baud, timeout=timeout)
+    if scheme in ('tcp', 'udp'):
+        host, _, port = location.rpartition(':')
+        return NetworkSource(host, int(port), protocol=scheme, timeout=timeout)
+    if scheme == 'file':
+        return FileReplay(location)
+    raise ValueError(f'Unsupported input source {description}')
+
+
+def receiverDescriptions(settings):
+    if settings['EMULATOR_MODE']:
+        return [('emulator', None, settings['FORMAT_FILES'])]
+    receivers = []
+    for receiver in settings.get('RECEIVERS', []):
+        source, baud, formatFiles = receiver[0], receiver[1] if len(receiver) > 1 else '', receiver[2:]
+        receivers.append((source, baud or settings['SELECTED_BAUD'], formatFiles or settings['FORMAT_FILES']))
+    if not receivers:
+        source = settings.get('INPUT_SOURCE') or settings['SELECTED_PORT']
+        receivers.append((source, settings['SELECTED_BAUD'], settings['FORMAT_FILES']))
+    return receivers
+
+
+######################## CLASSES ########################
+class InputSource:
+    name = ''
+    exhausted = False
+
+    def read(self, size: int) -> bytes:
+        raise NotImplementedError
+
+    def inWaiting(self) -> int:
+        return 1
+
+    def readAvailable(self) -> bytes:
+        return self.read(self.inWaiting() or 1)
+
+    def close(self):
+        pass
+
+
+class SerialSource(InputSource):
+    def __init__(self, port, baud, timeout=1.0):
+        self.serial = Serial(port, baud, timeout=timeout)
+        self.name = f'{port} at {baud} bauds'
+
+    def read(self, size: int) -> bytes:
+        return self.serial.read(size)
+
+    def inWaiting(self) -> int:
+        return self.serial.inWaiting()
+
+    def close(self):
+        self.serial.close()
+
+
+class NetworkSource(InputSource):
+    def __init__(self, host, port, protocol='tcp', timeout=1.0, bufferSize=65536):
+        self.protocol, self.bufferSize = protocol, bufferSize
+        self.name = f'{protocol}://{host}:{port}'
+        if protocol == 'tcp':
+            self.socket = socket.create_connection((host, port), timeout=timeout)
+            self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        else:
+            # UDP receivers push datagrams, so listen on the given address
+            self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.socket.bind((host, port))
+            self.socket.settimeout(timeout)
+
+    def read(self, size: int) -> bytes:
+        try:
+            data = self.socket.recv(max(size, self.bufferSize))
+        except socket.timeout:
+            return b''
+        if not data and self.protocol == 'tcp':
+            self.exhausted = True
+        return data
+
+    def close(self):
+        self.socket.close()
+
+
+class SerialEmulator(InputSource):
+    name = 'emulator'
+
+    def __init__(self, databases: Dict[str, CommunicationDatabase]):
+        self._databases = databases
+
+    def read(self, _: int) -> bytes:
+        data = b''
+        for database in self._databases.values():
+            verifier = ChecksumVerifier(database)
+            serializer = TelemetrySerializer(database, verifier=verifier)
+            for telemetryType in database.telemetryTypes:
+                dataPoints = {}
+                for dataPointType in iterateRequiredDatapoints(telemetryType):
+                    dataPoints[dataPointType.name] = self._randomValueForType(database, dataPointType.type, dataPoints)
+                data += serializer.serialize(telemetryType, **dataPoints)
+        time.sleep(1)
+        return data
+
+    def _randomValueForType(
+            self, database: CommunicationDatabase, typeInfo: TypeInfo, pastValues: Dict[str, Any]) -> Any:
+        if issubclass(typeInfo.type, StructType):
+            children = {}
+            for childName, childTypeInfo in typeInfo.type:
+                children[childName] = self._randomValueForType(database, childTypeInfo, children)
+            return typeInfo.type(children)
+        if issubclass(typeInfo.type, ArrayType):
+            elementTypeInfo = typeInfo.type.getElementTypeInfo()
+            try:
+                size = len(typeInfo.type)
+            except DynamicSizeError as error:
+                size = pastValues.get(error.sizeMember)
+                if size is None:
+                    maxBytes = min(Parser.DEFAULT_MAX_DYNAMIC_MEMBER_SIZE, 127)
+                    elementSize = elementTypeInfo.getSize(database)
+                    size = maxBytes // elementSize
+            if issubclass(elementTypeInfo.type, bytes):
+                return ''.join(random.choices(string.printable, k=size)).encode('utf-8', errors='ignore')
+            return typeInfo.type([self._randomValueForType(database, elementTypeInfo, pastValues) for _ in range(size)])
+        if issubclass(typeInfo.type, bool):
+            return random.choice([True, False])
+        if issubclass(typeInfo.type, Enum):
+            return random.choice(list(typeInfo.type))
+        if issubclass(typeInfo.type, int):
+            minValue = typeInfo.getMinNumericValue(database)
+            maxValue = typeInfo.getMaxNumericValue(database)
+            return random.randint(minValue, maxValue)
+        if issubclass(typeInfo.type, float):
+            minValue = typeInfo.getMinNumericValue(database)
+            maxValue = typeInfo.getMaxNumericValue(database)
+            return random.uniform(minValue, maxValue)
+        if issubclass(typeInfo.type, str):
+            return random.choice(string.printable)
+        raise TypeError(f'Unsupported type {typeInfo}')
+
+
+class FileReplay(InputSource):
+    def __init__(self, path, chunkSize=4096, rate=None):
+        self.file = open(path, 'rb')
+        self.name = path
+        self.chunkSize, self.rate = chunkSize, rate
+        self.exhausted = False
+
+    def read(self, size: int) -> bytes:
+        data = self.file.read(max(size, self.chunkSize))
+        if not data:
+            self.exhausted = True
+        elif self.rate:
+            time.sleep(len(data) / self.rate)
+        return data
+
+    def inWaiting(self) -> int:
+        return self.chunkSize
+
+    def close(self):
+        self.file.close()
+
+
+class SessionLog:
+    def __init__(self, dataDirectory, name=None, flushInterval=1.0):
+        self.directory = os.path.join(dataDirectory, 'sessions')
+        os.makedirs(self.directory, exist_ok=True)
+        if name is None:
+            name = datetime.now().strftime('session_%Y%m%d_%H%M%S')
+        self.path = os.path.join(self.directory, f'{name}.jsonl')
+        self.file = open(self.path, 'a', encoding='utf-8')
+        self.flushInterval, self.lastFlush = flushInterval, time.monotonic()
+        self.nbRecords = 0
+
+    def write(self, record):
+        self.file.write(json.dumps(record, ensure_ascii=True, cls=EComValueJsonEncoder) + '\n')
+        self.nbRecords += 1
+        now = time.monotonic()
+        if now - self.lastFlush >= self.flushInterval:
+            self.file.flush()
+            self.lastFlush = now
+
+    def close(self):
+        if not self.file.closed:
+            self.file.flush()
+            self.file.close()
+
+
+class TelemetryIngest:
+    def __init__(self, path, settings=None):
+        self.currentDir = path
+        self.settings = settings if settings is not None else loadSettings(os.path.join(path, 'settings'))
+        self.dataDir = os.path.join(self.currentDir, 'data')
+        self.formatDir = os.path.join(self.currentDir, 'parsers')
+        self.databases, self.parsers = {}, {}
+
+    def loadDatabases(self, formatFiles=None):
+        self.databases, self.parsers = {}, {}
+        if formatFiles is None:
+            formatFiles = self.settings['FORMAT_FILES']
+        for path in formatFiles:
+            path = os.path.join(self.formatDir, path)
+            name, database = os.path.basename(path), BalloonPackageDatabase(path)
+            self.parsers[name] = TelemetryParser(database)
+            self.databases[name] = database
+        return self.databases
+
+    def openConnection(self, port=None, baud=None):
+        if self.settings['EMULATOR_MODE']:
+            return SerialEmulator(self.databases)
+        if port is None:
+            port = self.settings.get('INPUT_SOURCE') or self.settings['SELECTED_PORT']
+        baud = baud if baud is not None else self.settings['SELECTED_BAUD']
+        return openSource(port, baud)
+
+    def parse(self, received, errorHandler=print):
+        for parserName, parser in self.parsers.items():
+            telemetries = parser.parse(received, errorHandler=errorHandler)
+            if telemetries:
+                for telemetry in telemetries:
+                    if isinstance(telemetry, dict):
+                        content, telemetryType = telemetry, 'Default'
+                    else:
+                        content, telemetryType = telemetry.data, telemetry.type.name
+                    yield {'parser': parserName, 'type': telemetryType, 'time': time.time(), 'data': content}, telemetry
+
+
+class DuplicateFilter:
+    """
+    Drops the copies of a frame delivered by other receivers within the window. Identical frames from the same receiver
+    are distinct packets carrying unchanged values and are always kept.
+    """
+
+    def __init__(self, window=0.5, maxSize=4096):
+        self.window, self.maxSize = window, maxSize
+        self.seen = OrderedDict()
+        self.nbDuplicates = 0
+
+    @staticmethod
+    def frameKey(record, telemetry=None):
+        header = getattr(telemetry, 'header', None)
+        checksum = header.get('checksum') if isinstance(header, dict) else None
+        return record['parser'], record['type'], checksum, hash(repr(record['data']))
+
+    def isDuplicate(self, record, telemetry=None) -> bool:
+        now, source = record.get('time', time.time()), record.get('source')
+        key = self.frameKey(record, telemetry)
+        entry = self.seen.get(key)
+        # The window runs from the first sighting of the frame, later copies do not extend it
+        if entry is not None and now - entry[0] <= self.window and source not in entry[1]:
+            entry[1].add(source)
+            self.nbDuplicates += 1
+            return True
+        self.seen.pop(key, None)
+        self.seen[key] = now, {source}
+        if len(self.seen) > self.maxSize:
+            self.seen.popitem(last=False)
+        return False
+
+
+class ArrivalTracker:
+    """ Arrival statistics of one telemetry type, updated in constant time with the timestamp of each record. """
+    SMOOTHING = 0.2
+    GAP_FACTOR = 3.0
+    TIMEOUT = 10.0
+
+    def __init__(self, timeout=TIMEOUT):
+        self.timeout = timeout
+        self.nbPackets, self.nbGaps = 0, 0
+        self.lastArrival, self.meanInterval, self.longestGap = None, None, 0.0
+        self.stale = False
+
+    def update(self, arrival):
+        if self.lastArrival is not None:
+            interval = arrival - self.lastArrival
+            if self.meanInterval is None:
+                self.meanInterval = interval
+            else:
+                if interval > self.GAP_FACTOR * self.meanInterval:
+                    self.nbGaps += 1
+                    self.longestGap = max(self.longestGap, interval)
+                # Gaps are smoothed in as well, so a lasting change of rate is eventually followed
+                self.meanInterval += self.SMOOTHING * (interval - self.meanInterval)
+        self.lastArrival = arrival
+        self.nbPackets += 1
+        self.stale = False
+
+    @property
+    def rate(self):
+        return 1 / self.meanInterval if self.meanInterval else None
+
+    def age(self, now):
+        return None if self.lastArrival is None else now - self.lastArrival
+
+    def isStale(self, now):
+        if self.lastArrival is None:
+            return False
+        if self.meanInterval is None:
+            # A single packet gives no rate to compare with
+            return now - self.lastArrival > self.timeout
+        # Fast telemetries are given at least a few seconds before being flagged
+        return now - self.lastArrival > self.GAP_FACTOR * max(self.meanInterval, 1.0)
+
+
+class ArrivalStatistics:
+    """
+    Arrival trackers of every telemetry type, fed with the ingested records so that rates follow their timestamps
+    rather than the moment they are handled.
+    """
+
+    def __init__(self, timeout=ArrivalTracker.TIMEOUT):
+        self.timeout = timeout
+        self.trackers = {}  # type: dict[tuple[str, str], ArrivalTracker]
+        # Records are tracked by the acquisition thread while displays read the statistics
+        self._lock = threading.Lock()
+
+    @classmethod
+    def fromSettings(cls, settings):
+        return cls(float(settings.get('STALE_TIMEOUT') or ArrivalTracker.TIMEOUT))
+
+    def track(self, parserName, telemetryType) -> ArrivalTracker:
+        with self._lock:
+            return self.trackers.setdefault((parserName, telemetryType), ArrivalTracker(self.timeout))
+
+    def update(self, record):
+        with self._lock:
+            tracker = self.trackers.setdefault((record['parser'], record['type']), ArrivalTracker(self.timeout))
+            tracker.update(record.get('time', time.time()))
+
+    def reset(self):
+        with self._lock:
+            for key in self.trackers:
+                self.trackers[key] = ArrivalTracker(self.timeout)
+
+    def snapshot(self):
+        """ Copy of the trackers of every telemetry type, safe to read while records keep arriving. """
+        with self._lock:
+            return {key: copy.copy(tracker) for key, tracker in self.trackers.items()}
+
+    def checkStaleness(self, now=None):
+        """ Telemetry types that stopped arriving since the last check. """
+        now = time.time() if now is None else now
+        stale = []
+        with self._lock:
+            for key, tracker in self.trackers.items():
+                if not tracker.stale and tracker.isStale(now):
+                    tracker.stale = True
+                    stale.append(key)
+        return stale
+
+    def describe(self, key, now=None):
+        with self._lock:
+            tracker = copy.copy(self.trackers[key])
+        now = time.time() if now is None else now
+        rate = f'{tracker.rate:.2f} Hz' if tracker.rate is not None else '-'
+        age = f'{tracker.age(now):.1f} s ago' if tracker.lastArrival is not None else 'never'
+        return f'{key[0]}/{key[1]} : {tracker.nbPackets} packets, {rate}, last {age}, {tracker.nbGaps} gaps'
+
+
+class AcquisitionWorker(threading.Thread):
+    def __init__(self, ingest: TelemetryIngest, connection: InputSource, records: queue.Queue,
+                 errorHandler=print, rawHandler=None):
+        super().__init__(daemon=True)
+        self.ingest, self.connection = ingest, connection
+        self.records = records
+        self.errorHandler, self.rawHandler = errorHandler, rawHandler
+        self._active = True
+
+    def run(self):
+        try:
+            while self._active and not self.connection.exhausted:
+                received = self.connection.readAvailable()
+                if self.rawHandler is not None and received:
+                    self.rawHandler(self.connection.name, received)
+                for record, telemetry in self.ingest.parse(received, errorHandler=self.errorHandler):
+                    record['source'] = self.connection.name
+                    self.records.put((record, telemetry))
+        except Exception as error:
+            self.errorHandler(f'{self.connection.name} : {error}')
+        finally:
+            self.connection.close()
+            self.records.put(None)
+
+    def interrupt(self):
+        self._active = False
+
+
+class AcquisitionGroup:
+    def __init__(self, path, settings, receivers=None, errorHandler=print, rawHandler=None, deduplicate=True):
+        self.currentDir, self.settings = path, settings
+        self.receivers = receivers if receivers is not None else receiverDescriptions(settings)
+        self.errorHandler, self.rawHandler = errorHandler, rawHandler
+        window = float(settings.get('DUPLICATE_WINDOW') or 0)
+        # Duplicates can only come from another receiver
+        deduplicate = deduplicate and window > 0 and len(self.receivers) > 1
+        self.duplicateFilter = DuplicateFilter(window) if deduplicate else None
+        self.records = queue.Queue()
+        self.workers = []  # type: list[AcquisitionWorker]
+        self._nbRunning = 0
+
+    @property
+    def active(self) -> bool:
+        return self._nbRunning > 0 or not self.records.empty()
+
+    @property
+    def nbDuplicates(self) -> int:
+        return self.duplicateFilter.nbDuplicates if self.duplicateFilter is not None else 0
+
+    def start(self):
+        try:
+            for source, baud, formatFiles in self.receivers:
+                ingest = TelemetryIngest(self.currentDir, self.settings)
+                ingest.loadDatabases(formatFiles)
+                connection = ingest.openConnection(source, baud)
+                self.workers.append(AcquisitionWorker(ingest, connection, self.records, self.errorHandler,
+                                                      self.rawHandler))
+        except Exception:
+            # Workers are not started yet, the receivers already opened would otherwise never be closed
+            for worker in self.workers:
+                worker.connection.close()
+            self.workers = []
+            raise
+        self._nbRunning = len(self.workers)
+        for worker in self.workers:
+            worker.start()
+        return [worker.connection.name for worker in self.workers]
+
+    def receive(self, timeout=0.1):
+        try:
+            items = [self.records.get(timeout=timeout)]
+        except queue.Empty:
+            return
+        while True:
+            try:
+                items.append(self.records.get_nowait())
+            except queue.Empty:
+                break
+        for item in items:
+            if item is None:
+                self._nbRunning -= 1
+                continue
+            record, telemetry = item
+            if self.duplicateFilter is not None and self.duplicateFilter.isDuplicate(record, telemetry):
+                continue
+            yield record, telemetry
+
+    def interrupt(self, timeout=2.0):
+        for worker in self.workers:
+            worker.interrupt()
+        for worker in self.workers:
+            worker.join(timeout)
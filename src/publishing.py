@@ -0,0 +1,149 @@
+######################## IMPORTS ########################
+import json
+import queue
+import socket
+import struct
+import threading
+
+# --------------------- Sources ----------------------- #
+from sources.databases.balloondata import EComValueJsonEncoder
+
+######################## CONSTANTS ########################
+DEFAULT_PUBLISH_HOST = '127.0.0.1'
+DEFAULT_PUBLISH_PORT = 9660
+FRAME_HEADER = struct.Struct('>I')
+
+
+######################## FUNCTIONS ########################
+def parseAddress(address, defaultHost=DEFAULT_PUBLISH_HOST, defaultPort=DEFAULT_PUBLISH_PORT):
+    """ Host and port of a 'host:port', 'host' or ':port' address, raising a ValueError for an invalid port. """
+    address = address.strip()
+    host, separator, port = address.rpartition(':')
+    if not separator:
+        host, port = address, ''
+    try:
+        port = int(port) if port else defaultPort
+    except ValueError:
+        raise ValueError(f"invalid port in address '{address}'")
+    if not 0 <= port <= 65535:
+        raise ValueError(f"port out of range in address '{address}'")
+    return host or defaultHost, port
+
+
+def encodeRecord(record) -> bytes:
+    payload = json.dumps(record, ensure_ascii=True, separators=(',', ':'), cls=EComValueJsonEncoder).encode('ascii')
+    return FRAME_HEADER.pack(len(payload)) + payload
+
+
+######################## CLASSES ########################
+class RecordDecoder:
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def feed(self, data: bytes):
+        self.buffer += data
+        records = []
+        while len(self.buffer) >= FRAME_HEADER.size:
+            size, = FRAME_HEADER.unpack_from(self.buffer)
+            end = FRAME_HEADER.size + size
+            if len(self.buffer) < end:
+                break
+            records.append(json.loads(self.buffer[FRAME_HEADER.size:end]))
+            del self.buffer[:end]
+        return records
+
+
+class TelemetryPublisher:
+    def __init__(self, host=DEFAULT_PUBLISH_HOST, port=DEFAULT_PUBLISH_PORT, queueSize=4096):
+        self.host, self.port = host, port
+        self.queueSize = queueSize
+        self.subscribers = {}  # type: dict[socket.socket, queue.Queue]
+        self.nbDropped = 0
+        self._lock = threading.Lock()
+        self._active = False
+        self._server = None
+
+    def start(self):
+        self._server = socket.create_server((self.host, self.port))
+        self.port = self._server.getsockname()[1]
+        self._active = True
+        threading.Thread(target=self._acceptLoop, daemon=True).start()
+        return self
+
+    def publish(self, record):
+        if not self.subscribers:
+            return
+        frame = encodeRecord(record)
+        with self._lock:
+            subscribers = list(self.subscribers.values())
+        for frames in subscribers:
+            try:
+                frames.put_nowait(frame)
+            except queue.Full:
+                self.nbDropped += 1
+
+    def close(self):
+        self._active = False
+        if self._server is not None:
+            self._server.close()
+        with self._lock:
+            subscribers = list(self.subscribers.items())
+            self.subscribers.clear()
+        for connection, frames in subscribers:
+            frames.put(None)
+            connection.close()
+
+    def _acceptLoop(self):
+        while self._active:
+            try:
+                connection, _ = self._server.accept()
+            except OSError:
+                break
+            connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            frames = queue.Queue(maxsize=self.queueSize)
+            with self._lock:
+                self.subscribers[connection] = frames
+            threading.Thread(target=self._sendLoop, args=(connection, frames), daemon=True).start()
+
+    def _sendLoop(self, connection, frames):
+        closing = False
+        while self._active and not closing:
+            frame = frames.get()
+            if frame is None:
+                break
+            # Coalesce whatever accumulated while the previous send was blocking
+            chunks = [frame]
+            while not frames.empty() and len(chunks) < 256:
+                frame = frames.get_nowait()
+                if frame is None:
+                    # The frames received before closing are still sent
+                    closing = True
+                    break
+                chunks.append(frame)
+            try:
+                connection.sendall(b''.join(chunks))
+            except OSError:
+                break
+        with self._lock:
+            self.subscribers.pop(connection, None)
+        connection.close()
+
+
+class TelemetrySubscriber:
+    def __init__(self, host=DEFAULT_PUBLISH_HOST, port=DEFAULT_PUBLISH_PORT, timeout=1.0):
+        self.connection = socket.create_connection((host, port), timeout=timeout)
+        self.decoder = RecordDecoder()
+        self.exhausted = False
+
+    def receive(self, size=65536):
+        try:
+            data = self.connection.recv(size)
+        except socket.timeout:
+            return []
+        if not data:
+            self.exhausted = True
+            return []
+        return self.decoder.feed(data)
+
+    def close(self):
+        self.connection.close()
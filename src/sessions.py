@@ -0,0 +1,88 @@
+######################## IMPORTS ########################
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Iterator
+
+######################## CONSTANTS ########################
+SESSION_EXTENSION = '.jsonl'
+
+
+######################## FUNCTIONS ########################
+def listSessions(dataDirectory):
+    sessionDirectory = os.path.join(dataDirectory, 'sessions')
+    if not os.path.isdir(sessionDirectory):
+        return []
+    sessions = [os.path.join(sessionDirectory, name) for name in os.listdir(sessionDirectory)
+                if name.endswith(SESSION_EXTENSION)]
+    return sorted(sessions, key=os.path.getmtime)
+
+
+def readSessionLog(path, chunkSize=65536) -> Iterator[list]:
+    """ Stream a session log as lists of records, keeping at most chunkSize decoded records in memory. """
+    decode = json.JSONDecoder().decode
+    with open(path, 'r', encoding='utf-8') as file:
+        while True:
+            lines = list(islice(file, chunkSize))
+            if not lines:
+                break
+            records = []
+            for line in lines:
+                try:
+                    records.append(decode(line))
+                except ValueError:
+                    # The last line of a session interrupted while writing may be truncated
+                    continue
+            yield records
+
+
+def _readLegacyFile(path):
+    try:
+        with open(path, 'r') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def readLegacyTree(dataDirectory, parsers=None, chunkSize=4096, maxWorkers=8) -> Iterator[list]:
+    """ Stream the per packet JSON files of data/<parser>/<type>/ as lists of records sorted by time. """
+    files = []
+    for parserName in sorted(os.listdir(dataDirectory)):
+        parserDirectory = os.path.join(dataDirectory, parserName)
+        if parserName.startswith('_') or parserName in ('sessions', 'saves', 'exports'):
+            continue
+        if not os.path.isdir(parserDirectory) or (parsers is not None and parserName not in parsers):
+            continue
+        for telemetryType in os.listdir(parserDirectory):
+            typeDirectory = os.path.join(parserDirectory, telemetryType)
+            if not os.path.isdir(typeDirectory):
+                continue
+            with os.scandir(typeDirectory) as entries:
+                for entry in entries:
+                    if entry.name.endswith('.json'):
+                        files.append((entry.stat().st_mtime, entry.path, parserName, telemetryType))
+    files.sort()
+    with ThreadPoolExecutor(max_workers=maxWorkers) as executor:
+        for start in range(0, len(files), chunkSize):
+            chunk = files[start:start + chunkSize]
+            records = []
+            results = executor.map(_readLegacyFile, [path for _, path, _, _ in chunk])
+            for (timestamp, _, parserName, telemetryType), data in zip(chunk, results):
+                if data is not None:
+                    records.append({'parser': parserName, 'type': telemetryType, 'time': timestamp, 'data': data})
+            yield records
+
+
+def readSession(path, **kwargs) -> Iterator[list]:
+    if os.path.isdir(path):
+        return readLegacyTree(path, **kwargs)
+    return readSessionLog(path, **kwargs)
+
+
+def loadSession(path, storage, **kwargs) -> int:
+    nbRecords = 0
+    for records in readSession(path, **kwargs):
+        storage.extend(records)
+        nbRecords += len(records)
+    return nbRecords
@@ -0,0 +1,97 @@
+import json
+import os
+import tempfile
+import unittest
+
+from sources.alarms import NOMINAL, RED, STALE, YELLOW, AlarmLog, LimitChecker
+
+LIMITS = {
+    'P/T/pressure': {'YELLOW': [900, 1100], 'RED': [800, 1200], 'STALE_AFTER': 5},
+    'P/T/sensors/1/temperature': {'RED': [None, 80]},
+    'P/T/speed': {'MAX_RATE': 10},
+}
+
+
+def makeRecord(time, **data):
+    return {'parser': 'P', 'type': 'T', 'time': time, 'data': data}
+
+
+class LimitCheckerTest(unittest.TestCase):
+    def setUp(self):
+        self.checker = LimitChecker(LIMITS, now=0.0)
+
+    def levels(self, time, **data):
+        return {event['argument']: event['level'] for event in self.checker.evaluate(makeRecord(time, **data))}
+
+    def testLowAndHighThresholds(self):
+        self.assertEqual(self.levels(1.0, pressure=1000), {})
+        self.assertEqual(self.levels(2.0, pressure=1150), {'P/T/pressure': YELLOW})
+        self.assertEqual(self.levels(3.0, pressure=1250), {'P/T/pressure': RED})
+        self.assertEqual(self.levels(4.0, pressure=850), {'P/T/pressure': YELLOW})
+        self.assertEqual(self.levels(5.0, pressure=750), {'P/T/pressure': RED})
+        self.assertEqual(self.levels(6.0, pressure=1000), {'P/T/pressure': NOMINAL})
+
+    def testOnlyTransitionsAreReported(self):
+        events = self.checker.evaluate(makeRecord(1.0, pressure=1150))
+        self.assertEqual(events, [{'argument': 'P/T/pressure', 'level': YELLOW, 'previous': NOMINAL,
+                                   'value': 1150.0, 'time': 1.0}])
+        self.assertEqual(self.levels(2.0, pressure=1160), {})
+
+    def testMissingBoundIsNeverExceeded(self):
+        self.assertEqual(self.levels(1.0, sensors=[{}, {'temperature': -100}]), {})
+        self.assertEqual(self.levels(2.0, sensors=[{}, {'temperature': 90}]), {'P/T/sensors/1/temperature': RED})
+
+    def testMissingValueKeepsTheLevel(self):
+        self.levels(1.0, pressure=1250)
+        self.assertEqual(self.levels(2.0), {})
+
+    def testRateOfChange(self):
+        self.assertEqual(self.levels(1.0, speed=0), {})
+        self.assertEqual(self.levels(2.0, speed=5), {})
+        self.assertEqual(self.levels(3.0, speed=30), {'P/T/speed': YELLOW})
+        self.assertEqual(self.levels(4.0, speed=31), {'P/T/speed': NOMINAL})
+
+    def testOtherTypesAreIgnored(self):
+        self.assertEqual(self.checker.evaluate({'parser': 'P', 'type': 'OTHER', 'time': 1.0, 'data': {}}), [])
+
+    def testStaleness(self):
+        self.assertEqual(self.checker.checkStaleness(now=4.0), [])
+        # Arguments never received go stale from the start
+        self.assertEqual([event['level'] for event in self.checker.checkStaleness(now=6.0)], [STALE])
+        self.assertEqual(self.checker.checkStaleness(now=7.0), [])
+        self.assertEqual(self.levels(8.0, pressure=1000), {'P/T/pressure': NOMINAL})
+        self.assertEqual(self.checker.checkStaleness(now=12.0), [])
+        events = self.checker.checkStaleness(now=14.0)
+        self.assertEqual([(event['argument'], event['previous'], event['level']) for event in events],
+                         [('P/T/pressure', NOMINAL, STALE)])
+
+
+class AlarmLogTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def testEventsAreWrittenAsJsonLines(self):
+        log = AlarmLog(self.directory.name, name='session')
+        self.assertFalse(os.path.exists(log.path))
+        events = LimitChecker(LIMITS, now=0.0).evaluate(makeRecord(1.0, pressure=1250, speed=0))
+        log.write(events)
+        log.write([{'argument': 'P/T/pressure', 'level': STALE, 'previous': RED, 'value': 1250.0, 'time': 10.0}])
+        log.close()
+        with open(os.path.join(self.directory.name, 'alarms', 'session.jsonl'), encoding='utf-8') as file:
+            lines = [json.loads(line) for line in file]
+        self.assertEqual(lines, events + [{'argument': 'P/T/pressure', 'level': STALE, 'previous': RED,
+                                           'value': 1250.0, 'time': 10.0}])
+        self.assertEqual(log.nbEvents, 2)
+
+    def testDescribe(self):
+        event = {'argument': 'P/T/pressure', 'level': RED, 'previous': YELLOW, 'value': 1250.0, 'time': 0.0}
+        self.assertTrue(AlarmLog.describe(event).endswith('P/T/pressure : YELLOW -> RED (1250)'))
+        event.update(level=STALE, previous=RED)
+        self.assertTrue(AlarmLog.describe(event).endswith('P/T/pressure : RED -> STALE'))
+
+
+if __name__ == '__main__':
+    unittest.main()
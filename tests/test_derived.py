@@ -0,0 +1,123 @@
+import math
+import os
+import unittest
+
+from sources.derived import DerivedChannel, DerivedChannelError, DerivedChannels, loadUnitAliases
+
+UNITS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src', 'common',
+                          'defaultUnits.csv')
+
+
+def makeRecord(time, **data):
+    return {'parser': 'P', 'type': 'T', 'time': time, 'data': data}
+
+
+class ExpressionSandboxTest(unittest.TestCase):
+    def assertRejected(self, expression):
+        with self.assertRaises(DerivedChannelError):
+            DerivedChannel('P/T/derived', expression)
+
+    def testAttributeAccessIsRejected(self):
+        self.assertRejected('pressure.real')
+        self.assertRejected('pressure.__class__')
+
+    def testCallsOutsideTheFunctionsAreRejected(self):
+        self.assertRejected("open('flight.csv')")
+        self.assertRejected("__import__('os')")
+        self.assertRejected("pressure.sum()")
+        self.assertRejected('sqrt(x=pressure)')
+        self.assertRejected('(lambda: 1)()')
+
+    def testImportsAreRejected(self):
+        self.assertRejected('import os')
+        self.assertRejected("[os for os in __import__('os')]")
+
+    def testErrorsAreCollected(self):
+        channels = DerivedChannels({'P/T/good': 'sqrt(pressure)', 'P/T/bad': 'pressure.real', 'bad': '1'})
+        self.assertEqual(len(channels), 1)
+        self.assertEqual(len(channels.errors), 2)
+
+    def testArgumentsAreCollected(self):
+        channel = DerivedChannel('P/T/derived', "sqrt(position[0] ** 2 + speed) * pi")
+        self.assertEqual(channel.arguments, {'position', 'speed'})
+
+
+class StatefulFunctionsTest(unittest.TestCase):
+    def testRateAndDeltaAtIngest(self):
+        channels = DerivedChannels({'P/T/rate': 'rate(altitude)', 'P/T/delta': 'delta(altitude)'})
+        first = channels.apply(makeRecord(10.0, altitude=100.0))['data']
+        self.assertTrue(math.isnan(first['rate']) and math.isnan(first['delta']))
+        second = channels.apply(makeRecord(12.0, altitude=110.0))['data']
+        self.assertEqual((second['rate'], second['delta']), (5.0, 10.0))
+        third = channels.apply(makeRecord(13.0, altitude=104.0))['data']
+        self.assertEqual((third['rate'], third['delta']), (-6.0, -6.0))
+
+    def testEachCallSiteKeepsItsOwnState(self):
+        channels = DerivedChannels({'P/T/sum': 'delta(a) + delta(b)'})
+        channels.apply(makeRecord(0.0, a=1.0, b=10.0))
+        self.assertEqual(channels.apply(makeRecord(1.0, a=2.0, b=30.0))['data']['sum'], 21.0)
+
+    def testColumnsMatchIngest(self):
+        definitions = {'P/T/rate': 'rate(altitude)'}
+        derived = DerivedChannels(definitions).evaluateColumns('P', 'T', {'altitude': [100.0, 110.0, 104.0]},
+                                                               [10.0, 12.0, 13.0])
+        self.assertTrue(math.isnan(derived['rate'][0]))
+        self.assertEqual(derived['rate'][1:], [5.0, -6.0])
+
+
+class UnitConversionTest(unittest.TestCase):
+    def setUp(self):
+        self.unitAliases = loadUnitAliases(UNITS_PATH)
+
+    def testUnitAliases(self):
+        self.assertEqual(self.unitAliases['celsius'], 'Celsius')
+        self.assertEqual(self.unitAliases['km/h'], 'Kilometer per hour')
+        self.assertEqual(self.unitAliases['h'], 'Hour')
+        self.assertEqual(loadUnitAliases(os.path.join(UNITS_PATH, 'missing.csv')), {})
+
+    def testExplicitUnits(self):
+        channels = DerivedChannels({'P/T/kelvin': "convert(temperature, 'C', 'K')",
+                                    'P/T/speed': "convert(speed, 'km/h', 'Meter per second')"},
+                                   unitAliases=self.unitAliases)
+        data = channels.apply(makeRecord(0.0, temperature=25.0, speed=36.0))['data']
+        self.assertAlmostEqual(data['kelvin'], 298.15)
+        self.assertAlmostEqual(data['speed'], 10.0)
+
+    def testDatabaseUnit(self):
+        channel = DerivedChannel('P/T/fahrenheit', "convert(sensors['inside'], 'Fahrenheit')",
+                                 argumentUnits={'sensors': {'inside': 'celsius'}}, unitAliases=self.unitAliases)
+        self.assertAlmostEqual(float(channel.evaluate({'sensors': {'inside': 100.0}}, 0.0, channel.states)), 212.0)
+
+    def testInvalidConversions(self):
+        with self.assertRaises(DerivedChannelError):
+            DerivedChannel('P/T/bad', "convert(altitude, 'Meter', 'Second')", unitAliases=self.unitAliases)
+        with self.assertRaises(DerivedChannelError):
+            DerivedChannel('P/T/bad', "convert(altitude, 'Furlong', 'Meter')", unitAliases=self.unitAliases)
+        with self.assertRaises(DerivedChannelError):
+            DerivedChannel('P/T/bad', "convert(altitude, 'Meter')", unitAliases=self.unitAliases)
+
+
+class DependentChannelsTest(unittest.TestCase):
+    DEFINITIONS = {'P/T/double': 'value * 2', 'P/T/total': 'double + value', 'P/T/change': 'delta(total)'}
+
+    def testChannelsBuildOnPreviousOnes(self):
+        channels = DerivedChannels(self.DEFINITIONS)
+        channels.apply(makeRecord(0.0, value=1.0))
+        data = channels.apply(makeRecord(1.0, value=2.0))['data']
+        self.assertEqual((data['double'], data['total'], data['change']), (4.0, 6.0, 3.0))
+        self.assertEqual(channels.names('P', 'T'), ['double', 'total', 'change'])
+
+    def testColumnsBuildOnPreviousOnes(self):
+        derived = DerivedChannels(self.DEFINITIONS).evaluateColumns('P', 'T', {'value': [1.0, 2.0]}, [0.0, 1.0])
+        self.assertEqual(derived['total'], [3.0, 6.0])
+        self.assertEqual(derived['change'][1], 3.0)
+
+    def testStoredChannelsAreNotRecomputed(self):
+        derived = DerivedChannels(self.DEFINITIONS).evaluateColumns('P', 'T', {'value': [1.0], 'double': [10.0]},
+                                                                    [0.0])
+        self.assertNotIn('double', derived)
+        self.assertEqual(derived['total'], [11.0])
+
+
+if __name__ == '__main__':
+    unittest.main()
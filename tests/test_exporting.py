@@ -0,0 +1,88 @@
+import importlib.util
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+from sources.exporting import TableWriter, columnType
+
+
+class ColumnTypeTest(unittest.TestCase):
+    def testArrayElementsShareTheirArrayType(self):
+        types = {'position': ('float', None), 'sensors/name': ('string', 16)}
+        self.assertEqual(columnType(types, 'position/2'), ('float', None))
+        self.assertEqual(columnType(types, 'sensors/3/name'), ('string', 16))
+        self.assertIsNone(columnType(types, 'unknown'))
+
+
+class TableWriterTest(unittest.TestCase):
+    TYPES = {'pressure': ('float', None), 'state': ('string', 100)}
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.chunks = [pd.DataFrame({'time': [0.0, 1.0], 'pressure': [None, None], 'state': [None, None]}),
+                       pd.DataFrame({'time': [2.0], 'pressure': [1013.25], 'state': ['A' * 100]})]
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def writeChunks(self, fileFormat, extension):
+        path = os.path.join(self.directory.name, f'export{extension}')
+        writer = TableWriter(path, fileFormat, {'pressure': 'hPa'}, self.TYPES)
+        for chunk in self.chunks:
+            writer.write(chunk)
+        writer.close()
+        return path
+
+    @unittest.skipUnless(importlib.util.find_spec('pyarrow'), 'pyarrow is not installed')
+    def testParquetColumnEmptyInFirstChunk(self):
+        import pyarrow.parquet as pq
+        table = pq.read_table(self.writeChunks('parquet', '.parquet'))
+        self.assertEqual(str(table.schema.field('pressure').type), 'double')
+        self.assertEqual(table.column('pressure').to_pylist(), [None, None, 1013.25])
+        self.assertEqual(table.column('state').to_pylist(), [None, None, 'A' * 100])
+
+    @unittest.skipUnless(importlib.util.find_spec('tables'), 'tables is not installed')
+    def testHdf5ColumnEmptyInFirstChunk(self):
+        frame = pd.read_hdf(self.writeChunks('hdf5', '.h5'), 'data')
+        self.assertEqual(frame['pressure'].iloc[-1], 1013.25)
+        self.assertEqual(frame['state'].iloc[-1], 'A' * 100)
+
+    @unittest.skipUnless(importlib.util.find_spec('pyarrow'), 'pyarrow is not installed')
+    def testParquetUnknownColumnEmptyInFirstChunk(self):
+        import pyarrow.parquet as pq
+        self.chunks[0]['label'] = None
+        self.chunks[1]['label'] = 'ascent'
+        table = pq.read_table(self.writeChunks('parquet', '.parquet'))
+        self.assertEqual(table.column('label').to_pylist(), [None, None, 'ascent'])
+
+    @unittest.skipUnless(importlib.util.find_spec('pyarrow'), 'pyarrow is not installed')
+    def testParquetUnknownColumnNeverReceived(self):
+        import pyarrow.parquet as pq
+        self.chunks[0]['label'] = None
+        self.chunks[1]['label'] = None
+        table = pq.read_table(self.writeChunks('parquet', '.parquet'))
+        self.assertEqual(str(table.schema.field('label').type), 'string')
+        self.assertEqual(table.num_rows, 3)
+
+    @unittest.skipUnless(importlib.util.find_spec('pyarrow'), 'pyarrow is not installed')
+    def testParquetUnknownColumnBeyondLookAhead(self):
+        import pyarrow.parquet as pq
+        path = os.path.join(self.directory.name, 'export.parquet')
+        writer = TableWriter(path, 'parquet', {}, self.TYPES, lookAhead=1)
+        writer.write(pd.DataFrame({'time': [0.0], 'label': [None]}))
+        writer.write(pd.DataFrame({'time': [1.0], 'label': [3]}))
+        writer.close()
+        self.assertEqual(pq.read_table(path).column('label').to_pylist(), [None, '3'])
+
+    @unittest.skipUnless(importlib.util.find_spec('tables'), 'tables is not installed')
+    def testHdf5UnknownColumnEmptyInFirstChunk(self):
+        self.chunks[0]['label'] = None
+        self.chunks[1]['label'] = 'ascent'
+        frame = pd.read_hdf(self.writeChunks('hdf5', '.h5'), 'data')
+        self.assertEqual(frame['label'].iloc[-1], 'ascent')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import os
+import tempfile
+import unittest
+
+from sources.common.utilities.fileSystem import csvTimeIndex, readCSVTimeRange
+
+
+class CSVTimeIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'data.csv')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def writeRows(self, times, mode='w', header=True):
+        with open(self.path, mode, newline='') as file:
+            if header:
+                file.write('UNIX,status,value\n')
+            for index, time in enumerate(times):
+                status = '"split, across\nlines"' if index % 3 == 0 else 'nominal'
+                file.write(f'{time},{status},{index}\n')
+
+    def testQuotedFields(self):
+        self.writeRows(range(1000))
+        index = csvTimeIndex(self.path, stride=16)
+        self.assertEqual(index['rowCount'], 1000)
+        self.assertEqual(list(index['times']), [float(time) for time in range(0, 1000, 16)])
+        data = readCSVTimeRange(self.path, 100, 199, index=index)
+        self.assertEqual(list(data['UNIX']), list(range(100, 200)))
+        self.assertEqual(data['status'].iloc[2], 'split, across\nlines')
+
+    def testAppendedRowsExtendTheIndex(self):
+        self.writeRows(range(100))
+        csvTimeIndex(self.path, stride=16)
+        self.writeRows(range(100, 150), mode='a', header=False)
+        index = csvTimeIndex(self.path, stride=16)
+        self.assertEqual(index['rowCount'], 150)
+        self.assertEqual(index['times'][-1], 144.0)
+
+    def testRewrittenFileRebuildsTheIndex(self):
+        self.writeRows(range(1000, 2000))
+        csvTimeIndex(self.path, stride=16)
+        self.writeRows(range(5000, 6000))
+        index = csvTimeIndex(self.path, stride=16)
+        self.assertEqual(index['rowCount'], 1000)
+        self.assertEqual(index['times'][0], 5000.0)
+
+    def testCorruptedSidecarIsRebuilt(self):
+        self.writeRows(range(100))
+        with open(self.path + '.idx', 'wb') as file:
+            file.write(b'not an index')
+        self.assertEqual(csvTimeIndex(self.path, stride=16)['rowCount'], 100)
+
+
+if __name__ == '__main__':
+    unittest.main()
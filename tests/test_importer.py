@@ -0,0 +1,139 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from sources.databases.importer import DefinitionImporter, readDefinitionHeader, readDefinitionSheet
+
+DATABASE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'parsers', 'database')
+HEADER = """
+typedef enum : uint8_t {
+    MODE_IDLE,          // Waiting for launch
+    MODE_ASCENT = 5,
+    MODE_DESCENT,       /* Parachute deployed */
+    MODE_LANDED = MODE_DESCENT << 1, MODE_LOST = 0x20u,
+} FlightMode;
+
+typedef struct __attribute__((packed)) {
+    float east;   // [m] East offset
+    float north;  // [m]
+} GroundOffset;
+
+typedef struct __attribute__((packed)) {
+    /* Multi-line
+       comment */
+    uint32_t boot; // [ms] Time since boot
+    GroundOffset offset;
+    int16_t samples[4];
+    FlightMode mode;
+} FLIGHT;
+"""
+
+
+class DefinitionFilesTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def writeFile(self, name, text):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(text)
+        return path
+
+    def testReadDefinitionSheet(self):
+        path = self.writeFile('definitions.csv', 'Telemetry,Argument,Type,Unit,Description\n'
+                                                 'FLIGHT, altitude ,float,m,Altitude above sea level\n')
+        self.assertEqual(readDefinitionSheet(path), [
+            {'Telemetry': 'FLIGHT', 'Argument': 'altitude', 'Type': 'float', 'Unit': 'm',
+             'Description': 'Altitude above sea level', 'Category': ''},
+        ])
+
+    def testEnumerationValues(self):
+        _, enumerations, _ = readDefinitionHeader(self.writeFile('flight.h', HEADER))
+        baseType, values = enumerations['FlightMode']
+        self.assertEqual(baseType, 'uint8')
+        self.assertEqual([(name, value) for name, value, _, _ in values],
+                         [('MODE_IDLE', 0), ('MODE_ASCENT', 5), ('MODE_DESCENT', 6), ('MODE_LANDED', 12),
+                          ('MODE_LOST', 32)])
+        self.assertEqual(values[0][3], 'Waiting for launch')
+        self.assertEqual(values[2][3], 'Parachute deployed')
+
+    def testUnparsableEnumerationValue(self):
+        _, enumerations, _ = readDefinitionHeader(self.writeFile('flight.h', 'typedef enum { A = B + 1, C } E;'))
+        self.assertEqual([value for _, value, _, _ in enumerations['E'][1]], [None, None])
+
+    def testStructures(self):
+        rows, _, skippedLines = readDefinitionHeader(self.writeFile('flight.h', HEADER))
+        self.assertEqual(skippedLines, [])
+        offset = [row for row in rows if row['Telemetry'] == 'GroundOffset']
+        self.assertEqual([row['Category'] for row in offset], ['STRUCT', 'STRUCT'])
+        self.assertEqual((offset[0]['Unit'], offset[0]['Description']), ('m', 'East offset'))
+        self.assertEqual((offset[1]['Unit'], offset[1]['Description']), ('m', ''))
+        flight = {row['Argument']: row for row in rows if row['Telemetry'] == 'FLIGHT'}
+        self.assertEqual(list(flight), ['boot', 'offset', 'samples', 'mode'])
+        self.assertEqual(flight['boot']['Type'], 'uint32')
+        self.assertEqual(flight['offset']['Type'], 'GroundOffset')
+        self.assertEqual(flight['samples']['Type'], 'int16[4]')
+        self.assertEqual(flight['boot']['Category'], 'TELEMETRY')
+
+    def testSkippedStructureLines(self):
+        header = 'typedef struct {\n    uint8_t a, b;\n    uint8_t flags : 3;\n    uint8_t c;\n} PACKET;\n'
+        rows, _, skippedLines = readDefinitionHeader(self.writeFile('packet.h', header))
+        self.assertEqual([row['Argument'] for row in rows], ['c'])
+        self.assertEqual(skippedLines, [('PACKET', 'uint8_t a, b;'), ('PACKET', 'uint8_t flags : 3;')])
+
+
+class DefinitionImporterTest(unittest.TestCase):
+    def setUp(self):
+        from sources.databases.balloondata import BalloonPackageDatabase
+        self.directory = tempfile.TemporaryDirectory()
+        self.databasePath = os.path.join(self.directory.name, 'database')
+        shutil.copytree(DATABASE_PATH, self.databasePath)
+        self.database = BalloonPackageDatabase(self.databasePath)
+        self.importer = DefinitionImporter(self.database)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def load(self, name, text):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(text)
+        self.importer.load(path)
+        return [message for level, message in self.importer.report if level == DefinitionImporter.ERROR]
+
+    def testReportEntries(self):
+        existingType = self.database.getSharedDataTypes()[0]
+        errors = self.load('definitions.csv', 'Telemetry,Argument,Type,Unit,Description,Category\n'
+                                              'FLIGHT,altitude,float,,,\n'
+                                              'FLIGHT,altitude,float,,,\n'
+                                              'FLIGHT,speed,unknownType,,,\n'
+                                              f'{existingType},member,float,,,STRUCT\n')
+        self.assertTrue(any('altitude defined twice' in error for error in errors))
+        self.assertTrue(any('unknown type unknownType' in error for error in errors))
+        self.assertTrue(any(f'shared type {existingType} already exists' in error for error in errors))
+
+    def testSkippedLinesAreErrors(self):
+        errors = self.load('packet.h', 'typedef struct {\n    uint8_t a, b;\n} PACKET;\n')
+        self.assertTrue(any('uint8_t a, b;' in error for error in errors))
+
+    def testApply(self):
+        self.assertEqual(self.load('flight.h', HEADER), [])
+        importedDatabase = self.importer.apply()
+        self.assertEqual(importedDatabase.path, self.databasePath)
+        self.assertIn('FLIGHT', [telemetry.id.name for telemetry in importedDatabase.telemetryTypes])
+        self.assertIn('GroundOffset', importedDatabase.getSharedDataTypes())
+        modes = importedDatabase.dataTypes['FlightMode'].type
+        self.assertEqual({mode.name: mode.value for mode in modes},
+                         {'MODE_IDLE': 0, 'MODE_ASCENT': 5, 'MODE_DESCENT': 6, 'MODE_LANDED': 12, 'MODE_LOST': 32})
+        # The original database is left untouched until the imported one is saved
+        with open(os.path.join(self.databasePath, 'sharedDataTypes.json'), encoding='utf-8') as file:
+            self.assertNotIn('FlightMode', json.load(file))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+
+from sources.ingestion import AcquisitionGroup, ArrivalStatistics, DuplicateFilter
+
+
+def makeRecord(time, source, value=1.0):
+    return {'parser': 'P', 'type': 'T', 'time': time, 'source': source, 'data': {'value': value}}
+
+
+class DuplicateFilterTest(unittest.TestCase):
+    def testSteadySingleReceiverStreamPassesUnchanged(self):
+        duplicateFilter = DuplicateFilter(window=0.5)
+        records = [makeRecord(index * 0.2, 'A') for index in range(50)]
+        kept = [record for record in records if not duplicateFilter.isDuplicate(record)]
+        self.assertEqual(kept, records)
+        self.assertEqual(duplicateFilter.nbDuplicates, 0)
+
+    def testCopiesFromAnotherReceiverAreDropped(self):
+        duplicateFilter = DuplicateFilter(window=0.5)
+        self.assertFalse(duplicateFilter.isDuplicate(makeRecord(0.0, 'A')))
+        self.assertTrue(duplicateFilter.isDuplicate(makeRecord(0.05, 'B')))
+        self.assertFalse(duplicateFilter.isDuplicate(makeRecord(0.2, 'A')))
+        self.assertTrue(duplicateFilter.isDuplicate(makeRecord(0.25, 'B')))
+        self.assertEqual(duplicateFilter.nbDuplicates, 2)
+
+    def testWindowIsNotExtendedByCopies(self):
+        duplicateFilter = DuplicateFilter(window=0.5)
+        self.assertFalse(duplicateFilter.isDuplicate(makeRecord(0.0, 'A')))
+        self.assertTrue(duplicateFilter.isDuplicate(makeRecord(0.4, 'B')))
+        self.assertFalse(duplicateFilter.isDuplicate(makeRecord(0.8, 'C')))
+
+    def testDifferentValuesAreKept(self):
+        duplicateFilter = DuplicateFilter(window=0.5)
+        self.assertFalse(duplicateFilter.isDuplicate(makeRecord(0.0, 'A', value=1.0)))
+        self.assertFalse(duplicateFilter.isDuplicate(makeRecord(0.01, 'B', value=2.0)))
+
+
+class AcquisitionGroupTest(unittest.TestCase):
+    def testSingleReceiverIsNotDeduplicated(self):
+        group = AcquisitionGroup('.', {'DUPLICATE_WINDOW': 0.5}, receivers=[('/dev/ttyUSB0', 115200, ['P'])])
+        self.assertIsNone(group.duplicateFilter)
+
+    def testSeveralReceiversAreDeduplicated(self):
+        receivers = [('/dev/ttyUSB0', 115200, ['P']), ('/dev/ttyUSB1', 115200, ['P'])]
+        group = AcquisitionGroup('.', {'DUPLICATE_WINDOW': 0.5}, receivers=receivers)
+        self.assertIsNotNone(group.duplicateFilter)
+
+
+class ArrivalStatisticsTest(unittest.TestCase):
+    def testRateFollowsRecordTimestamps(self):
+        arrivals = ArrivalStatistics()
+        for index in range(20):
+            arrivals.update(makeRecord(100.0 + index * 0.5, 'A'))
+        tracker = arrivals.trackers[('P', 'T')]
+        self.assertAlmostEqual(tracker.rate, 2.0)
+        self.assertEqual(tracker.nbPackets, 20)
+        self.assertEqual(tracker.nbGaps, 0)
+
+    def testSinglePacketGoesStaleAfterTimeout(self):
+        arrivals = ArrivalStatistics(timeout=10.0)
+        arrivals.update(makeRecord(100.0, 'A'))
+        self.assertEqual(arrivals.checkStaleness(now=105.0), [])
+        self.assertEqual(arrivals.checkStaleness(now=111.0), [('P', 'T')])
+        self.assertEqual(arrivals.checkStaleness(now=112.0), [])
+
+    def testNeverReceivedIsNotStale(self):
+        arrivals = ArrivalStatistics()
+        arrivals.track('P', 'T')
+        self.assertEqual(arrivals.checkStaleness(now=1e9), [])
+
+    def testSnapshotIsNotUpdatedAfterwards(self):
+        arrivals = ArrivalStatistics()
+        arrivals.update(makeRecord(100.0, 'A'))
+        snapshot = arrivals.snapshot()
+        arrivals.update(makeRecord(101.0, 'A'))
+        arrivals.update(makeRecord(100.0, 'A') | {'type': 'U'})
+        self.assertEqual(list(snapshot), [('P', 'T')])
+        self.assertEqual(snapshot[('P', 'T')].nbPackets, 1)
+        self.assertEqual(arrivals.snapshot()[('P', 'T')].nbPackets, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
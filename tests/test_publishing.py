@@ -0,0 +1,100 @@
+import queue
+import socket
+import threading
+import time
+import unittest
+
+from sources.publishing import TelemetryPublisher, TelemetrySubscriber, RecordDecoder, encodeRecord, parseAddress
+
+
+def waitFor(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+class ParseAddressTest(unittest.TestCase):
+    def testHostAndPort(self):
+        self.assertEqual(parseAddress('192.168.1.10:9000'), ('192.168.1.10', 9000))
+
+    def testBareHostUsesDefaultPort(self):
+        self.assertEqual(parseAddress('groundstation', defaultPort=9660), ('groundstation', 9660))
+
+    def testBarePortUsesDefaultHost(self):
+        self.assertEqual(parseAddress(':9000', defaultHost='127.0.0.1'), ('127.0.0.1', 9000))
+
+    def testInvalidPort(self):
+        with self.assertRaises(ValueError):
+            parseAddress('host:port')
+        with self.assertRaises(ValueError):
+            parseAddress('host:70000')
+
+
+class RecordDecoderTest(unittest.TestCase):
+    def testFramesSplitAcrossReads(self):
+        records = [{'parser': 'P', 'type': 'T', 'time': float(index), 'data': {'value': index}} for index in range(5)]
+        stream = b''.join(encodeRecord(record) for record in records)
+        decoder, decoded = RecordDecoder(), []
+        for start in range(0, len(stream), 7):
+            decoded.extend(decoder.feed(stream[start:start + 7]))
+        self.assertEqual(decoded, records)
+
+
+class LoopbackTest(unittest.TestCase):
+    NB_SUBSCRIBERS = 3
+    NB_RECORDS = 500
+
+    def setUp(self):
+        self.publisher = TelemetryPublisher('127.0.0.1', 0).start()
+        self.subscribers = [TelemetrySubscriber('127.0.0.1', self.publisher.port, timeout=0.1)
+                            for _ in range(self.NB_SUBSCRIBERS)]
+        self.assertTrue(waitFor(lambda: len(self.publisher.subscribers) == self.NB_SUBSCRIBERS))
+
+    def tearDown(self):
+        for subscriber in self.subscribers:
+            subscriber.close()
+        self.publisher.close()
+
+    def testEverySubscriberReceivesEveryRecordInOrder(self):
+        records = [{'parser': 'P', 'type': 'T', 'time': float(index), 'data': {'value': index, 'vector': [index, -index]}}
+                   for index in range(self.NB_RECORDS)]
+        for record in records:
+            self.publisher.publish(record)
+        for subscriber in self.subscribers:
+            received = []
+            self.assertTrue(waitFor(lambda: received.extend(subscriber.receive()) or len(received) >= self.NB_RECORDS))
+            self.assertEqual(received, records)
+        self.assertEqual(self.publisher.nbDropped, 0)
+
+    def testClosingPublisherExhaustsSubscribers(self):
+        self.publisher.close()
+        for subscriber in self.subscribers:
+            self.assertTrue(waitFor(lambda: subscriber.receive() == [] and subscriber.exhausted))
+
+
+class SendLoopTest(unittest.TestCase):
+    def testSentinelConsumedWhileCoalescingStopsTheLoop(self):
+        publisher = TelemetryPublisher('127.0.0.1', 0)
+        publisher._active = True
+        connection, peer = socket.socketpair()
+        frames = queue.Queue()
+        records = [{'parser': 'P', 'type': 'T', 'time': float(index), 'data': {}} for index in range(3)]
+        for record in records:
+            frames.put(encodeRecord(record))
+        frames.put(None)
+        sender = threading.Thread(target=publisher._sendLoop, args=(connection, frames), daemon=True)
+        sender.start()
+        sender.join(timeout=5.0)
+        self.assertFalse(sender.is_alive())
+        decoder, received = RecordDecoder(), []
+        while data := peer.recv(65536):
+            received.extend(decoder.feed(data))
+        peer.close()
+        self.assertEqual(received, records)
+
+
+if __name__ == '__main__':
+    unittest.main()